@@ -0,0 +1,58 @@
+"""Núcleo de simulación biomecánica sin Streamlit (el modelo solo depende de NumPy).
+
+La app (``streamlit_app.py``) y el CLI por lotes (``python -m biomecanica``) usan este paquete.
+``import biomecanica`` carga solo el modelo, las especies y la exportación; el resto
+(assets con Pillow, vídeo, historial SQLite, barridos con pools de procesos…) se
+importa al pedir el nombre (``from biomecanica import AssetStore``) o el submódulo.
+"""
+import importlib
+
+from .species import SPECIES, BIOMES, ENVIRONMENTS, REGION, SCENARIO_DEFAULTS, SIM_DURATION, STEP_INTERVAL
+from .registry import HABITATS, SpeciesRegistry, BiomeRegistry, read_columns
+from .model import (
+    VERDICT_ALIVE, VERDICT_WEAK, SURVIVAL_THRESHOLD, ENSEMBLE_PERCENTILES,
+    compute_stepwise_evolution, compute_ensemble_evolution, final_verdict, compute_drivers,
+    normalize_scenario, run_scenario, drift_noise, compute_final_energy_grid,
+    VERDICT_LABELS, verdict_codes,
+)
+from .export import TIMELINE_COLUMNS, timeline_columns, write_timeline_csv
+
+# name → submodule, imported on first access
+_LAZY = {
+    "ranking": ("biome_scenario", "evaluate_registry", "rank_species", "write_ranking_csv"),
+    "payload": ("CONTAINER_WIDTH", "CONTAINER_HEIGHT", "SPRITE_WIDTH", "build_payload", "pack_agents",
+                "DECODE_PAYLOAD_JS"),
+    "cache": ("LRUCache", "scenario_key", "estimate_nbytes", "shared_cache"),
+    "runstore": ("RunStore", "encode_timeline", "decode_timeline"),
+    "surrogate": ("Surrogate", "build_surrogate", "surrogate_axes"),
+    "envelope": ("ENVELOPE_THRESHOLDS", "FOUND", "ALWAYS_PASSES", "NEVER_PASSES", "solve_envelope",
+                 "iter_envelope_rows", "write_envelope_csv"),
+    "pipeline": ("ArtifactGraph", "Evaluation", "build_simulation_graph"),
+    "assets": ("AssetStore", "build_asset", "content_hash"),
+    "narrative": ("MESSAGES", "DEFAULT_MESSAGE", "condition_mask", "condition_masks", "decode_narrative",
+                  "decode_timeline_narrative"),
+    "sweep": ("SWEEP_PARAMS", "SweepCancelled", "run_sweep", "sweep_axes", "heatmap_slice", "iter_sweep_rows",
+              "write_sweep_csv"),
+    "stream": ("COLLAPSE_ENERGY", "stream_evolution", "run_streaming", "RunningSummary", "Downsampler"),
+    "adaptive": ("ENERGY_EVENT_LEVELS", "integrate_adaptive", "resample", "summarize_adaptive", "run_adaptive"),
+    "population": ("build_population", "simulate_population", "population_breakdown"),
+    "motion": ("DEATH_REASONS", "compute_trajectories", "build_scene", "animation_verdict"),
+    "render": ("render_animation_html",),
+    "video": ("VIDEO_FORMATS", "SceneAssets", "render_clip", "scenario_clip", "render_batch", "render_clip_bytes"),
+    "rng": ("stream_seed", "drift_rng", "motion_rng", "ensemble_block_rng", "population_rngs"),
+    "profiling": ("StageProfiler", "StageMetrics", "STAGE_METRICS", "start_metrics_server"),
+}
+_LAZY_NAMES = {name: module for module, names in _LAZY.items() for name in names}
+
+
+def __getattr__(name):
+    module = _LAZY_NAMES.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{module}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_NAMES))
@@ -0,0 +1,278 @@
+# -------------------------
+# Event-driven / adaptive-step integrator
+# -------------------------
+# The fixed-step model advances a random walk every STEP_INTERVAL and applies a
+# forward-Euler energy update. Here the drift is treated as the Brownian motion that
+# walk discretizes (variance per second = (σ_step · dyn)² / step_interval) and:
+#   * step sizes adapt to the distance to the nearest threshold of the narrative
+#     conditions (temp_diff ±6, ox_factor 0.85, pressure 60/140, altitude 3000/-200)
+#     and to a cap on the energy change per step;
+#   * when a step changes the condition mask, Brownian-bridge midpoints are sampled
+#     (bisection) until the crossing is located within ``event_tol`` seconds;
+#   * energy is integrated with the trapezoidal rate between nodes, so levels
+#     (60/30/2 used by the animation, plus 0) are hit at analytically solved times;
+#   * with dyn_intensity 0 the state is constant and the run jumps straight from
+#     one energy event to the next; after collapse (energy 0) it jumps to the end.
+# Runs are statistically equivalent to the fixed-step model, not path-identical to it.
+# Results are sparse nodes + events; ``resample`` produces a regular timeline on demand.
+import math
+
+import numpy as np
+
+from .model import VERDICT_WEAK, compute_drivers, final_verdict, normalize_scenario
+from .narrative import condition_mask, condition_masks, habitat_mask
+from .rng import drift_rng
+from .species import SPECIES
+from .stream import COLLAPSE_ENERGY, CsvChunkWriter, ParquetChunkWriter
+
+ENERGY_EVENT_LEVELS = (60.0, 30.0, 2.0)
+
+_SIGMA_STEP = np.array([0.7, 0.6, 0.4, 5.0])   # per-step drift std (pres, temp, ox, alt) at dyn_intensity 1
+_LOWER = np.array([20.0, -50.0, 1.0, -10000.0])
+_UPPER = np.array([200.0, 60.0, 40.0, 8000.0])
+_LOG_085 = math.log(0.85)
+_ENERGY_EPS = 1e-9   # analytic jumps land on a level up to rounding; snap within this
+
+
+def _ox_factor(x):
+    pres, _, ox, alt = x
+    return max(0.01, min(2.0, (pres / 101.3) * (ox / 21.0) * math.exp(-alt / 7000.0)))
+
+
+def energy_rate(x, temp_opt):
+    """dE/dt (per second) of the model at state ``x`` = (pres, temp, ox, alt)."""
+    pres, temp, _, _ = x
+    temp_penalty = abs(temp - temp_opt) * 0.02
+    pres_penalty = (0.25 if pres > 140 else 0.0) + (0.18 if pres < 60 else 0.0)
+    return - (temp_penalty * 6 + pres_penalty * 5 + (1 - min(1.0, _ox_factor(x))) * 12) / 2.0
+
+
+def _threshold_dt(x, sigma, temp_opt):
+    """Largest dt for which a 4σ excursion stays short of every condition threshold."""
+    pres, temp, ox, alt = x
+    dists = [
+        (min(abs(temp - (temp_opt + 6)), abs(temp - (temp_opt - 6))), sigma[1]),
+        (min(abs(pres - 140), abs(pres - 60)), sigma[0]),
+        (min(abs(alt - 3000), abs(alt + 200)), sigma[3]),
+    ]
+    # ox_factor threshold in log space: log f = log pres + log ox - alt/7000 + const
+    sigma_log_f = math.sqrt((sigma[0] / pres) ** 2 + (sigma[2] / ox) ** 2 + (sigma[3] / 7000.0) ** 2)
+    f = (pres / 101.3) * (ox / 21.0) * math.exp(-alt / 7000.0)
+    dists.append((abs(math.log(max(f, 1e-12)) - _LOG_085), sigma_log_f))
+    dt = math.inf
+    for dist, s in dists:
+        if s > 0:
+            dt = min(dt, (dist / (4.0 * s)) ** 2)
+    return dt
+
+
+def integrate_adaptive(presion0, temp0, ox0, alt0, dyn_intensity, duration, temp_opt, habitat, environment, rng,
+                       step_interval=0.5, dt_min=None, dt_max=3600.0, max_energy_step=1.0, event_tol=None,
+                       energy_levels=ENERGY_EVENT_LEVELS):
+    """Integrate one run over ``duration`` seconds with adaptive steps.
+
+    Returns ``{"t", "pres", "temp", "ox", "alt", "energy"}`` node arrays (energy is
+    piecewise linear between nodes), ``events`` (time-ordered dicts) and ``n_nodes``.
+    """
+    dt_min = step_interval if dt_min is None else dt_min
+    event_tol = step_interval / 8.0 if event_tol is None else event_tol
+    sigma = _SIGMA_STEP * dyn_intensity / math.sqrt(step_interval)   # per sqrt(second)
+    base_mask = habitat_mask(habitat, environment)
+    stochastic = bool(np.any(sigma > 0))
+
+    def mask_of(x):
+        ox_factor = _ox_factor(x)
+        return condition_mask(x[1] - temp_opt, ox_factor, x[0], x[3], base_mask)
+
+    x = np.clip(np.array([presion0, temp0, ox0, alt0], dtype=float), _LOWER, _UPPER)
+    t = 0.0
+    energy = 100.0
+    mask = mask_of(x)
+    rate = energy_rate(x, temp_opt)
+    nodes_t = [t]; nodes_x = [x.copy()]; nodes_e = [energy]
+    events = [{"t": 0.0, "kind": "enter", "condition": bit} for bit in _bits(mask)]
+    pending_levels = [lvl for lvl in sorted(energy_levels, reverse=True) if lvl < energy]
+
+    def add_node(t_new, x_new, rate_new):
+        nonlocal t, x, energy, mask, rate
+        # trapezoidal rate → energy linear on [t, t_new]; locate level crossings exactly
+        slope = 0.5 * (rate + rate_new)
+        e_new = energy + slope * (t_new - t)
+        if e_new <= _ENERGY_EPS:
+            e_new = 0.0
+        while pending_levels and e_new <= pending_levels[0] + _ENERGY_EPS:
+            lvl = pending_levels.pop(0)
+            t_hit = t + (lvl - energy) / slope if slope < 0 else t_new
+            events.append({"t": t_hit, "kind": "energy", "level": lvl})
+        if e_new == 0.0 and energy > 0.0:
+            t_zero = t + (0.0 - energy) / slope if slope < 0 else t_new
+            events.append({"t": t_zero, "kind": "energy", "level": 0.0})
+            # energy stays at 0: keep the exact hitting point as a node
+            if t_zero < t_new:
+                frac = (t_zero - t) / (t_new - t)
+                nodes_t.append(t_zero); nodes_x.append(x + (x_new - x) * frac); nodes_e.append(0.0)
+        new_mask = mask_of(x_new)
+        if new_mask != mask:
+            for bit in _bits(new_mask & ~mask):
+                events.append({"t": t_new, "kind": "enter", "condition": bit})
+            for bit in _bits(mask & ~new_mask):
+                events.append({"t": t_new, "kind": "exit", "condition": bit})
+        t, x, energy, mask, rate = t_new, x_new, e_new, new_mask, rate_new
+        nodes_t.append(t); nodes_x.append(x.copy()); nodes_e.append(energy)
+
+    while t < duration:
+        remaining = duration - t
+        if not stochastic:
+            # constant state: jump to the next energy level (or the end) in one segment
+            if rate < 0 and energy > 0:
+                target = pending_levels[0] if pending_levels else 0.0
+                dt = min(remaining, (target - energy) / rate)
+            else:
+                dt = remaining
+            add_node(t + dt, x.copy(), rate)
+            continue
+        if energy <= 0.0:
+            # collapsed: energy is frozen, only the end state of the drift is still needed
+            x_end = np.clip(x + sigma * math.sqrt(remaining) * rng.standard_normal(4), _LOWER, _UPPER)
+            add_node(duration, x_end, energy_rate(x_end, temp_opt))
+            continue
+
+        dt = _threshold_dt(x, sigma, temp_opt)
+        if rate < 0 and energy > 0:
+            dt = min(dt, max_energy_step / -rate)
+        dt = min(max(dt, dt_min), dt_max, remaining)
+
+        x_end = np.clip(x + sigma * math.sqrt(dt) * rng.standard_normal(4), _LOWER, _UPPER)
+        if mask_of(x_end) == mask or dt <= event_tol:
+            add_node(t + dt, x_end, energy_rate(x_end, temp_opt))
+            continue
+
+        # condition change inside the step: bisect with Brownian-bridge midpoints
+        bridge = [(t, x.copy()), (t + dt, x_end)]
+        lo = 0
+        while bridge[lo + 1][0] - bridge[lo][0] > event_tol:
+            (ta, xa), (tb, xb) = bridge[lo], bridge[lo + 1]
+            tm = 0.5 * (ta + tb)
+            xm = np.clip(0.5 * (xa + xb) + sigma * math.sqrt((tb - ta) / 4.0) * rng.standard_normal(4), _LOWER, _UPPER)
+            bridge.insert(lo + 1, (tm, xm))
+            if mask_of(xm) == mask_of(xa):
+                lo += 1
+        for tn, xn in bridge[1:]:
+            add_node(tn, xn, energy_rate(xn, temp_opt))
+
+    arr = np.array(nodes_x)
+    events.sort(key=lambda e: e["t"])
+    return {
+        "t": np.array(nodes_t), "pres": arr[:, 0], "temp": arr[:, 1], "ox": arr[:, 2], "alt": arr[:, 3],
+        "energy": np.array(nodes_e), "events": events, "n_nodes": len(nodes_t), "temp_opt": temp_opt,
+        "habitat": habitat, "environment": environment, "duration": duration,
+    }
+
+
+def _bits(mask):
+    bit = 1
+    while bit <= mask:
+        if mask & bit:
+            yield bit
+        bit <<= 1
+
+
+def resample(result, t_grid):
+    """Timeline (same keys as compute_stepwise_evolution, NumPy arrays) on an arbitrary time grid."""
+    t_grid = np.asarray(t_grid, dtype=float)
+    out = {k: np.interp(t_grid, result["t"], result[k]) for k in ("pres", "temp", "ox", "alt", "energy")}
+    ox_factor = np.clip((out["pres"] / 101.3) * (out["ox"] / 21.0) * np.exp(-out["alt"] / 7000.0), 0.01, 2.0)
+    out["ox_factor"] = ox_factor
+    out["speed_ratio"] = np.maximum(0.02, np.sqrt(out["energy"] / 100.0))
+    out["conditions"] = condition_masks(out["temp"] - result["temp_opt"], ox_factor, out["pres"], out["alt"],
+                                        habitat_mask(result["habitat"], result["environment"]))
+    out["temp_opt"] = result["temp_opt"]
+    out["t"] = t_grid
+    return out
+
+
+def _time_average(result, key):
+    t = result["t"]
+    if t[-1] <= 0:
+        return float(result[key][0])
+    return float(np.trapezoid(result[key], t) / (t[-1] - t[0])) if hasattr(np, "trapezoid") \
+        else float(np.trapz(result[key], t) / (t[-1] - t[0]))
+
+
+def _first_level_time(result, level):
+    """First time energy (piecewise linear, non-increasing) reaches ``level``; None if it never does."""
+    t, e = result["t"], result["energy"]
+    hit = np.flatnonzero(e <= level)
+    if not hit.size:
+        return None
+    i = hit[0]
+    if i == 0 or e[i - 1] == e[i]:
+        return float(t[i])
+    return float(t[i - 1] + (t[i] - t[i - 1]) * (e[i - 1] - level) / (e[i - 1] - e[i]))
+
+
+def summarize_adaptive(result, spec, environment):
+    """Same fields as stream.RunningSummary.summary, from the node representation."""
+    avg_temp = _time_average(result, "temp")
+    avg_ox = _time_average(result, "ox")
+    avg_pres = _time_average(result, "pres")
+    final_energy = float(result["energy"][-1])
+    return {
+        "nodes": result["n_nodes"],
+        "duration": float(result["t"][-1]),
+        "final_energy": final_energy,
+        "min_energy": float(result["energy"].min()),   # energy never increases in this model
+        "verdict": final_verdict(final_energy),
+        "time_to_weak": _first_level_time(result, VERDICT_WEAK),
+        "time_to_collapse": _first_level_time(result, COLLAPSE_ENERGY),
+        "avg_temp": avg_temp,
+        "avg_ox": avg_ox,
+        "avg_pres": avg_pres,
+        "drivers": compute_drivers(avg_temp, avg_ox, avg_pres, spec["temp_opt"], spec["ox_opt"], spec["habitat"],
+                                   environment),
+        "events": len(result["events"]),
+    }
+
+
+def run_adaptive(scenario, duration, out=None, fmt="csv", output_interval=None, chunk_steps=8192, max_points=2000,
+                 **integrator_kwargs):
+    """Adaptive counterpart of stream.run_streaming: integrate, then resample onto the output grid in chunks.
+
+    ``output_interval`` defaults to the scenario step interval; the downsampled view
+    is resampled directly at ``max_points`` times.
+    """
+    sc = normalize_scenario(scenario)
+    spec = SPECIES[sc["species_name"]]
+    step_interval = sc["step_interval"]
+    result = integrate_adaptive(sc["presion_init"], sc["temp_init"],
+                                sc["ox_init"], sc["altitud_init"], sc["dyn_intensity"], duration, spec["temp_opt"],
+                                spec["habitat"], sc["environment"], drift_rng(sc["seed"]), step_interval=step_interval,
+                                **integrator_kwargs)
+    output_interval = output_interval or step_interval
+    n_out = int(duration / output_interval)
+
+    if out is not None:
+        owned_fh = None
+        if fmt == "parquet":
+            writer = ParquetChunkWriter(out)
+        else:
+            if isinstance(out, str):
+                out = owned_fh = open(out, "w", encoding="utf-8", newline="")
+            writer = CsvChunkWriter(out)
+        try:
+            for start in range(0, n_out, chunk_steps):
+                idx = np.arange(start, min(start + chunk_steps, n_out))
+                # grid sample i sits at the end of step i, like the fixed-step timeline
+                chunk = resample(result, (idx + 1) * output_interval)
+                chunk["start"] = start
+                chunk["t"] = idx * output_interval
+                writer.write(chunk, output_interval)
+        finally:
+            writer.close()
+            if owned_fh is not None:
+                owned_fh.close()
+
+    view_t = np.linspace(0.0, duration, min(max_points, max(2, n_out)))
+    view = resample(result, view_t)
+    summary = summarize_adaptive(result, spec, sc["environment"])
+    return summary, {k: view[k] for k in ("t", "energy", "speed_ratio", "temp", "ox")}
@@ -0,0 +1,156 @@
+# -------------------------
+# Content-addressed asset pipeline for uploaded background / sprite images
+# -------------------------
+import base64
+import hashlib
+import io
+import os
+import re
+
+from .cache import LRUCache
+from .payload import CONTAINER_WIDTH, CONTAINER_HEIGHT, SPRITE_WIDTH
+
+try:  # Pillow ships with matplotlib; without it assets are passed through unchanged
+    from PIL import Image
+except ImportError:  # pragma: no cover
+    Image = None
+
+BACKGROUND_JPEG_QUALITY = 85
+
+_EXT = {"image/png": "png", "image/jpeg": "jpg"}
+_PUBLISHED_NAME = re.compile(r"^(background|sprite)_[0-9a-f]{16}\.(png|jpg)$")
+
+
+def content_hash(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def _sniff_mime(data):
+    return "image/jpeg" if data[:3] == b"\xff\xd8\xff" else "image/png"
+
+
+def _encode(img, fmt, **save_kwargs):
+    buf = io.BytesIO()
+    img.save(buf, format=fmt, **save_kwargs)
+    return buf.getvalue()
+
+
+def process_background(data):
+    """Downscale so the image still covers the 940x520 container (CSS background-size: cover) and re-encode as JPEG."""
+    if Image is None:
+        return data, _sniff_mime(data)
+    img = Image.open(io.BytesIO(data))
+    img.load()
+    scale = max(CONTAINER_WIDTH / img.width, CONTAINER_HEIGHT / img.height)
+    if scale < 1.0:
+        img = img.resize((max(1, round(img.width * scale)), max(1, round(img.height * scale))), Image.LANCZOS)
+    if img.mode != "RGB":
+        img = img.convert("RGB")
+    out = _encode(img, "JPEG", quality=BACKGROUND_JPEG_QUALITY, optimize=True, progressive=True)
+    # keep the original when it is already smaller (e.g. tiny, well-compressed uploads)
+    if len(out) >= len(data):
+        return data, _sniff_mime(data)
+    return out, "image/jpeg"
+
+
+def process_sprite(data, display_width=SPRITE_WIDTH):
+    """Downscale to the sprite display width and re-encode as optimized PNG (alpha preserved)."""
+    if Image is None:
+        return data, _sniff_mime(data)
+    img = Image.open(io.BytesIO(data))
+    img.load()
+    if img.width > display_width:
+        height = max(1, round(img.height * display_width / img.width))
+        img = img.resize((display_width, height), Image.LANCZOS)
+    if img.mode not in ("RGBA", "LA", "P"):
+        img = img.convert("RGBA")
+    out = _encode(img, "PNG", optimize=True)
+    if len(out) >= len(data):
+        return data, _sniff_mime(data)
+    return out, "image/png"
+
+
+_PROCESSORS = {"background": process_background, "sprite": process_sprite}
+
+
+def build_asset(data, kind):
+    digest = content_hash(data)
+    out, mime = _PROCESSORS[kind](data)
+    return {
+        "kind": kind,
+        "hash": digest,
+        "mime": mime,
+        "bytes": out,
+        "b64": base64.b64encode(out).decode("utf-8"),
+        "filename": f"{kind}_{digest[:16]}.{_EXT[mime]}",
+        "source_size": len(data),
+    }
+
+
+class AssetStore:
+    """Processed assets keyed by (kind, sha256 of the upload), bounded by an LRU cache.
+
+    When ``static_dir`` is given, each asset is also written once under its
+    content-hashed filename so pages can reference it by URL (and browsers cache it)
+    instead of inlining the bytes on every rerun. ``cache`` (e.g. cache.shared_cache())
+    replaces the private LRU so assets count against a shared memory budget.
+    The directory is bounded too: at most ``max_static_files`` published assets are
+    kept, the least recently used (file mtime, refreshed on every use) are deleted.
+    """
+
+    def __init__(self, maxsize=32, ttl=3600.0, static_dir=None, static_url="app/static", cache=None,
+                 max_static_files=64):
+        self.cache = cache if cache is not None else LRUCache(maxsize=maxsize, ttl=ttl)
+        self.static_dir = static_dir
+        self.static_url = static_url.rstrip("/")
+        self.max_static_files = max_static_files
+        if static_dir is not None and os.path.isdir(static_dir):
+            self._prune_static()   # files left by earlier runs
+
+    def get(self, data, kind):
+        key = ("asset", kind, content_hash(data))
+        asset = self.cache.get(key)
+        if asset is None:
+            asset = build_asset(data, kind)
+            self.cache.put(key, asset)
+        if self.static_dir is not None:
+            self._publish(asset)
+        return asset
+
+    def _publish(self, asset):
+        path = os.path.join(self.static_dir, asset["filename"])
+        try:
+            os.utime(path)   # mark as recently used
+            return
+        except FileNotFoundError:
+            pass
+        os.makedirs(self.static_dir, exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as fh:
+            fh.write(asset["bytes"])
+        os.replace(tmp, path)
+        self._prune_static(keep=asset["filename"])
+
+    def _prune_static(self, keep=None):
+        """Delete the least recently used published assets beyond ``max_static_files``."""
+        if self.max_static_files is None:
+            return
+        published = []
+        for entry in os.scandir(self.static_dir):
+            if _PUBLISHED_NAME.match(entry.name) and entry.name != keep:
+                try:
+                    published.append((entry.stat().st_mtime, entry.path))
+                except FileNotFoundError:
+                    pass
+        excess = len(published) + (keep is not None) - int(self.max_static_files)
+        for _, path in sorted(published)[:max(0, excess)]:
+            try:
+                os.remove(path)
+            except FileNotFoundError:   # another session pruned it first
+                pass
+
+    def url(self, asset):
+        """URL for the asset: static file when publishing is enabled, otherwise an inline data URI."""
+        if self.static_dir is not None:
+            return f"/{self.static_url}/{asset['filename']}"
+        return f"data:{asset['mime']};base64,{asset['b64']}"
@@ -0,0 +1,228 @@
+# -------------------------
+# Headless benchmark suite: python -m biomecanica.bench [--quick] [--save-baseline F] [--compare F]
+# -------------------------
+# Each case reports wall time (best of --repeat), throughput, peak traced memory
+# and, where relevant, output bytes. Baselines are plain JSON keyed by case id, so
+# two runs (or two commits) can be compared; a case regresses when its time grows
+# by more than --threshold.
+import argparse
+import gc
+import io
+import json
+import platform
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from .assets import build_asset
+from .adaptive import run_adaptive
+from .model import compute_ensemble_evolution, compute_stepwise_evolution
+from .motion import build_scene
+from .payload import build_payload
+from .render import render_animation_html
+from .rng import drift_rng, motion_rng
+from .species import ENVIRONMENTS, SCENARIO_DEFAULTS, SPECIES, STEP_INTERVAL
+from .stream import run_streaming
+
+STEP_SIZES = (40, 1_000, 10_000, 100_000, 1_000_000)
+ENSEMBLE_SIZES = (100, 1_000, 10_000, 100_000)
+IMAGE_SIZES = (100_000, 1_000_000, 5_000_000, 20_000_000)  # bytes of the uploaded PNG
+QUICK = {"steps": (40, 1_000, 10_000), "ensemble": (100, 1_000), "images": (100_000, 1_000_000)}
+
+_BASE = SCENARIO_DEFAULTS
+_SPEC = SPECIES[_BASE["species_name"]]
+
+
+def _timeline(steps, species_name=_BASE["species_name"], environment=_BASE["environment"]):
+    spec = SPECIES[species_name]
+    return compute_stepwise_evolution(_BASE["presion_init"], _BASE["temp_init"], _BASE["ox_init"], _BASE["altitud_init"],
+                                      _BASE["dyn_intensity"], steps, STEP_INTERVAL, spec["temp_opt"], spec["habitat"],
+                                      environment, rng=drift_rng(_BASE["seed"]))
+
+
+def _png_of_size(target_bytes, seed=0):
+    """Noise PNG of roughly ``target_bytes`` (noise barely compresses, so bytes ≈ 3·w·h)."""
+    from PIL import Image
+
+    side = max(8, int((target_bytes / 3) ** 0.5))
+    pixels = np.random.default_rng(seed).integers(0, 256, size=(side, side, 3), dtype=np.uint8)
+    buf = io.BytesIO()
+    Image.fromarray(pixels, "RGB").save(buf, format="PNG", compress_level=1)
+    return buf.getvalue()
+
+
+def measure(fn, repeat=3, units=1):
+    """Run ``fn`` ``repeat`` times; best wall time, throughput and peak traced memory of one call."""
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        gc.collect()
+        t0 = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - t0)
+    gc.collect()
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    metrics = {"seconds": best, "throughput": units / best if best > 0 else float("inf"), "peak_bytes": peak}
+    if isinstance(result, (bytes, str)):
+        metrics["output_bytes"] = len(result.encode("utf-8") if isinstance(result, str) else result)
+    return metrics
+
+
+def iter_cases(quick=False, only=None):
+    """Yield (case_id, unit label, units, fn, repeat).
+
+    ``only``: case-id prefixes; the setup of cases that none of them selects
+    (timelines, scenes, test images) is skipped, not just their measurement.
+    """
+    def selected(*case_ids):
+        return not only or any(case_id.startswith(prefix) for case_id in case_ids for prefix in only)
+
+    steps_sizes = QUICK["steps"] if quick else STEP_SIZES
+    ensemble_sizes = QUICK["ensemble"] if quick else ENSEMBLE_SIZES
+    image_sizes = QUICK["images"] if quick else IMAGE_SIZES
+
+    for steps in steps_sizes:
+        repeat = 3 if steps <= 10_000 else 1
+        yield f"timeline/steps={steps}", "steps/s", steps, lambda s=steps: _timeline(s), repeat
+        yield (f"stream/steps={steps}", "steps/s", steps,
+               lambda s=steps: run_streaming(_BASE, s * STEP_INTERVAL)[0], repeat)
+        yield (f"adaptive/steps={steps}", "steps/s", steps,
+               lambda s=steps: run_adaptive(_BASE, s * STEP_INTERVAL)[0], repeat)
+
+    for n_runs in ensemble_sizes:
+        steps = 40
+        yield (f"ensemble/runs={n_runs}", "steps/s", steps * n_runs,
+               lambda n=n_runs: compute_ensemble_evolution(_BASE["presion_init"], _BASE["temp_init"], _BASE["ox_init"],
+                                                           _BASE["altitud_init"], _BASE["dyn_intensity"], steps,
+                                                           STEP_INTERVAL, n, _BASE["seed"], _SPEC["temp_opt"]),
+               3 if n_runs <= 10_000 else 1)
+
+    for steps in steps_sizes:
+        if steps > 100_000 or not selected(f"payload/steps={steps}", f"scene/steps={steps}", f"html/steps={steps}",
+                                           f"dataframe_csv/steps={steps}"):
+            continue
+        tl = _timeline(steps)
+        traj, end = build_scene([tl], _SPEC["habitat"], _BASE["environment"], motion_rng(_BASE["seed"]))
+
+        def payload_json(tl=tl, traj=traj, end=end, steps=steps):
+            payload = build_payload(tl, _SPEC["habitat"], _BASE["environment"], steps, STEP_INTERVAL,
+                                    steps * STEP_INTERVAL, trajectories=traj, end=end)
+            return json.dumps(payload)
+
+        yield f"payload/steps={steps}", "steps/s", steps, payload_json, 3
+        yield (f"scene/steps={steps}", "steps/s", steps,
+               lambda tl=tl: build_scene([tl], _SPEC["habitat"], _BASE["environment"], motion_rng(_BASE["seed"])), 3)
+        payload = build_payload(tl, _SPEC["habitat"], _BASE["environment"], steps, STEP_INTERVAL, steps * STEP_INTERVAL,
+                                trajectories=traj, end=end)
+        pj = json.dumps(payload)
+        yield (f"html/steps={steps}", "steps/s", steps,
+               lambda payload=payload, pj=pj: render_animation_html(payload, pj, "bg.jpg", "sprite.png"), 3)
+
+        try:
+            import pandas as pd
+        except ImportError:
+            continue
+        from .export import timeline_columns
+
+        yield (f"dataframe_csv/steps={steps}", "steps/s", steps,
+               lambda tl=tl: pd.DataFrame(timeline_columns(tl, STEP_INTERVAL)).to_csv(index=False).encode("utf-8"), 3)
+
+    try:
+        import PIL  # noqa: F401
+    except ImportError:
+        image_sizes = ()
+    for size in image_sizes:
+        if not selected(f"asset/background/bytes={size}", f"asset/sprite/bytes={size}"):
+            continue
+        data = _png_of_size(size)
+        for kind in ("background", "sprite"):
+            yield (f"asset/{kind}/bytes={size}", "MB/s", len(data) / 1e6,
+                   lambda data=data, kind=kind: build_asset(data, kind)["bytes"], 3 if size <= 1_000_000 else 1)
+
+    steps = 40
+    for species_name in SPECIES:
+        spec = SPECIES[species_name]
+        for environment in ENVIRONMENTS:
+            def full_run(species_name=species_name, spec=spec, environment=environment):
+                tl = _timeline(steps, species_name, environment)
+                traj, end = build_scene([tl], spec["habitat"], environment, motion_rng(_BASE["seed"]))
+                return json.dumps(build_payload(tl, spec["habitat"], environment, steps, STEP_INTERVAL,
+                                                steps * STEP_INTERVAL, trajectories=traj, end=end))
+            yield f"scenario/{species_name}/{environment}", "steps/s", steps, full_run, 3
+
+
+def run_benchmarks(quick=False, only=None, repeat=None, report=None):
+    results = {}
+    for case_id, unit, units, fn, case_repeat in iter_cases(quick, only):
+        if only and not any(case_id.startswith(prefix) for prefix in only):
+            continue
+        metrics = measure(fn, repeat=repeat or case_repeat, units=units)
+        metrics["unit"] = unit
+        results[case_id] = metrics
+        if report is not None:
+            report(case_id, metrics)
+    return results
+
+
+def compare(results, baseline, threshold=0.2):
+    """Cases whose time grew by more than ``threshold`` (fraction) against the baseline."""
+    regressions = []
+    for case_id, metrics in results.items():
+        base = baseline.get("results", {}).get(case_id)
+        if base is None:
+            continue
+        ratio = metrics["seconds"] / base["seconds"] if base["seconds"] > 0 else 1.0
+        metrics["vs_baseline"] = ratio
+        if ratio > 1.0 + threshold:
+            regressions.append((case_id, ratio))
+    return regressions
+
+
+def _format(case_id, m):
+    extra = f"  out={m['output_bytes']/1e3:,.1f} KB" if "output_bytes" in m else ""
+    vs = f"  x{m['vs_baseline']:.2f} vs base" if "vs_baseline" in m else ""
+    return (f"{case_id:<58} {m['seconds']*1e3:>10.2f} ms  {m['throughput']:>14,.0f} {m['unit']:<7}"
+            f"  peak={m['peak_bytes']/1e6:,.1f} MB{extra}{vs}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m biomecanica.bench",
+                                     description="Benchmarks de simulación, payload, HTML, tablas y recursos.")
+    parser.add_argument("--quick", action="store_true", help="Tamaños reducidos (para CI)")
+    parser.add_argument("--only", action="append", help="Prefijo de caso a ejecutar (repetible), p. ej. ensemble/")
+    parser.add_argument("--repeat", type=int, default=None, help="Repeticiones por caso (por defecto según tamaño)")
+    parser.add_argument("--save-baseline", metavar="FILE", help="Guarda los resultados como línea base JSON")
+    parser.add_argument("--compare", metavar="FILE", help="Compara con una línea base JSON")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Regresión si el tiempo crece más de esta fracción")
+    args = parser.parse_args(argv)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as fh:
+            baseline = json.load(fh)
+
+    results = run_benchmarks(quick=args.quick, only=args.only, repeat=args.repeat,
+                             report=None if baseline else (lambda cid, m: print(_format(cid, m), flush=True)))
+    status = 0
+    if baseline is not None:
+        regressions = compare(results, baseline, args.threshold)
+        for case_id, m in results.items():
+            print(_format(case_id, m))
+        for case_id, ratio in regressions:
+            print(f"REGRESIÓN {case_id}: x{ratio:.2f}", file=sys.stderr)
+        status = 1 if regressions else 0
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as fh:
+            json.dump({"python": platform.python_version(), "numpy": np.__version__, "platform": platform.platform(),
+                       "created": time.strftime("%Y-%m-%dT%H:%M:%S"), "results": results}, fh, indent=2, ensure_ascii=False)
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,163 @@
+# -------------------------
+# Bounded LRU cache with TTL (thread-safe, shared across Streamlit sessions)
+# -------------------------
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+
+def estimate_nbytes(value, _seen=None):
+    """Approximate memory held by ``value``: array buffers, bytes/str lengths and
+    containers walked recursively (objects shared inside ``value`` counted once)."""
+    seen = set() if _seen is None else _seen
+    if id(value) in seen:
+        return 0
+    seen.add(id(value))
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, (bytes, bytearray, str)):
+        return sys.getsizeof(value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(estimate_nbytes(k, seen) + estimate_nbytes(v, seen) for k, v in value.items())
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return sys.getsizeof(value) + sum(estimate_nbytes(v, seen) for v in value)
+    memory_usage = getattr(value, "memory_usage", None)   # pandas DataFrame / Series
+    if callable(memory_usage):
+        try:
+            total = memory_usage(deep=True)
+            return int(total.sum() if hasattr(total, "sum") else total)
+        except TypeError:
+            pass
+    return sys.getsizeof(value)
+
+
+class LRUCache:
+    """Least-recently-used cache bounded by entry count, total size and time-to-live.
+
+    ``maxsize`` caps the number of entries (oldest-used evicted first); entries older
+    than ``ttl`` seconds are treated as misses and dropped. ``ttl=None`` disables expiry.
+    ``max_bytes`` additionally caps the summed ``sizeof(value)`` (default
+    estimate_nbytes) of the entries; a value larger than the whole budget is not kept.
+    """
+
+    def __init__(self, maxsize=128, ttl=3600.0, clock=time.monotonic, max_bytes=None, sizeof=estimate_nbytes):
+        self.maxsize = int(maxsize)
+        self.ttl = ttl
+        self.max_bytes = None if max_bytes is None else int(max_bytes)
+        self._sizeof = sizeof
+        self._clock = clock
+        self._data = OrderedDict()  # key -> (inserted_at, value, nbytes)
+        self._lock = threading.Lock()
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.rejected = 0
+
+    def _expired(self, inserted_at, now):
+        return self.ttl is not None and now - inserted_at > self.ttl
+
+    def get(self, key, default=None):
+        now = self._clock()
+        with self._lock:
+            item = self._data.get(key)
+            if item is not None:
+                if not self._expired(item[0], now):
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return item[1]
+                self.nbytes -= self._data.pop(key)[2]
+                self.expirations += 1
+            self.misses += 1
+            return default
+
+    def put(self, key, value):
+        now = self._clock()
+        size = self._sizeof(value) if self.max_bytes is not None else 0
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self.nbytes -= old[2]
+            if self.max_bytes is not None and size > self.max_bytes:
+                self.rejected += 1
+                return
+            self._data[key] = (now, value, size)
+            self.nbytes += size
+            while len(self._data) > self.maxsize or (self.max_bytes is not None and self.nbytes > self.max_bytes):
+                self.nbytes -= self._data.popitem(last=False)[1][2]
+                self.evictions += 1
+
+    def get_or_compute(self, key, compute):
+        """Return the cached value for ``key`` or call ``compute()`` and store its result."""
+        sentinel = object()
+        value = self.get(key, sentinel)
+        if value is sentinel:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.nbytes = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        item = self._data.get(key)
+        return item is not None and not self._expired(item[0], self._clock())
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "nbytes": self.nbytes,
+                "max_bytes": self.max_bytes,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "rejected": self.rejected,
+                "hit_rate": (self.hits / lookups) if lookups else 0.0,
+            }
+
+
+def scenario_key(species_name, environment, presion_init, temp_init, ox_init, altitud_init, dyn_intensity, seed,
+                 steps, step_interval, *extra):
+    """Hashable cache key for one simulated scenario (floats normalized so 25 and 25.0 collide)."""
+    return (str(species_name), str(environment), float(presion_init), float(temp_init), float(ox_init),
+            float(altitud_init), float(dyn_intensity), int(seed), int(steps), float(step_interval)) + tuple(extra)
+
+
+# -------------------------
+# Process-wide data plane: one budgeted cache for every session's immutable artifacts
+# -------------------------
+SHARED_CACHE_MB = 512        # default budget; BIOMECANICA_CACHE_MB overrides it
+SHARED_CACHE_ENTRIES = 4096
+
+_shared = None
+_shared_lock = threading.Lock()
+
+
+def shared_cache():
+    """The process's shared LRUCache (created on first use).
+
+    Uploaded assets (by content hash), timelines and the other pipeline artifacts
+    (by scenario key) and rendered pages live here once per process instead of once
+    per session, under a single memory budget. Values must be treated as read-only.
+    """
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            budget = float(os.environ.get("BIOMECANICA_CACHE_MB", SHARED_CACHE_MB))
+            _shared = LRUCache(maxsize=SHARED_CACHE_ENTRIES, ttl=3600.0, max_bytes=int(budget * 1024 * 1024))
+        return _shared
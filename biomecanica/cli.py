@@ -0,0 +1,101 @@
+# -------------------------
+# Batch command-line entry point: python -m biomecanica scenarios.(json|jsonl|csv) -o out/
+# -------------------------
+import argparse
+import csv
+import json
+import os
+import sys
+
+import numpy as np
+
+from .cache import scenario_key
+from .export import write_timeline_csv
+from .model import compute_drivers, compute_ensemble_evolution, final_verdict, normalize_scenario, run_scenario
+from .runstore import RunStore
+from .species import SPECIES
+
+
+def iter_scenarios(path):
+    """Yield raw scenario dicts from a JSON list/object, JSON Lines or CSV file (streamed where possible)."""
+    ext = os.path.splitext(path)[1].lower()
+    with open(path, encoding="utf-8", newline="") as fh:
+        if ext == ".csv":
+            yield from csv.DictReader(fh)
+        elif ext in (".jsonl", ".ndjson"):
+            for line in fh:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            data = json.load(fh)
+            if isinstance(data, dict):
+                data = data.get("scenarios", [data])
+            yield from data
+
+
+def summarize(idx, sc, timeline, n_runs=0):
+    spec = SPECIES[sc["species_name"]]
+    final_energy = timeline["energy"][-1]
+    row = {
+        "index": idx,
+        **{k: sc[k] for k in ("species_name", "environment", "presion_init", "temp_init", "ox_init",
+                              "altitud_init", "dyn_intensity", "seed", "sim_duration", "step_interval")},
+        "final_energy": final_energy,
+        "min_energy": min(timeline["energy"]),
+        "verdict": final_verdict(final_energy),
+        "drivers": compute_drivers(np.mean(timeline["temp"]), np.mean(timeline["ox"]), np.mean(timeline["pres"]),
+                                   spec["temp_opt"], spec["ox_opt"], spec["habitat"], sc["environment"]),
+    }
+    if n_runs > 0:
+        ens = compute_ensemble_evolution(sc["presion_init"], sc["temp_init"], sc["ox_init"], sc["altitud_init"],
+                                         sc["dyn_intensity"], len(timeline["energy"]), sc["step_interval"],
+                                         n_runs, sc["seed"], spec["temp_opt"])
+        row["n_runs"] = n_runs
+        row["survival_fraction"] = ens["survival_fraction"]
+    return row
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m biomecanica",
+                                     description="Ejecuta escenarios del simulador biomecánico sin Streamlit.")
+    parser.add_argument("scenarios", help="Archivo de escenarios (.json, .jsonl o .csv)")
+    parser.add_argument("-o", "--out", default="sim_out", help="Directorio de salida (por defecto: sim_out)")
+    parser.add_argument("--timelines", action="store_true", help="Escribe también la evolución completa de cada escenario en CSV")
+    parser.add_argument("--ensemble", type=int, default=0, metavar="N", help="Trayectorias Monte Carlo por escenario (0 = desactivado)")
+    parser.add_argument("--store", metavar="DB", help="Historial SQLite: reutiliza ejecuciones guardadas y registra las nuevas")
+    args = parser.parse_args(argv)
+
+    os.makedirs(args.out, exist_ok=True)
+    if args.timelines:
+        os.makedirs(os.path.join(args.out, "timelines"), exist_ok=True)
+
+    store = RunStore(args.store) if args.store else None
+    n_done = 0
+    with open(os.path.join(args.out, "summary.jsonl"), "w", encoding="utf-8") as summary_fh:
+        for idx, raw in enumerate(iter_scenarios(args.scenarios)):
+            try:
+                sc = normalize_scenario(raw)
+            except ValueError as exc:
+                parser.error(f"escenario {idx} de {args.scenarios}: {exc}")
+            if store is not None:
+                steps = int(sc["sim_duration"] / sc["step_interval"])
+                key = scenario_key(sc["species_name"], sc["environment"], sc["presion_init"], sc["temp_init"],
+                                   sc["ox_init"], sc["altitud_init"], sc["dyn_intensity"], sc["seed"], steps,
+                                   sc["step_interval"])
+                timeline = store.get_or_compute(key, sc, lambda sc=sc: run_scenario(sc))
+            else:
+                timeline = run_scenario(sc)
+            if args.timelines:
+                name = f"{idx:06d}_sim_{sc['species_name'].replace(' ','_')}.csv"
+                with open(os.path.join(args.out, "timelines", name), "w", encoding="utf-8", newline="") as fh:
+                    write_timeline_csv(fh, timeline, sc["step_interval"])
+            summary_fh.write(json.dumps(summarize(idx, sc, timeline, args.ensemble), ensure_ascii=False) + "\n")
+            summary_fh.flush()
+            n_done += 1
+
+    if store is not None:
+        stats = store.stats()
+        store.close()
+        print(f"Historial {args.store}: {stats['hits']} reutilizadas, {stats['misses']} nuevas", file=sys.stderr)
+    print(f"{n_done} escenarios → {args.out}", file=sys.stderr)
+    return 0
@@ -0,0 +1,218 @@
+# -------------------------
+# Survival envelope: inverse queries ("lowest O₂ at which … stays above 45")
+# -------------------------
+# For a species, one ``solve`` parameter is searched over a range for every point
+# of a 1-D (curve) or 2-D (surface) grid of other parameters. All grid points are
+# bisected together: each iteration is one batched evaluation of every bracket
+# midpoint. Energy never increases in the model, so a trajectory whose energy has
+# reached the threshold is decided (fails) and is dropped from the batch early.
+# The biome only changes the narrative, not the energy, so it is not an input.
+import argparse
+import csv
+import itertools
+import json
+import sys
+
+import numpy as np
+
+from .model import SURVIVAL_THRESHOLD, VERDICT_ALIVE, VERDICT_WEAK, altitude_factor, drift_noise
+from .species import SCENARIO_DEFAULTS, SIM_DURATION, SPECIES, STEP_INTERVAL
+from .sweep import SWEEP_PARAMS
+
+ENVELOPE_THRESHOLDS = (VERDICT_ALIVE, VERDICT_WEAK)   # the app's 70 / 45 verdict cuts
+
+# status of each grid point
+FOUND = 0          # boundary located within the tolerance
+ALWAYS_PASSES = 1  # the whole range passes; boundary reported as the range edge
+NEVER_PASSES = 2   # nothing in the range passes; boundary is NaN
+
+
+def passes(values, temp_opt, noises, step_interval, threshold):
+    """Bool (points, samples): final energy > ``threshold`` for each point/drift realization.
+
+    ``values`` is (points, 5) in SWEEP_PARAMS order; ``noises`` (samples, steps, 4).
+    Same arithmetic as compute_final_energy_grid, but only undecided trajectories are
+    advanced each step.
+    """
+    n_points, n_samples = len(values), len(noises)
+    steps = noises.shape[1]
+    point = np.repeat(np.arange(n_points), n_samples)
+    sample = np.tile(np.arange(n_samples), n_points)
+    pres, temp, ox, _, dyn = (values[point, k].astype(float) for k in range(5))
+    # altitude depends only on (alt0, dyn) and the realization: walk each distinct
+    # (alt0, dyn) pair once per realization for the scalar exp (see altitude_factor)
+    pairs, pair_of_point = np.unique(values[:, 3:5].astype(float).T, axis=1, return_inverse=True)
+    pair = pair_of_point.reshape(-1)[point]
+    alt_pairs = np.repeat(pairs[0][:, None], n_samples, axis=1)
+    dyn_pairs = pairs[1][:, None]
+    energy = np.full(len(point), 100.0)
+    alive = np.arange(len(point))    # indices (into the flat batch) still undecided
+    ok = np.zeros(len(point), dtype=bool)
+    for i in range(steps):
+        z = noises[sample, i]
+        pres = np.clip(pres + (z[:, 0] * 0.7) * dyn, 20.0, 200.0)
+        temp = np.clip(temp + (z[:, 1] * 0.6) * dyn, -50.0, 60.0)
+        ox = np.clip(ox + (z[:, 2] * 0.4) * dyn, 1.0, 40.0)
+        alt_pairs = np.clip(alt_pairs + (noises[:, i, 3] * 5.0) * dyn_pairs, -10000.0, 8000.0)
+
+        ox_partial = (pres / 101.3) * (ox / 21.0) * altitude_factor(alt_pairs)[pair, sample]
+        temp_penalty = np.abs(temp - temp_opt) * 0.02
+        pres_penalty = np.where(pres > 140, 0.25, 0.0) + np.where(pres < 60, 0.18, 0.0)
+        ox_factor = np.clip(ox_partial, 0.01, 2.0)
+        delta_energy = - (temp_penalty * 6 + pres_penalty * 5 + (1 - np.minimum(1.0, ox_factor)) * 12) * (step_interval / 2.0)
+        energy = np.maximum(0.0, energy + delta_energy)
+
+        keep = energy > threshold
+        if not keep.all():
+            alive, sample, energy, pres, temp, ox, pair, dyn = (a[keep] for a in
+                                                                (alive, sample, energy, pres, temp, ox, pair, dyn))
+            if not len(alive):
+                break
+    ok[alive] = True
+    return ok.reshape(n_points, n_samples)
+
+
+def _criterion(values, temp_opt, noises, step_interval, threshold, target):
+    """Bool per point: fraction of realizations above ``threshold`` >= ``target``."""
+    return passes(values, temp_opt, noises, step_interval, threshold).mean(axis=1) >= target
+
+
+def solve_envelope(species_name, solve, solve_range, grid, threshold=VERDICT_WEAK, survival_target=None,
+                   n_samples=64, find="min", base=None, seed=SCENARIO_DEFAULTS["seed"], sim_duration=SIM_DURATION,
+                   step_interval=STEP_INTERVAL, scan_points=17, tol=None):
+    """Boundary value of ``solve`` over ``grid`` where the pass criterion flips.
+
+    ``grid``: param -> 1-D values (one param → curve, two → surface); params not in
+    ``grid`` or ``solve`` come from ``base`` (defaults: SCENARIO_DEFAULTS).
+    Without ``survival_target`` the criterion is final energy > ``threshold`` for the
+    app's drift sequence of ``seed`` (the slider result). With it, the fraction of
+    ``n_samples`` realizations whose final energy > SURVIVAL_THRESHOLD must reach the target.
+    ``find="min"`` returns the lowest passing value of ``solve`` (e.g. the minimum O₂),
+    ``"max"`` the highest. The range is scanned at ``scan_points`` values to bracket
+    the first flip, then bisected to ``tol`` (default: range / 1000).
+    """
+    if solve not in SWEEP_PARAMS or any(p not in SWEEP_PARAMS or p == solve for p in grid):
+        raise ValueError(f"Parámetros válidos: {SWEEP_PARAMS} (el resuelto no puede estar en la rejilla)")
+    if find not in ("min", "max"):
+        raise ValueError("find debe ser 'min' o 'max'")
+    spec = SPECIES[species_name]
+    steps = int(sim_duration / step_interval)
+    if survival_target is None:
+        noises = drift_noise(seed, steps)[None]
+        crit_threshold, target = float(threshold), 1.0
+    else:
+        noises = np.stack([drift_noise(seed, steps, run=r) for r in range(int(n_samples))])
+        crit_threshold, target = SURVIVAL_THRESHOLD, float(survival_target)
+
+    base_values = dict(SCENARIO_DEFAULTS)
+    base_values.update(base or {})
+    grid_params = list(grid)
+    grid_axes = [np.asarray(grid[p], dtype=float) for p in grid_params]
+    shape = tuple(len(a) for a in grid_axes)
+    cells = np.array(list(itertools.product(*grid_axes))).reshape(-1, len(grid_params))
+    n_cells = len(cells)
+    solve_idx = SWEEP_PARAMS.index(solve)
+
+    def evaluate(solve_values, rows):
+        values = np.empty((len(rows), len(SWEEP_PARAMS)))
+        for k, name in enumerate(SWEEP_PARAMS):
+            values[:, k] = float(base_values[name])
+        for j, name in enumerate(grid_params):
+            values[:, SWEEP_PARAMS.index(name)] = cells[rows, j]
+        values[:, solve_idx] = solve_values
+        return _criterion(values, spec["temp_opt"], noises, step_interval, crit_threshold, target)
+
+    lo, hi = float(solve_range[0]), float(solve_range[1])
+    tol = (hi - lo) / 1000.0 if tol is None else float(tol)
+    # scan from the side that should fail towards the side that should pass
+    scan = np.linspace(lo, hi, int(scan_points)) if find == "min" else np.linspace(hi, lo, int(scan_points))
+    rows = np.repeat(np.arange(n_cells), len(scan))
+    ok = evaluate(np.tile(scan, n_cells), rows).reshape(n_cells, len(scan))
+
+    boundary = np.full(n_cells, np.nan)
+    status = np.full(n_cells, NEVER_PASSES, dtype=np.int8)
+    first = np.where(ok.any(axis=1), ok.argmax(axis=1), -1)
+    always = first == 0
+    boundary[always] = scan[0]
+    status[always] = ALWAYS_PASSES
+    bracket = np.flatnonzero(first > 0)
+    fail_v = scan[first[bracket] - 1]   # last failing scan value
+    pass_v = scan[first[bracket]]       # first passing scan value
+    evaluations = ok.size
+    while bracket.size and np.max(np.abs(pass_v - fail_v)) > tol:
+        mid = 0.5 * (fail_v + pass_v)
+        mid_ok = evaluate(mid, bracket)
+        evaluations += bracket.size
+        pass_v = np.where(mid_ok, mid, pass_v)
+        fail_v = np.where(mid_ok, fail_v, mid)
+    boundary[bracket] = pass_v
+    status[bracket] = FOUND
+
+    return {
+        "species_name": species_name,
+        "solve": solve,
+        "solve_range": (lo, hi),
+        "find": find,
+        "threshold": None if survival_target is not None else float(threshold),
+        "survival_target": survival_target,
+        "n_samples": int(len(noises)),
+        "seed": int(seed),
+        "base": {k: base_values[k] for k in SWEEP_PARAMS},
+        "grid_params": grid_params,
+        "axes": dict(zip(grid_params, grid_axes)),
+        "boundary": boundary.reshape(shape),
+        "status": status.reshape(shape),
+        "tol": tol,
+        "evaluations": int(evaluations),
+    }
+
+
+def iter_envelope_rows(result):
+    axes = [result["axes"][p] for p in result["grid_params"]]
+    for idx in itertools.product(*(range(len(a)) for a in axes)):
+        row = {p: float(a[i]) for p, a, i in zip(result["grid_params"], axes, idx)}
+        value = result["boundary"][idx]
+        row[result["solve"]] = None if np.isnan(value) else float(value)
+        row["status"] = ("encontrado", "siempre pasa", "nunca pasa")[int(result["status"][idx])]
+        yield row
+
+
+def write_envelope_csv(fh, result):
+    fields = list(result["grid_params"]) + [result["solve"], "status"]
+    writer = csv.DictWriter(fh, fieldnames=fields, lineterminator="\n")
+    writer.writeheader()
+    writer.writerows(iter_envelope_rows(result))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m biomecanica.envelope",
+                                     description="Envolvente de supervivencia: frontera de un parámetro sobre una rejilla.")
+    parser.add_argument("species", help="Especie (nombre como en la app)")
+    parser.add_argument("--solve", required=True, choices=SWEEP_PARAMS, help="Parámetro a resolver")
+    parser.add_argument("--range", type=float, nargs=2, required=True, metavar=("MIN", "MAX"))
+    parser.add_argument("--over", action="append", nargs=4, required=True, metavar=("PARAM", "MIN", "MAX", "N"),
+                        help="Eje de la rejilla (una vez = curva, dos = superficie)")
+    parser.add_argument("--threshold", type=float, default=VERDICT_WEAK, help="Energía final a superar (70 o 45)")
+    parser.add_argument("--survival", type=float, default=None, help="Probabilidad de supervivencia objetivo (0-1)")
+    parser.add_argument("--samples", type=int, default=64)
+    parser.add_argument("--find", choices=("min", "max"), default="min")
+    parser.add_argument("--base", default=None, help="JSON con los valores fijos del resto de parámetros")
+    parser.add_argument("--seed", type=int, default=SCENARIO_DEFAULTS["seed"])
+    parser.add_argument("-o", "--out", default=None, help="CSV de salida (por defecto: salida estándar)")
+    args = parser.parse_args(argv)
+
+    grid = {name: np.linspace(float(lo), float(hi), int(n)) for name, lo, hi, n in args.over}
+    result = solve_envelope(args.species, args.solve, args.range, grid, threshold=args.threshold,
+                            survival_target=args.survival, n_samples=args.samples, find=args.find,
+                            base=json.loads(args.base) if args.base else None, seed=args.seed)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8", newline="") as fh:
+            write_envelope_csv(fh, result)
+    else:
+        write_envelope_csv(sys.stdout, result)
+    print(f"{result['evaluations']} evaluaciones", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,33 @@
+# -------------------------
+# Timeline table / CSV export (same columns as the app's results_df)
+# -------------------------
+import csv
+
+from .narrative import decode_timeline_narrative
+
+TIMELINE_COLUMNS = [
+    "t (s)", "Presión (kPa)", "Temp (°C)", "Ox (%)", "Altitud (m)", "Energía", "Vel_ratio", "Narrativa (breve)",
+]
+
+
+def timeline_columns(timeline, step_interval):
+    """Column name -> list, in TIMELINE_COLUMNS order (feeds pd.DataFrame directly)."""
+    steps = len(timeline["energy"])
+    return {
+        "t (s)": [round(i*step_interval,2) for i in range(steps)],
+        "Presión (kPa)": timeline["pres"],
+        "Temp (°C)": timeline["temp"],
+        "Ox (%)": timeline["ox"],
+        "Altitud (m)": timeline["alt"],
+        "Energía": timeline["energy"],
+        "Vel_ratio": timeline["speed_ratio"],
+        "Narrativa (breve)": decode_timeline_narrative(timeline),
+    }
+
+
+def write_timeline_csv(fh, timeline, step_interval):
+    """Write the timeline to an open text file; byte-identical to ``results_df.to_csv(index=False)``."""
+    cols = timeline_columns(timeline, step_interval)
+    writer = csv.writer(fh, lineterminator="\n")
+    writer.writerow(TIMELINE_COLUMNS)
+    writer.writerows(zip(*(cols[c] for c in TIMELINE_COLUMNS)))
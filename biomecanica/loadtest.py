@@ -0,0 +1,282 @@
+# -------------------------
+# Headless load test: many concurrent simulated sessions against the app script
+# -------------------------
+# Each virtual session is a streamlit.testing AppTest (its own session state) that
+# runs streamlit_app.py in this process, so st.cache_resource and cache.shared_cache()
+# are shared between sessions exactly as on a server. Sessions run on a thread pool;
+# after the first page load every rerun changes one sidebar widget, like a student
+# moving a slider. Reported: first-load and rerun latency percentiles, process RSS
+# (sampled while the test runs) and the shared cache's memory use.
+# The sessions publish their uploads like the app does: into static/ next to the
+# app unless BIOMECANICA_STATIC_DIR points elsewhere (the CLI uses a temp directory).
+import argparse
+import io
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+import numpy as np
+
+from .cache import shared_cache
+from .species import ENVIRONMENTS, SPECIES
+
+DEFAULT_APP = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "streamlit_app.py")
+PERCENTILES = (50, 90, 99)
+
+# (widget kind, key, random value) for the rerun actions
+ACTIONS = (
+    ("slider", "temp_init", lambda rng: int(rng.integers(-30, 61))),
+    ("slider", "ox_init", lambda rng: int(rng.integers(1, 41))),
+    ("slider", "presion_init", lambda rng: round(float(rng.uniform(20.0, 200.0)), 1)),
+    ("slider", "dyn_intensity", lambda rng: round(float(rng.integers(0, 21)) * 0.05, 2)),
+    ("selectbox", "environment", lambda rng: ENVIRONMENTS[int(rng.integers(len(ENVIRONMENTS)))]),
+    ("selectbox", "species_name", lambda rng: list(SPECIES)[int(rng.integers(len(SPECIES)))]),
+    ("number_input", "seed", lambda rng: int(rng.integers(0, 1000))),
+)
+
+
+def _session_script(app_path):
+    """Body of every virtual session (AppTest runs it as the page script)."""
+    import runpy
+
+    runpy.run_path(app_path, run_name="__main__")
+
+
+class _Upload:
+    def __init__(self, data):
+        self._data = data
+
+    def getvalue(self):
+        return self._data
+
+
+@contextmanager
+def fake_uploads(background, sprite):
+    """Make ``st.sidebar.file_uploader`` return ``background`` / ``sprite`` (by label) until exit.
+
+    Patched once around the whole test rather than per session: concurrent sessions
+    share the module-level ``st.sidebar``, so a per-run restore would race.
+    """
+    import streamlit as st
+
+    files = {"background": _Upload(background), "sprite": _Upload(sprite)}
+    sidebar = st.sidebar
+    previous = vars(sidebar).get("file_uploader")
+    sidebar.file_uploader = lambda label, *a, **k: files["sprite" if "sprite" in label.lower() else "background"]
+    try:
+        yield
+    finally:
+        if previous is None:
+            del sidebar.file_uploader
+        else:
+            sidebar.file_uploader = previous
+
+
+def demo_images():
+    """(background JPEG, sprite PNG) bytes for sessions that do not upload their own."""
+    from PIL import Image, ImageDraw
+
+    yy, xx = np.mgrid[0:600, 0:1200]
+    sky = np.stack([60 + xx * 100 // 1200, 120 + yy * 80 // 600, 200 - yy * 120 // 600], axis=-1).astype(np.uint8)
+    buf = io.BytesIO()
+    Image.fromarray(sky).save(buf, "JPEG", quality=85)
+    sprite = Image.new("RGBA", (300, 200), (0, 0, 0, 0))
+    ImageDraw.Draw(sprite).ellipse((20, 40, 280, 180), fill=(120, 90, 40, 255))
+    out = io.BytesIO()
+    sprite.save(out, "PNG")
+    return buf.getvalue(), out.getvalue()
+
+
+def rss_bytes():
+    """Resident set size of this process (peak RSS where /proc is unavailable)."""
+    try:
+        with open("/proc/self/statm") as fh:
+            return int(fh.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+class _RSSSampler(threading.Thread):
+    def __init__(self, interval=0.1):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.peak = rss_bytes()
+        self._done = threading.Event()
+
+    def run(self):
+        while not self._done.wait(self.interval):
+            self.peak = max(self.peak, rss_bytes())
+
+    def stop(self):
+        self._done.set()
+        self.join()
+        self.peak = max(self.peak, rss_bytes())
+
+
+def run_session(index, reruns, app_path, seed=0, timeout=120.0):
+    """One virtual session: first load plus ``reruns`` widget changes. Returns timings and errors.
+
+    Uploads come from an enclosing fake_uploads() block.
+    """
+    from streamlit.testing.v1 import AppTest
+
+    rng = np.random.default_rng([int(seed), int(index)])
+    at = AppTest.from_function(_session_script, default_timeout=timeout, kwargs={"app_path": app_path})
+    start = time.perf_counter()
+    at.run()
+    first = time.perf_counter() - start
+    errors = [str(e.value) for e in at.exception]
+    latencies = []
+    for _ in range(int(reruns)):
+        kind, key, value = ACTIONS[int(rng.integers(len(ACTIONS)))]
+        widget = getattr(at.sidebar, kind)(key=key)
+        widget.set_value(value(rng))
+        start = time.perf_counter()
+        at.run()
+        latencies.append(time.perf_counter() - start)
+        errors += [str(e.value) for e in at.exception]
+    return {"index": int(index), "first": first, "reruns": latencies, "errors": errors}
+
+
+def _latency_stats(values):
+    if not values:
+        return None
+    arr = np.asarray(values) * 1000.0
+    out = {f"p{q}_ms": float(np.percentile(arr, q)) for q in PERCENTILES}
+    out.update(mean_ms=float(arr.mean()), max_ms=float(arr.max()), count=int(arr.size))
+    return out
+
+
+def run_load_test(sessions=20, reruns=5, concurrency=8, app_path=DEFAULT_APP, background=None, sprite=None, seed=0,
+                  timeout=120.0, progress=None):
+    """Drive ``sessions`` virtual sessions (``concurrency`` at a time) through the app; returns a report dict.
+
+    ``background`` / ``sprite`` are image bytes (default: demo_images()). The caller
+    sets BIOMECANICA_* variables (run store, cache budget, static dir) before calling;
+    without BIOMECANICA_STATIC_DIR the assets are written to the app's static/ folder.
+    """
+    if background is None or sprite is None:
+        demo_bg, demo_sprite = demo_images()
+        background = demo_bg if background is None else background
+        sprite = demo_sprite if sprite is None else sprite
+    rss_start = rss_bytes()
+    sampler = _RSSSampler()
+    sampler.start()
+    results = []
+    lock = threading.Lock()
+
+    def job(index):
+        result = run_session(index, reruns, app_path, seed, timeout)
+        with lock:
+            results.append(result)
+            if progress is not None:
+                progress(len(results), int(sessions))
+        return result
+
+    from streamlit import config
+    # AppTest switches global.appTest on around each run and restores the previous value
+    # afterwards; keep it on for the whole test so overlapping runs cannot switch it off
+    app_test_option = config.get_option("global.appTest")
+    config.set_option("global.appTest", True)
+    start = time.perf_counter()
+    try:
+        with fake_uploads(background, sprite), ThreadPoolExecutor(max_workers=max(1, int(concurrency))) as pool:
+            list(pool.map(job, range(int(sessions))))
+    finally:
+        sampler.stop()
+        config.set_option("global.appTest", app_test_option)
+    wall = time.perf_counter() - start
+
+    rerun_latencies = [t for r in results for t in r["reruns"]]
+    errors = [e for r in results for e in r["errors"]]
+    return {
+        "sessions": int(sessions),
+        "reruns_per_session": int(reruns),
+        "concurrency": int(concurrency),
+        "wall_seconds": wall,
+        "reruns_per_second": (len(rerun_latencies) + len(results)) / wall if wall > 0 else 0.0,
+        "first_load": _latency_stats([r["first"] for r in results]),
+        "rerun": _latency_stats(rerun_latencies),
+        "rss_start_bytes": rss_start,
+        "rss_peak_bytes": sampler.peak,
+        "rss_end_bytes": rss_bytes(),
+        "shared_cache": shared_cache().stats(),
+        "errors": len(errors),
+        "error_samples": sorted(set(errors))[:5],
+    }
+
+
+def format_report(report):
+    mb = 1024 * 1024
+    lines = [f"{report['sessions']} sesiones × {report['reruns_per_session']} reejecuciones "
+             f"(concurrencia {report['concurrency']}) en {report['wall_seconds']:.1f} s "
+             f"({report['reruns_per_second']:.1f} ejecuciones/s)"]
+    for label, key in (("Carga inicial", "first_load"), ("Reejecución", "rerun")):
+        stats = report[key]
+        if stats:
+            lines.append(f"{label}: p50 {stats['p50_ms']:.0f} ms · p90 {stats['p90_ms']:.0f} ms · "
+                         f"p99 {stats['p99_ms']:.0f} ms · máx {stats['max_ms']:.0f} ms (n={stats['count']})")
+    cache = report["shared_cache"]
+    lines.append(f"RSS: inicio {report['rss_start_bytes']/mb:.0f} MB · pico {report['rss_peak_bytes']/mb:.0f} MB · "
+                 f"final {report['rss_end_bytes']/mb:.0f} MB")
+    budget = f"{cache['max_bytes']/mb:.0f} MB" if cache["max_bytes"] else "sin límite"
+    lines.append(f"Caché compartida: {cache['nbytes']/mb:.1f} MB / {budget} · {cache['size']} entradas · "
+                 f"aciertos {cache['hit_rate']*100:.0f} % · expulsadas {cache['evictions']}")
+    lines.append(f"Errores: {report['errors']}" + (f" (p. ej. {report['error_samples'][0]})" if report["errors"] else ""))
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m biomecanica.loadtest",
+                                     description="Prueba de carga: sesiones simultáneas simuladas contra la app.")
+    parser.add_argument("--sessions", type=int, default=20, help="Sesiones virtuales")
+    parser.add_argument("--reruns", type=int, default=5, help="Reejecuciones por sesión (un widget cambia en cada una)")
+    parser.add_argument("--concurrency", type=int, default=8, help="Sesiones ejecutándose a la vez")
+    parser.add_argument("--app", default=DEFAULT_APP, help="Script de la app (por defecto: streamlit_app.py)")
+    parser.add_argument("--background", default=None, help="Imagen de fondo (por defecto: generada)")
+    parser.add_argument("--sprite", default=None, help="Sprite PNG (por defecto: generado)")
+    parser.add_argument("--cache-mb", type=float, default=None, help="Presupuesto de la caché compartida (MB)")
+    parser.add_argument("--run-store", default=None, help="Historial SQLite (por defecto: uno temporal)")
+    parser.add_argument("--static-dir", default=None,
+                        help="Carpeta donde se publican las imágenes (por defecto: una temporal, no static/)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--timeout", type=float, default=120.0, help="Tiempo máximo por ejecución (s)")
+    parser.add_argument("--json", action="store_true", help="Imprime el informe como JSON")
+    args = parser.parse_args(argv)
+
+    def read(path):
+        if path is None:
+            return None
+        with open(path, "rb") as fh:
+            return fh.read()
+
+    # widget-policy and deprecation warnings from every virtual session would drown the report
+    from streamlit import config
+    from streamlit.logger import set_log_level
+    config.set_option("logger.level", "error")
+    set_log_level("error")
+    if args.cache_mb is not None:
+        os.environ["BIOMECANICA_CACHE_MB"] = str(args.cache_mb)
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["BIOMECANICA_RUN_STORE"] = args.run_store or os.path.join(tmp, "runs.sqlite")
+        os.environ["BIOMECANICA_STATIC_DIR"] = args.static_dir or os.path.join(tmp, "static")
+
+        def report_progress(done, total):
+            print(f"\r{done}/{total} sesiones", end="", file=sys.stderr)
+
+        report = run_load_test(args.sessions, args.reruns, args.concurrency, args.app, read(args.background),
+                               read(args.sprite), args.seed, args.timeout, progress=report_progress)
+        print(file=sys.stderr)
+    print(json.dumps(report, indent=2, ensure_ascii=False) if args.json else format_report(report))
+    return 1 if report["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,301 @@
+# -------------------------
+# Physics/biomech model (no Streamlit / pandas dependency)
+# -------------------------
+import math
+
+import numpy as np
+
+from .rng import drift_rng, ensemble_block_rng
+from .narrative import condition_mask, habitat_mask
+from .species import BIOMES, SPECIES, SCENARIO_DEFAULTS, SIM_DURATION, STEP_INTERVAL
+
+# Verdict thresholds on final energy (0–100)
+VERDICT_ALIVE = 70.0
+VERDICT_WEAK = 45.0
+SURVIVAL_THRESHOLD = VERDICT_WEAK  # same cut as the "DEBIL" verdict
+
+ENSEMBLE_PERCENTILES = (5, 25, 50, 75, 95)
+
+
+def compute_stepwise_evolution(presion0, temp0, ox0, alt0, dyn_intensity, steps, step_interval,
+                               temp_opt, habitat, environment, rng=None):
+    """Single trajectory. ``rng`` is a ``np.random.Generator`` (see rng.drift_rng); a fresh unseeded one if omitted."""
+    randn = (rng if rng is not None else np.random.default_rng()).standard_normal
+
+    pres = presion0
+    temp = temp0
+    ox = ox0
+    alt = alt0
+
+    pres_arr = []; temp_arr = []; ox_arr = []; alt_arr = []
+    energy_arr = []; speed_ratio_arr = []; ox_factor_arr = []; conditions_arr = []
+
+    base_mask = habitat_mask(habitat, environment)
+
+    energy = 100.0
+
+    for i in range(steps):
+        # small deterministic time increment
+        t = i * step_interval
+
+        # dynamic drift: random walk scaled by intensity
+        pres += (randn() * 0.7) * dyn_intensity
+        temp += (randn() * 0.6) * dyn_intensity
+        ox += (randn() * 0.4) * dyn_intensity
+        alt += (randn() * 5.0) * dyn_intensity
+
+        # clamp realistic ranges
+        pres = float(max(20.0, min(200.0, pres)))
+        temp = float(max(-50.0, min(60.0, temp)))
+        ox = float(max(1.0, min(40.0, ox)))
+        alt = float(max(-10000.0, min(8000.0, alt)))
+
+        # oxygen partial approx: pressure * O2 fraction adjusted by altitude
+        ox_partial = (pres / 101.3) * (ox / 21.0) * math.exp(-alt / 7000.0)
+
+        temp_diff = temp - temp_opt
+        temp_penalty = max(0.0, abs(temp_diff) * 0.02)  # linear penalty
+        pres_penalty = 0.0
+        if pres > 140: pres_penalty += 0.25
+        if pres < 60: pres_penalty += 0.18
+
+        ox_factor = max(0.01, min(2.0, ox_partial))
+
+        # energy decrement: combine penalties
+        delta_energy = - (temp_penalty * 6 + pres_penalty * 5 + (1 - min(1.0, ox_factor)) * 12) * (step_interval / 2.0)
+        energy = max(0.0, energy + delta_energy)
+
+        speed_ratio = max(0.02, math.sqrt(energy / 100.0))
+
+        # narrative (decoded on demand from the condition bitmask)
+        conditions = condition_mask(temp_diff, ox_factor, pres, alt, base_mask)
+
+        pres_arr.append(pres); temp_arr.append(temp); ox_arr.append(ox); alt_arr.append(alt)
+        energy_arr.append(energy); speed_ratio_arr.append(speed_ratio); ox_factor_arr.append(ox_factor); conditions_arr.append(conditions)
+
+    return {
+        "pres": pres_arr, "temp": temp_arr, "ox": ox_arr, "alt": alt_arr,
+        "energy": energy_arr, "speed_ratio": speed_ratio_arr, "ox_factor": ox_factor_arr, "conditions": conditions_arr,
+        "temp_opt": temp_opt,
+    }
+
+
+# -------------------------
+# Monte Carlo ensemble: N trajectories advanced together as NumPy arrays
+# -------------------------
+# runs per RNG block; blocks are the unit of parallel work. Part of the result's
+# identity: run r draws from block r // ENSEMBLE_BLOCK, so another block size gives
+# other random streams (a different, equally valid ensemble).
+ENSEMBLE_BLOCK = 4096
+
+
+def _ensemble_blocks(n_runs, block_size):
+    return [(j, min(block_size, n_runs - start)) for j, start in enumerate(range(0, n_runs, block_size))]
+
+
+def _ensemble_block_energy(presion0, temp0, ox0, alt0, dyn_intensity, steps, step_interval, seed, temp_opt, block, size):
+    """Worker: full (steps, size) energy path of one ensemble block, drawn from its own stream."""
+    state = _EnsembleBlock(presion0, temp0, ox0, alt0, dyn_intensity, seed, block, size)
+    out = np.empty((steps, size))
+    for i in range(steps):
+        out[i] = state.step(temp_opt, step_interval)
+    return block, out
+
+
+class _EnsembleBlock:
+    """Current state of one block of ensemble runs (O(size) memory)."""
+
+    def __init__(self, presion0, temp0, ox0, alt0, dyn_intensity, seed, block, size):
+        self.rng = ensemble_block_rng(seed, block)
+        self.pres = np.full(size, float(presion0))
+        self.temp = np.full(size, float(temp0))
+        self.ox = np.full(size, float(ox0))
+        self.alt = np.full(size, float(alt0))
+        self.energy = np.full(size, 100.0)
+        self.drift_scale = np.array([0.7, 0.6, 0.4, 5.0])[:, None] * dyn_intensity
+
+    def step(self, temp_opt, step_interval):
+        # dynamic drift for all trajectories at once (rows: pres, temp, ox, alt)
+        drift = self.rng.standard_normal((4, len(self.energy))) * self.drift_scale
+        self.pres = np.clip(self.pres + drift[0], 20.0, 200.0)
+        self.temp = np.clip(self.temp + drift[1], -50.0, 60.0)
+        self.ox = np.clip(self.ox + drift[2], 1.0, 40.0)
+        self.alt = np.clip(self.alt + drift[3], -10000.0, 8000.0)
+
+        ox_partial = (self.pres / 101.3) * (self.ox / 21.0) * np.exp(-self.alt / 7000.0)
+        temp_penalty = np.abs(self.temp - temp_opt) * 0.02
+        pres_penalty = np.where(self.pres > 140, 0.25, 0.0) + np.where(self.pres < 60, 0.18, 0.0)
+        ox_factor = np.clip(ox_partial, 0.01, 2.0)
+
+        delta_energy = - (temp_penalty * 6 + pres_penalty * 5 + (1 - np.minimum(1.0, ox_factor)) * 12) * (step_interval / 2.0)
+        self.energy = np.maximum(0.0, self.energy + delta_energy)
+        return self.energy
+
+
+def compute_ensemble_evolution(presion0, temp0, ox0, alt0, dyn_intensity, steps, step_interval, n_runs, seed,
+                               temp_opt, percentiles=ENSEMBLE_PERCENTILES, workers=0, block_size=ENSEMBLE_BLOCK):
+    """Same model as compute_stepwise_evolution, vectorized over n_runs trajectories.
+
+    Runs are grouped in blocks of ``block_size``, each with its own RNG stream
+    (rng.ensemble_block_rng), so the result is bit-identical whatever ``workers`` is.
+    It is not independent of ``block_size``: changing it regroups the runs into other
+    streams (e.g. ``block_size=1000`` does not reproduce the default 4096), so
+    compare or cache ensembles only at the same seed *and* block size.
+    ``workers=0`` advances all blocks in-process keeping only the current state
+    (O(n_runs) memory); otherwise blocks run on a process pool and return their paths.
+    """
+    n = int(n_runs)
+    blocks = _ensemble_blocks(n, int(block_size))
+    energy_bands = np.empty((len(percentiles), steps))
+    speed_bands = np.empty((len(percentiles), steps))
+    energy_mean = np.empty(steps)
+
+    def reduce_step(i, energy):
+        speed_ratio = np.maximum(0.02, np.sqrt(energy / 100.0))
+        energy_bands[:, i] = np.percentile(energy, percentiles)
+        speed_bands[:, i] = np.percentile(speed_ratio, percentiles)
+        energy_mean[i] = energy.mean()
+
+    if workers == 0:
+        states = [_EnsembleBlock(presion0, temp0, ox0, alt0, dyn_intensity, seed, j, size) for j, size in blocks]
+        energy = np.empty(n)
+        for i in range(steps):
+            for (j, size), state in zip(blocks, states):
+                energy[j * block_size:j * block_size + size] = state.step(temp_opt, step_interval)
+            reduce_step(i, energy)
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+
+        paths = np.empty((steps, n))
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(_ensemble_block_energy, presion0, temp0, ox0, alt0, dyn_intensity, steps,
+                                   step_interval, seed, temp_opt, j, size) for j, size in blocks]
+            for fut in futures:
+                j, out = fut.result()
+                paths[:, j * block_size:j * block_size + out.shape[1]] = out
+        for i in range(steps):
+            reduce_step(i, paths[i])
+        energy = paths[-1].copy()
+
+    return {
+        "percentiles": list(percentiles),
+        "energy_bands": energy_bands,
+        "speed_bands": speed_bands,
+        "energy_mean": energy_mean,
+        "final_energy": energy,
+        "survival_fraction": float(np.mean(energy > SURVIVAL_THRESHOLD)),
+    }
+
+
+# -------------------------
+# Grid evaluation: many initial conditions sharing one seeded drift sequence
+# -------------------------
+def drift_noise(seed, steps, run=0):
+    """The (steps, 4) standard-normal draws the single-run model consumes for ``seed`` (pres, temp, ox, alt)."""
+    return drift_rng(seed, run).standard_normal((steps, 4))
+
+
+def altitude_factor(alt):
+    """exp(-alt / 7000) per element with math.exp (np.exp may differ in the last ulp from the scalar model)."""
+    alt = np.asarray(alt, dtype=float)
+    return np.fromiter((math.exp(-a / 7000.0) for a in alt.ravel().tolist()), float, alt.size).reshape(alt.shape)
+
+
+def compute_final_energy_grid(presion0, temp0, ox0, alt0, dyn_intensity, temp_opt, noise, step_interval):
+    """Final energy for arrays of scenarios (broadcast together), all driven by the same ``noise``.
+
+    With ``noise = drift_noise(seed, steps)`` every element matches what
+    compute_stepwise_evolution returns for that scenario and seed.
+    """
+    pres, temp, ox, alt, dyn, t_opt = np.broadcast_arrays(
+        *(np.asarray(a, dtype=float) for a in (presion0, temp0, ox0, alt0, dyn_intensity, temp_opt)))
+    pres = pres.copy(); temp = temp.copy(); ox = ox.copy()
+    # altitude depends only on (alt0, dyn): walk each distinct pair once (sweeps and the
+    # surrogate table have few), so the scalar exp below stays cheap
+    pairs, inverse = np.unique(np.stack([alt.ravel(), dyn.ravel()]), axis=1, return_inverse=True)
+    inverse = inverse.reshape(alt.shape)
+    alt_u, dyn_u = pairs[0].copy(), pairs[1]
+    energy = np.full(pres.shape, 100.0)
+    for z_pres, z_temp, z_ox, z_alt in noise:
+        pres = np.clip(pres + (z_pres * 0.7) * dyn, 20.0, 200.0)
+        temp = np.clip(temp + (z_temp * 0.6) * dyn, -50.0, 60.0)
+        ox = np.clip(ox + (z_ox * 0.4) * dyn, 1.0, 40.0)
+        alt_u = np.clip(alt_u + (z_alt * 5.0) * dyn_u, -10000.0, 8000.0)
+
+        altitude_term = altitude_factor(alt_u)[inverse]
+        ox_partial = (pres / 101.3) * (ox / 21.0) * altitude_term
+        temp_penalty = np.abs(temp - t_opt) * 0.02
+        pres_penalty = np.where(pres > 140, 0.25, 0.0) + np.where(pres < 60, 0.18, 0.0)
+        ox_factor = np.clip(ox_partial, 0.01, 2.0)
+
+        delta_energy = - (temp_penalty * 6 + pres_penalty * 5 + (1 - np.minimum(1.0, ox_factor)) * 12) * (step_interval / 2.0)
+        energy = np.maximum(0.0, energy + delta_energy)
+    return energy
+
+
+# -------------------------
+# Summary helpers (verdict + drivers), shared by the app and the CLI
+# -------------------------
+VERDICT_DEAD, VERDICT_WEAK_CODE, VERDICT_ALIVE_CODE = 0, 1, 2
+VERDICT_LABELS = {VERDICT_DEAD: "MUERTO", VERDICT_WEAK_CODE: "DEBIL", VERDICT_ALIVE_CODE: "VIVO"}
+
+
+def verdict_codes(final_energy):
+    """Vectorized verdict category (0 = muerto, 1 = débil, 2 = vivo) with the same cuts as final_verdict."""
+    final_energy = np.asarray(final_energy)
+    return (final_energy > VERDICT_WEAK).astype(np.int8) + (final_energy > VERDICT_ALIVE).astype(np.int8)
+
+
+def final_verdict(final_energy):
+    if final_energy > VERDICT_ALIVE:
+        return "VIVO — funcionamiento relativamente normal"
+    elif final_energy > VERDICT_WEAK:
+        return "DEBIL — sobrevive con signos claros de fatiga y estrés"
+    return "MUERTO / COLAPSADO — fallo por condiciones hostiles"
+
+
+def compute_drivers(avg_temp, avg_ox, avg_pres, temp_opt, ox_opt, habitat, environment):
+    drivers = []
+    avg_temp_dev = abs(avg_temp - temp_opt)
+    avg_ox_dev = abs(avg_ox - ox_opt)
+    if avg_temp_dev > 5:
+        drivers.append(f"La temperatura media se desvió ~{avg_temp_dev:.1f}°C respecto al óptimo ({temp_opt}°C), afectando rendimiento enzimático y fuerza.")
+    if avg_ox_dev > 3:
+        drivers.append(f"El oxígeno funcional se desvió ~{avg_ox_dev:.1f}% respecto al óptimo ({ox_opt}%), exponiendo al animal a hipoxia parcial.")
+    if avg_pres > 140:
+        drivers.append("La presión media fue elevada, con riesgo de compresión y problemas ventilatorios.")
+    if BIOMES.is_marine(environment) and habitat != "marino":
+        drivers.append("El bioma marino impone flotabilidad y asfixia a organismos terrestres/voladores: hundimiento y falla respiratoria rápida.")
+    return drivers
+
+
+# -------------------------
+# Scenario entry point (dict in, timeline out) — same seeding as the app
+# -------------------------
+def normalize_scenario(scenario):
+    """Fill missing keys from SCENARIO_DEFAULTS and coerce types the way the sidebar widgets do."""
+    sc = dict(SCENARIO_DEFAULTS)
+    sc.update({k: v for k, v in scenario.items() if v is not None and v != ""})
+    if sc["species_name"] not in SPECIES:
+        raise ValueError(f"Especie desconocida: {sc['species_name']!r}")
+    if sc["environment"] not in BIOMES:
+        raise ValueError(f"Bioma desconocido: {sc['environment']!r} (disponibles: {', '.join(BIOMES.names)})")
+    sc["presion_init"] = float(sc["presion_init"])
+    sc["temp_init"] = int(float(sc["temp_init"]))
+    sc["ox_init"] = int(float(sc["ox_init"]))
+    sc["altitud_init"] = int(float(sc["altitud_init"]))
+    sc["dyn_intensity"] = float(sc["dyn_intensity"])
+    sc["seed"] = int(float(sc["seed"]))
+    sc["sim_duration"] = float(sc.get("sim_duration", SIM_DURATION))
+    sc["step_interval"] = float(sc.get("step_interval", STEP_INTERVAL))
+    return sc
+
+
+def run_scenario(scenario):
+    sc = normalize_scenario(scenario)
+    spec = SPECIES[sc["species_name"]]
+    steps = int(sc["sim_duration"] / sc["step_interval"])
+    rng = drift_rng(sc["seed"])
+    return compute_stepwise_evolution(sc["presion_init"], sc["temp_init"], sc["ox_init"], sc["altitud_init"],
+                                      sc["dyn_intensity"], steps, sc["step_interval"],
+                                      spec["temp_opt"], spec["habitat"], sc["environment"], rng=rng)
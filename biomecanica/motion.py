@@ -0,0 +1,197 @@
+# -------------------------
+# Per-habitat movement rules (deterministic, vectorized over agents)
+# -------------------------
+# Port of the rules the animation used to apply in JS: terrestrial agents walk and
+# bounce inside their band, flyers hold altitude until energy drops, marine agents
+# swim towards random targets underwater and slide/fade out of the water.
+import numpy as np
+
+from .payload import CONTAINER_HEIGHT, CONTAINER_WIDTH
+from .registry import HABITATS
+from .species import BIOMES, REGION
+
+HAB_TERRESTRE, HAB_MARINO, HAB_VOLADOR = range(3)
+
+FILTER_NONE, FILTER_TIRED, FILTER_CRITICAL = 0, 1, 2
+
+DEATH_NONE = 0
+DEATH_SUNK = 1
+DEATH_FALL = 2
+DEATH_OUT_OF_WATER = 3
+DEATH_CRITICAL_ENERGY = 4
+DEATH_REASONS = {
+    DEATH_NONE: "",
+    DEATH_SUNK: "Hundimiento/Asfixia en ambiente marino.",
+    DEATH_FALL: "Caída/impacto fatal o inmersión (volador).",
+    DEATH_OUT_OF_WATER: "Exposición fuera del agua: fallo respiratorio.",
+    DEATH_CRITICAL_ENERGY: "Fallo sistémico por energía crítica baja.",
+}
+
+CRITICAL_ENERGY = 2  # energy (rounded) at which the animation kills the animal
+
+
+def js_round(x):
+    """Math.round semantics (halves go towards +inf), unlike NumPy's round-half-even."""
+    return np.floor(np.asarray(x, dtype=float) + 0.5)
+
+
+def compute_trajectories(speed, energy, habitat, environment, rng, width=CONTAINER_WIDTH, height=CONTAINER_HEIGHT,
+                         start_x=None):
+    """Sprite trajectories for ``n`` agents over ``steps`` simulation steps.
+
+    ``speed`` / ``energy``: arrays of shape (n, steps); ``habitat``: habitat name or
+    array of habitat codes per agent; ``rng``: ``np.random.Generator`` for the marine
+    swim targets. Positions have ``steps + 1`` samples (index 0 is the start) and stay
+    frozen after an agent dies.
+    """
+    speed = np.atleast_2d(np.asarray(speed, dtype=float))
+    energy_r = js_round(np.atleast_2d(energy))
+    n, steps = speed.shape
+    if isinstance(habitat, str):
+        hab = np.full(n, HABITATS.index(habitat), dtype=np.int8)
+    else:
+        hab = np.asarray(habitat, dtype=np.int8)
+    marine_env = BIOMES.is_marine(environment)
+
+    y_min_frac = np.array([REGION[h]["y_min_frac"] for h in HABITATS])[hab]
+    y_max_frac = np.array([REGION[h]["y_max_frac"] for h in HABITATS])[hab]
+    y_min = np.floor(y_min_frac * height)
+    y_max = np.floor(y_max_frac * height)
+    x_min = float(np.floor(0.05 * width))
+    x_max = float(np.floor(0.92 * width))
+
+    x = np.full(n, np.floor((x_min + x_max) / 8)) if start_x is None else np.asarray(start_x, dtype=float).copy()
+    y = np.where(hab == HAB_VOLADOR, np.floor(height * 0.08),
+                 np.where(hab == HAB_MARINO, np.floor(height * 0.12), np.floor(y_min + (y_max - y_min) * 0.05)))
+    direction = np.ones(n)
+    opacity = np.ones(n)
+    died = np.zeros(n, dtype=bool)
+    death_step = np.full(n, steps - 1, dtype=np.int32)
+    death_reason = np.zeros(n, dtype=np.int8)
+
+    xs = np.empty((n, steps + 1)); ys = np.empty((n, steps + 1))
+    opac = np.empty((n, steps + 1)); rot = np.zeros((n, steps + 1)); filt = np.zeros((n, steps + 1), dtype=np.int8)
+    xs[:, 0] = x; ys[:, 0] = y; opac[:, 0] = 1.0
+
+    is_ter = hab == HAB_TERRESTRE
+    is_fly = hab == HAB_VOLADOR
+    is_mar = hab == HAB_MARINO
+
+    for step in range(steps):
+        sr = speed[:, step]
+        e = energy_r[:, step]
+        active = ~died
+        targets = rng.random((2, n))  # drawn every step for every agent so streams stay aligned
+        new_x = x.copy(); new_y = y.copy(); new_op = opacity.copy(); new_dir = direction.copy()
+        dies_now = np.zeros(n, dtype=bool)
+        reason_now = np.zeros(n, dtype=np.int8)
+
+        # terrestre: walk horizontally in the bottom band, small bob, bounce at edges
+        tx = x + js_round((4 + 18 * sr) * direction)
+        ty = np.floor(y_min + (y_max - y_min) * 0.06) + js_round(np.sin(step * 0.6) * 4)
+        t_dir = np.where(tx >= x_max, -1.0, np.where(tx <= x_min, 1.0, direction))
+        tx = np.clip(tx, x_min, x_max)
+        if marine_env:
+            ty = ty + js_round((1.0 - sr) * 8)
+        t_op = np.maximum(0.12, e / 100) if marine_env else opacity
+        t_die = (ty > height - 80) if marine_env else np.zeros(n, dtype=bool)
+        new_x = np.where(is_ter, tx, new_x); new_y = np.where(is_ter, ty, new_y)
+        new_dir = np.where(is_ter, t_dir, new_dir); new_op = np.where(is_ter, t_op, new_op)
+        dies_now |= is_ter & t_die
+        reason_now = np.where(is_ter & t_die, DEATH_SUNK, reason_now)
+
+        # volador: horizontal flight, descend when energy < 60
+        fx = x + js_round((6 + 24 * sr) * direction)
+        f_dir = np.where(fx >= x_max, -1.0, np.where(fx <= x_min, 1.0, direction))
+        fx = np.clip(fx, x_min, x_max)
+        fy = np.where(e < 60, y + js_round((60 - e) / 10.0),
+                      np.maximum(5, np.minimum(np.floor(y_max * 0.6), y + js_round(np.sin(step * 0.7) * 3))))
+        if marine_env:
+            fy = np.where(e < 30, fy + 6 + js_round((30 - e) / 6.0), fy)
+        f_op = np.maximum(0.2, e / 100)
+        f_die = fy > height - 80
+        new_x = np.where(is_fly, fx, new_x); new_y = np.where(is_fly, fy, new_y)
+        new_dir = np.where(is_fly, f_dir, new_dir); new_op = np.where(is_fly, f_op, new_op)
+        dies_now |= is_fly & f_die
+        reason_now = np.where(is_fly & f_die, DEATH_FALL, reason_now)
+
+        # marino: swim towards random targets underwater; slide and fade out of the water
+        if marine_env:
+            gain = 0.18 + 0.7 * sr
+            target_x = np.floor(targets[0] * (x_max - x_min) + x_min)
+            target_y = np.floor(targets[1] * (y_max - y_min) + y_min)
+            mx = js_round(x + (target_x - x) * gain)
+            my = js_round(y + (target_y - y) * gain)
+            m_op = np.maximum(0.25, e / 100)
+            m_die = np.zeros(n, dtype=bool)
+        else:
+            mx = x
+            my = y + js_round((1.0 - sr) * 8)
+            m_op = np.maximum(0.05, e / 100)
+            m_die = my > height - 80
+        new_x = np.where(is_mar, mx, new_x); new_y = np.where(is_mar, my, new_y); new_op = np.where(is_mar, m_op, new_op)
+        dies_now |= is_mar & m_die
+        reason_now = np.where(is_mar & m_die, DEATH_OUT_OF_WATER, reason_now)
+
+        # visual state by energy
+        level = np.where(e < 30, FILTER_CRITICAL, np.where(e < 60, FILTER_TIRED, FILTER_NONE)).astype(np.int8)
+        angle = np.where(e < 30, np.sin(step * 0.3) * 6, np.where(e < 60, np.sin(step * 0.2) * 3, 0.0))
+
+        # clamp so the sprite never leaves the container
+        new_x = np.clip(new_x, 0, width - 60)
+        new_y = np.clip(new_y, 0, height - 60)
+
+        critical = (e <= CRITICAL_ENERGY) & ~dies_now
+        reason_now = np.where(critical, DEATH_CRITICAL_ENERGY, reason_now)
+        dies_now |= critical
+
+        # only agents still alive move; dead ones stay where they fell
+        x = np.where(active, new_x, x); y = np.where(active, new_y, y)
+        direction = np.where(active, new_dir, direction); opacity = np.where(active, new_op, opacity)
+        xs[:, step + 1] = x; ys[:, step + 1] = y; opac[:, step + 1] = opacity
+        rot[:, step + 1] = np.where(active, angle, rot[:, step])
+        filt[:, step + 1] = np.where(active, level, filt[:, step])
+
+        newly_dead = active & dies_now
+        death_step = np.where(newly_dead, step, death_step)
+        death_reason = np.where(newly_dead, reason_now, death_reason)
+        died |= newly_dead
+
+    return {
+        "x": xs, "y": ys, "opacity": opac, "rotation": rot, "filter": filt,
+        "died": died, "death_step": death_step, "death_reason": death_reason,
+    }
+
+
+def animation_verdict(final_energy, died, death_reason):
+    """End-of-animation verdict (the overlay uses its own 40/65 cuts, as before)."""
+    if died:
+        return "MUERTO: " + DEATH_REASONS[int(death_reason)]
+    if final_energy < 40:
+        return "DEBIL / Sobrevive con dificultades"
+    if final_energy < 65:
+        return "PARCIALMENTE adaptado (fatigado)"
+    return "VIVO / ADAPTADO"
+
+
+def build_scene(timelines, habitat, environment, rng, width=CONTAINER_WIDTH, height=CONTAINER_HEIGHT):
+    """Trajectories for a list of timelines (first one is the focal animal) plus its end-of-scene info.
+
+    Extra agents start spread across the container so a herd does not stack on one spot.
+    """
+    speed = np.array([tl["speed_ratio"] for tl in timelines])
+    energy = np.array([tl["energy"] for tl in timelines])
+    n = len(timelines)
+    x_min, x_max = np.floor(0.05 * width), np.floor(0.92 * width)
+    start_x = np.full(n, np.floor((x_min + x_max) / 8))
+    if n > 1:
+        start_x[1:] = np.floor(rng.uniform(x_min, x_max, size=n - 1))
+    traj = compute_trajectories(speed, energy, habitat, environment, rng, width=width, height=height, start_x=start_x)
+    step = int(traj["death_step"][0])
+    reason = DEATH_REASONS[int(traj["death_reason"][0])]
+    end = {
+        "step": step,
+        "verdict": animation_verdict(timelines[0]["energy"][step], bool(traj["died"][0]), traj["death_reason"][0]),
+        "reason": reason,
+    }
+    return traj, end
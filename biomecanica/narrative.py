@@ -0,0 +1,87 @@
+# -------------------------
+# Narrative as per-step condition bitmasks + one message dictionary
+# -------------------------
+# Bits are listed in the order the messages are joined, so decoding a mask
+# reproduces the original sentence exactly.
+from .species import BIOMES
+
+COND_COLD = 1 << 0
+COND_HEAT = 1 << 1
+COND_HYPOXIA = 1 << 2
+COND_HIGH_PRESSURE = 1 << 3
+COND_LOW_PRESSURE = 1 << 4
+COND_ALTITUDE = 1 << 5
+COND_HYDROSTATIC = 1 << 6
+COND_MARINE_ENV_MISMATCH = 1 << 7   # non-marine organism placed in a marine biome ("Fondo marino")
+COND_OUT_OF_WATER = 1 << 8          # marine organism outside the marine biomes
+
+# Templates use Python format specs; the JS decoder understands the same "{name:.Nf}" fields.
+MESSAGES = {
+    COND_COLD: "Frío pronunciado (Δ {temp_diff:.1f} °C): contracción muscular y reducción en velocidad.",
+    COND_HEAT: "Calor pronunciado (Δ +{temp_diff:.1f} °C): riesgo de hipertermia y deshidratación.",
+    COND_HYPOXIA: "Hipoxia funcional (factor O₂ {ox_factor:.2f}): fatiga y pérdida de coordinación.",
+    COND_HIGH_PRESSURE: "Presión elevada: compresión de estructuras y menor capacidad de ventilación.",
+    COND_LOW_PRESSURE: "Presión baja: expansión de gases internos y mareo.",
+    COND_ALTITUDE: "Altitud alta: disminución de presión parcial de O₂.",
+    COND_HYDROSTATIC: "Presión hidrostática alta (subacuática): riesgo de daño por compresión.",
+    COND_MARINE_ENV_MISMATCH: "Ambiente marino detectado: organismo no adaptado muestra signos de inmersión y estrés respiratorio.",
+    COND_OUT_OF_WATER: "Organismo marino fuera del agua: desecación y fallo respiratorio progresivo.",
+}
+DEFAULT_MESSAGE = "Condiciones dentro de parámetros operativos."
+
+
+def habitat_mask(habitat, environment):
+    """Condition bits that depend only on habitat vs. biome (constant over a run)."""
+    mask = 0
+    marine = BIOMES.is_marine(environment)
+    if marine and habitat != "marino":
+        mask |= COND_MARINE_ENV_MISMATCH
+    if not marine and habitat == "marino":
+        mask |= COND_OUT_OF_WATER
+    return mask
+
+
+def condition_mask(temp_diff, ox_factor, pres, alt, base_mask=0):
+    mask = base_mask
+    if abs(temp_diff) > 6:
+        mask |= COND_COLD if temp_diff < 0 else COND_HEAT
+    if ox_factor < 0.85:
+        mask |= COND_HYPOXIA
+    if pres > 140:
+        mask |= COND_HIGH_PRESSURE
+    if pres < 60:
+        mask |= COND_LOW_PRESSURE
+    if alt > 3000:
+        mask |= COND_ALTITUDE
+    if alt < -200:
+        mask |= COND_HYDROSTATIC
+    return mask
+
+
+def condition_masks(temp_diff, ox_factor, pres, alt, base_mask=0):
+    """Vectorized condition_mask over NumPy arrays (returns uint16 masks)."""
+    import numpy as np
+
+    big = np.abs(temp_diff) > 6
+    mask = np.full(np.shape(temp_diff), base_mask, dtype=np.uint16)
+    mask |= np.where(big & (temp_diff < 0), COND_COLD, 0).astype(np.uint16)
+    mask |= np.where(big & (temp_diff >= 0), COND_HEAT, 0).astype(np.uint16)
+    mask |= np.where(ox_factor < 0.85, COND_HYPOXIA, 0).astype(np.uint16)
+    mask |= np.where(pres > 140, COND_HIGH_PRESSURE, 0).astype(np.uint16)
+    mask |= np.where(pres < 60, COND_LOW_PRESSURE, 0).astype(np.uint16)
+    mask |= np.where(alt > 3000, COND_ALTITUDE, 0).astype(np.uint16)
+    mask |= np.where(alt < -200, COND_HYDROSTATIC, 0).astype(np.uint16)
+    return mask
+
+
+def decode_narrative(mask, temp_diff, ox_factor):
+    if not mask:
+        return DEFAULT_MESSAGE
+    return " ".join(tpl.format(temp_diff=temp_diff, ox_factor=ox_factor)
+                    for bit, tpl in MESSAGES.items() if mask & bit)
+
+
+def decode_timeline_narrative(timeline):
+    temp_opt = timeline["temp_opt"]
+    return [decode_narrative(m, t - temp_opt, f)
+            for m, t, f in zip(timeline["conditions"], timeline["temp"], timeline["ox_factor"])]
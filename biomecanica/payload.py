@@ -0,0 +1,115 @@
+# -------------------------
+# Payload for the JS animation (compact: packed typed arrays + condition bitmasks)
+# -------------------------
+import base64
+
+import numpy as np
+
+from .narrative import DEFAULT_MESSAGE, MESSAGES
+from .species import REGION
+
+CONTAINER_WIDTH = 940
+CONTAINER_HEIGHT = 520
+SPRITE_WIDTH = 120  # display width of the animal sprite (px)
+
+# series name -> (timeline key, little-endian dtype, JS typed-array name)
+PACKED_SERIES = {
+    "speed": ("speed_ratio", "<f4", "Float32Array"),
+    "energy": ("energy", "<f4", "Float32Array"),
+    "temp": ("temp", "<f4", "Float32Array"),
+    "ox_factor": ("ox_factor", "<f4", "Float32Array"),
+    "conditions": ("conditions", "<u2", "Uint16Array"),
+}
+
+
+def pack_array(values, dtype):
+    return base64.b64encode(np.asarray(values, dtype=dtype).tobytes()).decode("ascii")
+
+
+# agent trajectory field -> (little-endian dtype, JS typed-array name, scale applied before packing)
+PACKED_AGENT_FIELDS = {
+    "x": ("<i2", "Int16Array", 1),
+    "y": ("<i2", "Int16Array", 1),
+    "opacity": ("<u1", "Uint8Array", 255),
+    "rotation": ("<i2", "Int16Array", 10),   # tenths of a degree
+    "filter": ("<u1", "Uint8Array", 1),
+}
+
+
+def pack_agents(trajectories, sprite_width=SPRITE_WIDTH):
+    """Precomputed sprite trajectories (see motion.compute_trajectories) as packed (agent-major) arrays."""
+    n, samples = trajectories["x"].shape
+    agents = {"count": int(n), "samples": int(samples), "sprite_width": int(sprite_width), "types": {}}
+    for name, (dtype, js_type, scale) in PACKED_AGENT_FIELDS.items():
+        values = np.floor(np.asarray(trajectories[name], dtype=float) * scale + 0.5)
+        agents[name] = pack_array(values, dtype)
+        agents["types"][name] = js_type
+    agents["death_step"] = pack_array(trajectories["death_step"], "<i2")
+    agents["types"]["death_step"] = "Int16Array"
+    agents["scale"] = {name: scale for name, (_, _, scale) in PACKED_AGENT_FIELDS.items()}
+    return agents
+
+
+def build_payload(timeline, habitat, environment, steps, step_interval, sim_duration, trajectories=None, end=None,
+                  sprite_width=SPRITE_WIDTH):
+    """Simulation data consumed by the animation script. Images are embedded separately by the page.
+
+    Numeric series travel as base64 little-endian typed arrays; the narrative is a
+    per-step bitmask plus one message dictionary (decode with ``decodePayload`` in JS).
+    ``trajectories`` (agent 0 is the focal animal whose timeline drives the HUD) and
+    ``end`` ({"step", "verdict", "reason"}) come from the motion module.
+    """
+    payload = {
+        "steps": steps,
+        "step_interval": step_interval,
+        "sim_duration": sim_duration,
+        "width": CONTAINER_WIDTH,
+        "height": CONTAINER_HEIGHT,
+        "region": REGION[habitat],
+        "habitat": habitat,
+        "environment": environment,
+        "temp_opt": timeline["temp_opt"],
+        "series": {name: pack_array(timeline[key], dtype) for name, (key, dtype, _) in PACKED_SERIES.items()},
+        "series_types": {name: js_type for name, (_, _, js_type) in PACKED_SERIES.items()},
+        "messages": {str(bit): tpl for bit, tpl in MESSAGES.items()},
+        "default_message": DEFAULT_MESSAGE,
+    }
+    if trajectories is not None:
+        payload["agents"] = pack_agents(trajectories, sprite_width)
+    if end is not None:
+        payload["end"] = end
+    return payload
+
+
+# JS counterpart of build_payload / narrative.decode_narrative
+DECODE_PAYLOAD_JS = """
+function unpackArray(b64, type) {
+    const bin = atob(b64);
+    const bytes = new Uint8Array(bin.length);
+    for (let i = 0; i < bin.length; i++) bytes[i] = bin.charCodeAt(i);
+    return new window[type](bytes.buffer);
+}
+function decodePayload(payload) {
+    const series = {};
+    for (const name in payload.series) series[name] = unpackArray(payload.series[name], payload.series_types[name]);
+    let agents = null;
+    if (payload.agents) {
+        agents = {count: payload.agents.count, samples: payload.agents.samples, sprite_width: payload.agents.sprite_width};
+        for (const name in payload.agents.types) {
+            const raw = unpackArray(payload.agents[name], payload.agents.types[name]);
+            const scale = (payload.agents.scale || {})[name] || 1;
+            agents[name] = scale === 1 ? raw : Float32Array.from(raw, v => v / scale);
+        }
+    }
+    const bits = Object.keys(payload.messages).map(Number).sort((a, b) => a - b);
+    function narrativeAt(i) {
+        const mask = series.conditions[i];
+        if (!mask) return payload.default_message;
+        const values = {temp_diff: series.temp[i] - payload.temp_opt, ox_factor: series.ox_factor[i]};
+        return bits.filter(b => mask & b)
+            .map(b => payload.messages[b].replace(/\\{(\\w+):\\.(\\d)f\\}/g, (_, k, d) => values[k].toFixed(Number(d))))
+            .join(' ');
+    }
+    return {series: series, agents: agents, narrativeAt: narrativeAt};
+}
+"""
@@ -0,0 +1,249 @@
+# -------------------------
+# Incremental recomputation: the single-run pipeline as a graph of cached artifacts
+# -------------------------
+# drift series → physiological factors → energy → narrative → timeline → scene / payload / drivers
+#
+# Each node is cached under a key built from its own parameters and the keys of
+# the nodes it depends on (not their values), so a lookup never evaluates
+# upstream work and a parameter change only misses the nodes downstream of it.
+# Changing ``environment`` reuses drift, factors and energy; changing the species
+# reuses the drift series.
+import json
+import math
+
+import numpy as np
+
+from .cache import LRUCache, scenario_key
+from .model import compute_drivers, compute_ensemble_evolution, compute_stepwise_evolution
+from .motion import build_scene
+from .narrative import condition_masks, habitat_mask
+from .payload import SPRITE_WIDTH, build_payload
+from .rng import drift_rng, motion_rng
+from .species import SPECIES
+from .stream import _LOWER, _SCALE, _UPPER, _clamped_walk
+
+HERD_SPRITE_WIDTH = 60  # smaller sprites when several animals share the scene
+
+
+class _Node:
+    __slots__ = ("name", "fn", "params", "deps", "persist")
+
+    def __init__(self, name, fn, params, deps, persist):
+        self.name = name
+        self.fn = fn
+        self.params = tuple(params)
+        self.deps = tuple(deps)
+        self.persist = persist
+
+
+class ArtifactGraph:
+    """Named derived artifacts with explicit parameter and node dependencies.
+
+    ``add(name, fn, params, deps)`` registers a node; ``fn`` is called with the
+    declared parameters and dependency values as keyword arguments. Values live in
+    a shared LRUCache (``cache``), so sessions with the same inputs share nodes.
+    ``persist=(load, save)`` backs a node with durable storage: ``load(params)``
+    is tried on a cache miss before computing, ``save(params, value)`` after.
+    """
+
+    def __init__(self, cache=None):
+        self.cache = cache if cache is not None else LRUCache(maxsize=512, ttl=3600.0)
+        self.nodes = {}
+
+    def add(self, name, fn, params=(), deps=(), persist=None):
+        for dep in deps:
+            if dep not in self.nodes:
+                raise KeyError(f"Nodo desconocido: {dep!r} (dependencia de {name!r})")
+        self.nodes[name] = _Node(name, fn, params, deps, persist)
+        return self
+
+    def params_of(self, name):
+        """All parameters ``name`` depends on, directly or through its dependencies."""
+        node = self.nodes[name]
+        out = set(node.params)
+        for dep in node.deps:
+            out |= self.params_of(dep)
+        return out
+
+    def evaluate(self, params):
+        """Evaluation of the graph for one parameter set (values resolved lazily, on access)."""
+        return Evaluation(self, params)
+
+
+class Evaluation:
+    """Per-rerun view of an ArtifactGraph; ``ev[name]`` resolves a node and its dependencies.
+
+    ``computed`` lists the nodes that had to be (re)computed, in order; ``loaded``
+    the ones restored from persistent storage.
+    """
+
+    def __init__(self, graph, params):
+        self.graph = graph
+        self.params = dict(params)
+        self.computed = []
+        self.loaded = []
+        self._keys = {}
+        self._values = {}
+
+    def key(self, name):
+        key = self._keys.get(name)
+        if key is None:
+            node = self.graph.nodes[name]
+            key = (name, tuple(_freeze(self.params[p]) for p in node.params), tuple(self.key(d) for d in node.deps))
+            self._keys[name] = key
+        return key
+
+    def __getitem__(self, name):
+        if name in self._values:
+            return self._values[name]
+        node = self.graph.nodes[name]
+        key = self.key(name)
+        sentinel = object()
+        value = self.graph.cache.get(key, sentinel)
+        if value is sentinel:
+            value = None
+            if node.persist is not None:
+                value = node.persist[0](self.params)
+                if value is not None:
+                    self.loaded.append(name)
+            if value is None:
+                kwargs = {p: self.params[p] for p in node.params}
+                kwargs.update((dep, self[dep]) for dep in node.deps)
+                value = node.fn(**kwargs)
+                self.computed.append(name)
+                if node.persist is not None:
+                    node.persist[1](self.params, value)
+            self.graph.cache.put(key, value)
+        self._values[name] = value
+        return value
+
+    def __contains__(self, name):
+        """True when ``name`` is already available without computing it."""
+        return name in self._values or self.key(name) in self.graph.cache
+
+
+def _freeze(value):
+    if isinstance(value, float) and value.is_integer():
+        return int(value)   # 25 and 25.0 are the same input
+    return value
+
+
+# -------------------------
+# Node functions (same arithmetic as compute_stepwise_evolution, by stage)
+# -------------------------
+def drift_series(presion_init, temp_init, ox_init, altitud_init, dyn_intensity, seed, steps):
+    """Clamped random walk of (pres, temp, ox, alt); species and biome do not enter."""
+    increments = (drift_rng(seed).standard_normal((steps, 4)) * _SCALE) * dyn_intensity
+    start = (float(presion_init), float(temp_init), float(ox_init), float(altitud_init))
+    pres, temp, ox, alt = (_clamped_walk(start[k], increments[:, k], _LOWER[k], _UPPER[k]) for k in range(4))
+    return {"pres": pres, "temp": temp, "ox": ox, "alt": alt}
+
+
+def physiological_factors(drift, species_name):
+    """Temperature offset, O₂ factor and the per-second energy load they imply."""
+    temp_opt = SPECIES[species_name]["temp_opt"]
+    pres = drift["pres"]
+    # math.exp per element: np.exp may differ in the last ulp from the scalar model
+    altitude_term = np.fromiter((math.exp(-a / 7000.0) for a in drift["alt"].tolist()), float, len(pres))
+    ox_partial = (pres / 101.3) * (drift["ox"] / 21.0) * altitude_term
+    temp_diff = drift["temp"] - temp_opt
+    temp_penalty = np.abs(temp_diff) * 0.02
+    pres_penalty = np.where(pres > 140, 0.25, 0.0) + np.where(pres < 60, 0.18, 0.0)
+    ox_factor = np.clip(ox_partial, 0.01, 2.0)
+    load = temp_penalty * 6 + pres_penalty * 5 + (1 - np.minimum(1.0, ox_factor)) * 12
+    return {"temp_diff": temp_diff, "ox_factor": ox_factor, "load": load}
+
+
+def energy_series(factors, step_interval):
+    delta_energy = - factors["load"] * (step_interval / 2.0)
+    # delta_energy <= 0, so max(0, e + d) step by step equals max(0, e0 + running sum)
+    energy = np.maximum(0.0, np.add.accumulate(np.concatenate(([100.0], delta_energy)))[1:])
+    return {"energy": energy, "speed_ratio": np.maximum(0.02, np.sqrt(energy / 100.0))}
+
+
+def narrative_masks(drift, factors, species_name, environment):
+    base_mask = habitat_mask(SPECIES[species_name]["habitat"], environment)
+    return condition_masks(factors["temp_diff"], factors["ox_factor"], drift["pres"], drift["alt"], base_mask)
+
+
+def assemble_timeline(drift, factors, energy, narrative, species_name):
+    """Timeline dict with Python lists, as compute_stepwise_evolution returns it."""
+    return {
+        "pres": drift["pres"].tolist(), "temp": drift["temp"].tolist(), "ox": drift["ox"].tolist(),
+        "alt": drift["alt"].tolist(), "energy": energy["energy"].tolist(),
+        "speed_ratio": energy["speed_ratio"].tolist(), "ox_factor": factors["ox_factor"].tolist(),
+        "conditions": narrative.tolist(), "temp_opt": SPECIES[species_name]["temp_opt"],
+    }
+
+
+def run_drivers(drift, species_name, environment):
+    spec = SPECIES[species_name]
+    return compute_drivers(np.mean(drift["temp"]), np.mean(drift["ox"]), np.mean(drift["pres"]),
+                           spec["temp_opt"], spec["ox_opt"], spec["habitat"], environment)
+
+
+def herd_scene(timeline, presion_init, temp_init, ox_init, altitud_init, dyn_intensity, seed, steps, step_interval,
+               species_name, environment, n_agents):
+    """Focal animal + extra herd members, movement precomputed per habitat rules."""
+    spec = SPECIES[species_name]
+    herd = [timeline] + [
+        compute_stepwise_evolution(presion_init, temp_init, ox_init, altitud_init, dyn_intensity, steps, step_interval,
+                                   spec["temp_opt"], spec["habitat"], environment, rng=drift_rng(seed, run=k))
+        for k in range(1, int(n_agents))
+    ]
+    trajectories, end = build_scene(herd, spec["habitat"], environment, motion_rng(seed))
+    return {"trajectories": trajectories, "end": end}
+
+
+def scene_payload(timeline, scene, species_name, environment, steps, step_interval, sim_duration, n_agents):
+    """Animation payload and its JSON text (serialized once per distinct scene)."""
+    payload = build_payload(timeline, SPECIES[species_name]["habitat"], environment, steps, step_interval, sim_duration,
+                            trajectories=scene["trajectories"], end=scene["end"],
+                            sprite_width=SPRITE_WIDTH if int(n_agents) == 1 else HERD_SPRITE_WIDTH)
+    return {"payload": payload, "json": json.dumps(payload)}
+
+
+def ensemble_bands(presion_init, temp_init, ox_init, altitud_init, dyn_intensity, steps, step_interval, n_runs, seed,
+                   species_name):
+    if int(n_runs) <= 0:
+        return None
+    return compute_ensemble_evolution(presion_init, temp_init, ox_init, altitud_init, dyn_intensity, steps,
+                                      step_interval, int(n_runs), seed, SPECIES[species_name]["temp_opt"])
+
+
+_DRIFT_PARAMS = ("presion_init", "temp_init", "ox_init", "altitud_init", "dyn_intensity", "seed", "steps")
+
+
+def build_simulation_graph(cache=None, timeline_store=None):
+    """Graph of the app's single-run artifacts. Parameters: the scenario fields plus
+    ``steps``, ``step_interval``, ``sim_duration``, ``n_agents`` and ``n_runs``.
+
+    ``timeline_store`` (a runstore.RunStore) persists the ``timeline`` node across restarts.
+    """
+    persist = None
+    if timeline_store is not None:
+        persist = (lambda p: timeline_store.get(timeline_key(p)),
+                   lambda p, value: timeline_store.put(timeline_key(p), p, value))
+    graph = ArtifactGraph(cache)
+    graph.add("drift", drift_series, params=_DRIFT_PARAMS)
+    graph.add("factors", physiological_factors, params=("species_name",), deps=("drift",))
+    graph.add("energy", energy_series, params=("step_interval",), deps=("factors",))
+    graph.add("narrative", narrative_masks, params=("species_name", "environment"), deps=("drift", "factors"))
+    graph.add("timeline", assemble_timeline, params=("species_name",),
+              deps=("drift", "factors", "energy", "narrative"), persist=persist)
+    graph.add("drivers", run_drivers, params=("species_name", "environment"), deps=("drift",))
+    graph.add("scene", herd_scene, params=_DRIFT_PARAMS + ("step_interval", "species_name", "environment", "n_agents"),
+              deps=("timeline",))
+    graph.add("payload", scene_payload,
+              params=("species_name", "environment", "steps", "step_interval", "sim_duration", "n_agents"),
+              deps=("timeline", "scene"))
+    graph.add("ensemble", ensemble_bands,
+              params=_DRIFT_PARAMS[:5] + ("steps", "step_interval", "n_runs", "seed", "species_name"))
+    return graph
+
+
+def timeline_key(params):
+    """cache.scenario_key of the single run described by ``params`` (the run store's key)."""
+    return scenario_key(params["species_name"], params["environment"], params["presion_init"], params["temp_init"],
+                        params["ox_init"], params["altitud_init"], params["dyn_intensity"], params["seed"],
+                        params["steps"], params["step_interval"])
@@ -0,0 +1,133 @@
+# -------------------------
+# Multi-agent population engine (struct-of-arrays state, one vectorized step for everyone)
+# -------------------------
+import numpy as np
+
+from .model import SURVIVAL_THRESHOLD
+from .rng import population_rngs
+from .species import SIM_DURATION, SPECIES, STEP_INTERVAL
+from .stream import COLLAPSE_ENERGY
+
+
+# Per-step noise scale of the shared biome drift (pres, temp, ox, alt), as in the single-run model
+_BIOME_SCALE = np.array([0.7, 0.6, 0.4, 5.0])
+_LOWER = np.array([20.0, -50.0, 1.0, -10000.0])
+_UPPER = np.array([200.0, 60.0, 40.0, 8000.0])
+
+
+def build_population(counts, mass_cv=0.15, seed=0):
+    """Struct-of-arrays state for a mixed assemblage.
+
+    ``counts``: species name -> number of individuals. Each individual gets its own
+    mass (log-normal around the species mass with coefficient of variation ``mass_cv``);
+    physiological optima are copied per individual so the step needs no lookups.
+    """
+    rng = seed if isinstance(seed, np.random.Generator) else np.random.default_rng(seed)
+    names = [name for name, n in counts.items() if int(n) > 0]
+    sizes = np.array([int(counts[name]) for name in names], dtype=np.int64)
+    species_idx = np.repeat(np.arange(len(names), dtype=np.int32), sizes)
+
+    rows = SPECIES.rows(names)
+
+    def per_species(key):
+        return SPECIES.column(key)[rows][species_idx]
+
+    base_mass = per_species("masa")
+    # catalog rows without a mass: the cost factor is relative to it, any positive value works
+    base_mass = np.where(base_mass > 0, base_mass, 1.0)
+    sigma = np.sqrt(np.log1p(mass_cv ** 2))
+    mass = base_mass * rng.lognormal(-0.5 * sigma ** 2, sigma, size=len(species_idx))
+    n = len(species_idx)
+    return {
+        "species": names,
+        "species_idx": species_idx,
+        "habitat": SPECIES.column("habitat")[rows][species_idx],
+        "mass": mass,
+        # Kleiber: mass-specific metabolic cost ∝ M^-0.25, relative to the species mean mass
+        "cost_factor": (mass / base_mass) ** -0.25,
+        "temp_opt": per_species("temp_opt"),
+        "ox_opt": per_species("ox_opt"),
+        # local microclimate offsets (pres, temp, ox, alt) on top of the shared biome state
+        "micro": np.zeros((4, n)),
+        "energy": np.full(n, 100.0),
+    }
+
+
+def simulate_population(counts, presion0, temp0, ox0, alt0, dyn_intensity, steps=None, step_interval=STEP_INTERVAL,
+                        seed=0, mass_cv=0.15, micro_intensity=0.3, micro_relax=0.05):
+    """Advance every individual together and return population-level curves.
+
+    The biome follows the app's clamped random walk; each individual also feels a
+    local microclimate offset (mean-reverting random walk with scale ``micro_intensity``
+    relative to the biome drift and reversion rate ``micro_relax`` per step).
+    """
+    if steps is None:
+        steps = int(SIM_DURATION / step_interval)
+    pop_rng, biome_rng, micro_rng = population_rngs(seed)
+    pop = build_population(counts, mass_cv=mass_cv, seed=pop_rng)
+
+    n_species = len(pop["species"])
+    sp_idx = pop["species_idx"]
+    sp_counts = np.bincount(sp_idx, minlength=n_species).astype(float)
+    biome = np.array([presion0, temp0, ox0, alt0], dtype=float)
+    micro = pop["micro"]
+    energy = pop["energy"]
+    biome_scale = _BIOME_SCALE * dyn_intensity
+    micro_scale = biome_scale[:, None] * micro_intensity
+
+    survival = np.empty((n_species, steps))   # fraction with energy > SURVIVAL_THRESHOLD
+    alive = np.empty((n_species, steps))      # fraction above COLLAPSE_ENERGY
+    mean_energy = np.empty((n_species, steps))
+    biome_arr = np.empty((4, steps))
+
+    for i in range(steps):
+        biome = np.clip(biome + biome_rng.standard_normal(4) * biome_scale, _LOWER, _UPPER)
+        micro += micro_rng.standard_normal(micro.shape) * micro_scale - micro_relax * micro
+        local = np.clip(biome[:, None] + micro, _LOWER[:, None], _UPPER[:, None])
+        pres, temp, ox, alt = local
+
+        ox_partial = (pres / 101.3) * (ox / 21.0) * np.exp(-alt / 7000.0)
+        temp_penalty = np.abs(temp - pop["temp_opt"]) * 0.02
+        pres_penalty = np.where(pres > 140, 0.25, 0.0) + np.where(pres < 60, 0.18, 0.0)
+        ox_factor = np.clip(ox_partial, 0.01, 2.0)
+
+        delta_energy = - (temp_penalty * 6 + pres_penalty * 5 + (1 - np.minimum(1.0, ox_factor)) * 12) * (step_interval / 2.0)
+        np.maximum(0.0, energy + delta_energy * pop["cost_factor"], out=energy)
+
+        survival[:, i] = np.bincount(sp_idx, weights=energy > SURVIVAL_THRESHOLD, minlength=n_species) / sp_counts
+        alive[:, i] = np.bincount(sp_idx, weights=energy > COLLAPSE_ENERGY, minlength=n_species) / sp_counts
+        mean_energy[:, i] = np.bincount(sp_idx, weights=energy, minlength=n_species) / sp_counts
+        biome_arr[:, i] = biome
+
+    total = sp_counts.sum()
+    return {
+        "species": pop["species"],
+        "counts": sp_counts.astype(int),
+        "t": np.arange(steps) * step_interval,
+        "survival": survival,
+        "alive": alive,
+        "mean_energy": mean_energy,
+        "population_survival": (survival * sp_counts[:, None]).sum(axis=0) / total,
+        "biome": {"pres": biome_arr[0], "temp": biome_arr[1], "ox": biome_arr[2], "alt": biome_arr[3]},
+        "final_energy": energy,
+        "species_idx": sp_idx,
+        "mass": pop["mass"],
+    }
+
+
+def population_breakdown(result):
+    """Per-species summary rows (final survival, collapse and energy percentiles)."""
+    rows = []
+    for s_idx, name in enumerate(result["species"]):
+        e = result["final_energy"][result["species_idx"] == s_idx]
+        p5, p50, p95 = np.percentile(e, [5, 50, 95])
+        rows.append({
+            "species_name": name,
+            "n": int(result["counts"][s_idx]),
+            "survival": float(result["survival"][s_idx, -1]),
+            "alive": float(result["alive"][s_idx, -1]),
+            "energy_p5": float(p5),
+            "energy_p50": float(p50),
+            "energy_p95": float(p95),
+        })
+    return rows
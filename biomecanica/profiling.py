@@ -0,0 +1,239 @@
+# -------------------------
+# Per-stage timing / memory instrumentation
+# -------------------------
+# StageProfiler records one rerun; STAGE_METRICS aggregates every rerun of the
+# process (all sessions) and renders Prometheus text. When a profiler is disabled
+# ``stage()`` hands back one shared no-op context manager, so instrumented code
+# pays a method call and nothing else.
+import json
+import logging
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+
+logger = logging.getLogger("biomecanica.profiling")
+
+_NULL = nullcontext()
+_LOG_LOCK = threading.Lock()
+
+# tracemalloc is process-wide: profilers take a reference on it (the first one
+# starts it, the last one out stops it, unless someone else had started it), and
+# only one of them at a time owns the peak counter, so concurrent sessions never
+# reset each other's peak or stop each other's tracing.
+_TRACE_LOCK = threading.Lock()
+_TRACE = {"users": 0, "started": False, "owner": None}
+
+# Histogram buckets (seconds) for the Prometheus exposition
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _ensure_log_handler():
+    """Give ``logger`` a stderr handler at INFO unless the host already configured one."""
+    with _LOG_LOCK:
+        if logger.handlers:
+            return
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+
+
+def _acquire_tracing(owner):
+    """Take a reference on tracemalloc; ``owner`` claims the peak counter if it is free."""
+    with _TRACE_LOCK:
+        if _TRACE["users"] == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _TRACE["started"] = True
+        _TRACE["users"] += 1
+        if _TRACE["owner"] is None:
+            _TRACE["owner"] = owner
+            tracemalloc.reset_peak()
+
+
+def _release_tracing(owner):
+    with _TRACE_LOCK:
+        if _TRACE["owner"] is owner:
+            _TRACE["owner"] = None
+        _TRACE["users"] -= 1
+        if _TRACE["users"] == 0 and _TRACE["started"]:
+            tracemalloc.stop()
+            _TRACE["started"] = False
+
+
+def _take_peak(owner):
+    """Peak traced bytes since the last reset (and reset it), or None if ``owner`` does not own the counter.
+
+    A free counter is claimed (and reset) by the first tracing profiler to ask.
+    """
+    with _TRACE_LOCK:
+        if _TRACE["owner"] is None:
+            _TRACE["owner"] = owner
+            tracemalloc.reset_peak()
+            return None
+        if _TRACE["owner"] is not owner:
+            return None
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.reset_peak()
+        return peak
+
+
+def _label(value):
+    """Escape a Prometheus label value."""
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class StageMetrics:
+    """Process-wide, thread-safe aggregate of stage durations (count, sum, histogram, last peak memory)."""
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._stages = {}
+
+    def observe(self, stage, seconds, peak_bytes=None):
+        with self._lock:
+            entry = self._stages.setdefault(stage, {"count": 0, "sum": 0.0, "buckets": [0] * len(self.buckets),
+                                                    "peak_bytes": 0})
+            entry["count"] += 1
+            entry["sum"] += seconds
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    entry["buckets"][i] += 1
+            if peak_bytes is not None:
+                entry["peak_bytes"] = max(entry["peak_bytes"], peak_bytes)
+
+    def snapshot(self):
+        with self._lock:
+            return {k: {**v, "buckets": list(v["buckets"])} for k, v in self._stages.items()}
+
+    def prometheus_text(self, prefix="biomecanica_stage"):
+        lines = [f"# HELP {prefix}_seconds Duración de cada etapa del script por ejecución.",
+                 f"# TYPE {prefix}_seconds histogram"]
+        snap = self.snapshot()
+        for stage, entry in sorted(snap.items()):
+            label = _label(stage)
+            for bound, count in zip(self.buckets, entry["buckets"]):
+                lines.append(f'{prefix}_seconds_bucket{{stage="{label}",le="{bound}"}} {count}')
+            lines.append(f'{prefix}_seconds_bucket{{stage="{label}",le="+Inf"}} {entry["count"]}')
+            lines.append(f'{prefix}_seconds_sum{{stage="{label}"}} {entry["sum"]}')
+            lines.append(f'{prefix}_seconds_count{{stage="{label}"}} {entry["count"]}')
+        lines.append(f"# HELP {prefix}_peak_bytes Pico de memoria trazada (tracemalloc) observado por etapa.")
+        lines.append(f"# TYPE {prefix}_peak_bytes gauge")
+        for stage, entry in sorted(snap.items()):
+            label = _label(stage)
+            lines.append(f'{prefix}_peak_bytes{{stage="{label}"}} {entry["peak_bytes"]}')
+        return "\n".join(lines) + "\n"
+
+
+STAGE_METRICS = StageMetrics()
+
+
+class StageProfiler:
+    """Collects ``{"stage", "seconds", "peak_bytes"}`` records for one rerun.
+
+    Two ways to delimit stages: ``with profiler.stage(name):`` around a block, or
+    ``profiler.lap(name)`` at the end of each section of a linear script (the stage
+    spans from the previous lap, or ``start()``). ``trace_memory`` turns on tracemalloc
+    (costly; only for diagnosis); while another profiler owns the process-wide peak
+    counter, ``peak_bytes`` is None. Records are also fed to ``metrics`` when given.
+    Enabling a profiler gives the ``biomecanica.profiling`` logger a stderr handler
+    if it has none, so ``log_json`` lines are actually written.
+    """
+
+    def __init__(self, enabled=False, trace_memory=False, metrics=STAGE_METRICS):
+        self.enabled = enabled
+        self.trace_memory = trace_memory and enabled
+        self.metrics = metrics
+        self.records = []
+        self._lap_t0 = None
+        self._tracing = False
+        if enabled:
+            _ensure_log_handler()
+
+    def start(self):
+        if not self.enabled:
+            return
+        if self.trace_memory and not self._tracing:
+            _acquire_tracing(self)
+            self._tracing = True
+        if self._tracing:
+            _take_peak(self)   # peak counts from here
+        self._lap_t0 = time.perf_counter()
+
+    def lap(self, name):
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        peak = _take_peak(self) if self._tracing else None
+        self._record(name, now - self._lap_t0, peak)
+        self._lap_t0 = time.perf_counter()
+
+    def stop(self):
+        if self._tracing:
+            _release_tracing(self)
+            self._tracing = False
+
+    def _record(self, name, seconds, peak):
+        self.records.append({"stage": name, "seconds": seconds, "peak_bytes": peak})
+        if self.metrics is not None:
+            self.metrics.observe(name, seconds, peak)
+
+    def stage(self, name):
+        if not self.enabled:
+            return _NULL
+        return self._stage(name)
+
+    @contextmanager
+    def _stage(self, name):
+        acquired = self.trace_memory and not self._tracing
+        if acquired:
+            _acquire_tracing(self)
+            self._tracing = True
+        if self._tracing:
+            _take_peak(self)
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - t0
+            peak = _take_peak(self) if self.trace_memory else None
+            if acquired:
+                _release_tracing(self)
+                self._tracing = False
+            self._record(name, seconds, peak)
+
+    def total(self):
+        return sum(r["seconds"] for r in self.records)
+
+    def log_json(self, **context):
+        """Emit one structured JSON line per rerun on the ``biomecanica.profiling`` logger."""
+        if not self.enabled or not self.records:
+            return
+        logger.info(json.dumps({"event": "rerun_profile", "ts": time.time(), **context,
+                                "total_seconds": self.total(), "stages": self.records}, ensure_ascii=False))
+
+
+def start_metrics_server(port, metrics=STAGE_METRICS, host="0.0.0.0"):
+    """Serve ``metrics.prometheus_text()`` at http://host:port/metrics from a daemon thread."""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.rstrip("/") != "/metrics":
+                self.send_error(404)
+                return
+            body = metrics.prometheus_text().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, int(port)), Handler)
+    threading.Thread(target=server.serve_forever, name="biomecanica-metrics", daemon=True).start()
+    return server
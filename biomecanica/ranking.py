@@ -0,0 +1,175 @@
+# -------------------------
+# Rank every species of the registry for one scenario (which taxa survive a biome)
+# -------------------------
+# The drift of pres / temp / ox / alt does not depend on the species, so it is
+# integrated once per drift realization; only the temperature penalty depends on
+# the species (through temp_opt). Each step then updates an energy array of shape
+# (species, realizations) in one vectorized operation, species in chunks to bound
+# memory. With the app's drift sequence (``n_samples=0``) the result is bit-identical
+# to the single-run model (compute_stepwise_evolution) for every species.
+import argparse
+import csv
+import math
+import sys
+
+import numpy as np
+
+from .model import SURVIVAL_THRESHOLD, VERDICT_LABELS, drift_noise, verdict_codes
+from .narrative import habitat_mask
+from .registry import HABITATS
+from .species import BIOMES, SCENARIO_DEFAULTS, SIM_DURATION, SPECIES, STEP_INTERVAL
+
+RANKING_CHUNK = 16384   # species per vectorized block
+
+
+def biome_scenario(environment, overrides=None):
+    """Scenario for ``environment``: SCENARIO_DEFAULTS, then the biome's baseline, then ``overrides``."""
+    sc = dict(SCENARIO_DEFAULTS)
+    sc.update(BIOMES.baseline(environment))
+    sc["environment"] = environment
+    sc.update({k: v for k, v in (overrides or {}).items() if v is not None})
+    return sc
+
+
+def _drift_terms(sc, noise, step_interval):
+    """Per-step temperature and the species-independent load terms for one realization, shape (steps,)."""
+    pres, temp, ox, alt = (float(sc[k]) for k in ("presion_init", "temp_init", "ox_init", "altitud_init"))
+    dyn = float(sc["dyn_intensity"])
+    steps = len(noise)
+    temps, pres_term, ox_term = np.empty(steps), np.empty(steps), np.empty(steps)
+    for i, (z_pres, z_temp, z_ox, z_alt) in enumerate(noise):
+        # same expressions, in the same order, as compute_stepwise_evolution
+        pres = min(max(pres + (z_pres * 0.7) * dyn, 20.0), 200.0)
+        temp = min(max(temp + (z_temp * 0.6) * dyn, -50.0), 60.0)
+        ox = min(max(ox + (z_ox * 0.4) * dyn, 1.0), 40.0)
+        alt = min(max(alt + (z_alt * 5.0) * dyn, -10000.0), 8000.0)
+        ox_partial = (pres / 101.3) * (ox / 21.0) * math.exp(-alt / 7000.0)
+        pres_penalty = (0.25 if pres > 140 else 0.0) + (0.18 if pres < 60 else 0.0)
+        ox_factor = min(max(ox_partial, 0.01), 2.0)
+        temps[i] = temp
+        pres_term[i] = pres_penalty * 5
+        ox_term[i] = (1 - min(1.0, ox_factor)) * 12
+    return temps, pres_term, ox_term
+
+
+def evaluate_registry(scenario, registry=None, rows=None, n_samples=0, seed=None, sim_duration=SIM_DURATION,
+                      step_interval=STEP_INTERVAL, chunk=RANKING_CHUNK):
+    """Final energy of every species (or the registry ``rows``) under one scenario.
+
+    ``n_samples=0`` uses the app's drift sequence for ``seed`` (default: the
+    scenario's); ``n_samples>0`` uses that many realizations and also returns the
+    survival probability (final energy > SURVIVAL_THRESHOLD).
+    Returns ``{"rows", "final_energy" (species,) or (species, samples), "survival_probability", "habitat_mismatch"}``.
+    """
+    registry = SPECIES if registry is None else registry
+    sc = dict(SCENARIO_DEFAULTS)
+    sc.update(scenario)
+    seed = int(sc["seed"] if seed is None else seed)
+    rows = np.arange(len(registry)) if rows is None else np.asarray(rows, dtype=np.intp)
+    steps = int(sim_duration / step_interval)
+    runs = range(int(n_samples)) if n_samples else (0,)
+    terms = [_drift_terms(sc, drift_noise(seed, steps, run=r), step_interval) for r in runs]
+    temps = np.stack([t[0] for t in terms], axis=1)       # (steps, samples)
+    pres_term = np.stack([t[1] for t in terms], axis=1)
+    ox_term = np.stack([t[2] for t in terms], axis=1)
+    half = step_interval / 2.0
+
+    temp_opt = registry.column("temp_opt")[rows]
+    final = np.empty((len(rows), len(runs)))
+    for start in range(0, len(rows), int(chunk)):
+        t_opt = temp_opt[start:start + int(chunk), None]
+        energy = np.full((len(t_opt), len(runs)), 100.0)
+        for i in range(steps):
+            temp_penalty = np.abs(temps[i] - t_opt) * 0.02
+            delta_energy = - (temp_penalty * 6 + pres_term[i] + ox_term[i]) * half
+            energy = np.maximum(0.0, energy + delta_energy)
+        final[start:start + len(t_opt)] = energy
+
+    habitat_codes = registry.column("habitat")[rows]
+    mismatch_by_code = np.array([habitat_mask(h, sc["environment"]) != 0 for h in HABITATS])
+    return {
+        "rows": rows,
+        "final_energy": final[:, 0] if not n_samples else final,
+        "survival_probability": (final > SURVIVAL_THRESHOLD).mean(axis=1) if n_samples else None,
+        "habitat_mismatch": mismatch_by_code[habitat_codes],
+    }
+
+
+def rank_species(scenario, registry=None, habitat=None, n_samples=0, limit=None, **kwargs):
+    """Species ordered from most to least likely to survive ``scenario`` (rows as dicts).
+
+    Taxa placed outside their medium (habitat mismatch with the biome) rank after
+    the rest; then by survival probability (with ``n_samples``) and final energy.
+    """
+    registry = SPECIES if registry is None else registry
+    rows = registry.rows_by_habitat(habitat) if habitat else None
+    result = evaluate_registry(scenario, registry, rows, n_samples=n_samples, **kwargs)
+    energy = result["final_energy"]
+    mean_energy = energy.mean(axis=1) if n_samples else energy
+    keys = [-mean_energy]
+    if n_samples:
+        keys.append(-result["survival_probability"])
+    keys.append(result["habitat_mismatch"])
+    order = np.lexsort(keys)
+    if limit is not None:
+        order = order[:int(limit)]
+
+    names = registry.names
+    habitats = registry.column("habitat")
+    codes = verdict_codes(mean_energy)
+    out = []
+    for rank, i in enumerate(order, 1):
+        row = result["rows"][i]
+        item = {"rank": rank, "species_name": names[row], "habitat": HABITATS[habitats[row]],
+                "final_energy": float(mean_energy[i]), "verdict": VERDICT_LABELS[int(codes[i])],
+                "habitat_mismatch": bool(result["habitat_mismatch"][i])}
+        if n_samples:
+            item["survival_probability"] = float(result["survival_probability"][i])
+        out.append(item)
+    return out
+
+
+def write_ranking_csv(fh, ranking):
+    if not ranking:
+        return
+    writer = csv.DictWriter(fh, fieldnames=list(ranking[0]), lineterminator="\n")
+    writer.writeheader()
+    writer.writerows(ranking)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m biomecanica.ranking",
+                                     description="Clasifica todas las especies del registro según su supervivencia en un bioma.")
+    parser.add_argument("environment", help="Bioma (nombre como en la app o de BIOMECANICA_BIOMES)")
+    parser.add_argument("--catalog", action="append", default=[], help="Catálogo extra de especies (.csv/.parquet/.npz)")
+    parser.add_argument("--habitat", choices=HABITATS, default=None, help="Solo especies de este hábitat")
+    parser.add_argument("--samples", type=int, default=0, help="Realizaciones de la deriva (0 = la de la app)")
+    parser.add_argument("--top", type=int, default=None, help="Número de especies a listar")
+    for key, label in (("presion_init", "kPa"), ("temp_init", "°C"), ("ox_init", "%"), ("altitud_init", "m"),
+                       ("dyn_intensity", "0-1")):
+        parser.add_argument(f"--{key.split('_')[0]}", dest=key, type=float, default=None,
+                            help=f"Condición inicial ({label}); por defecto la base del bioma")
+    parser.add_argument("--seed", type=int, default=SCENARIO_DEFAULTS["seed"])
+    parser.add_argument("-o", "--out", default=None, help="CSV de salida (por defecto: salida estándar)")
+    args = parser.parse_args(argv)
+
+    from .registry import SpeciesRegistry
+    for path in args.catalog:
+        SPECIES.extend(SpeciesRegistry.load(path))
+    if args.environment not in BIOMES:
+        parser.error(f"Bioma desconocido: {args.environment!r} (disponibles: {', '.join(BIOMES.names)})")
+    overrides = {k: getattr(args, k) for k in ("presion_init", "temp_init", "ox_init", "altitud_init",
+                                               "dyn_intensity")}
+    overrides["seed"] = args.seed
+    ranking = rank_species(biome_scenario(args.environment, overrides), habitat=args.habitat,
+                           n_samples=args.samples, limit=args.top)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8", newline="") as fh:
+            write_ranking_csv(fh, ranking)
+    else:
+        write_ranking_csv(sys.stdout, ranking)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,310 @@
+# -------------------------
+# Columnar species / biome registries (catalogs of thousands of taxa)
+# -------------------------
+# A SpeciesRegistry keeps one NumPy array per column (name, habitat code, masa,
+# femur, temp_opt, ox_opt and any extra columns of the source file) plus a
+# name → row index, row lists per habitat and a normalized-name array for search.
+# It is also a read-only Mapping name → row dict, so ``SPECIES[name]["temp_opt"]``
+# keeps working everywhere. Catalogs load from CSV, Parquet or NPZ; ``extend``
+# merges one into a registry in place (a row with a known name gets the values it
+# provides; columns it lacks and its blank cells keep the current values).
+import csv
+import os
+import threading
+import unicodedata
+from collections.abc import Mapping
+
+import numpy as np
+
+HABITATS = ("terrestre", "marino", "volador")
+SPECIES_FLOAT_COLUMNS = ("masa", "femur", "temp_opt", "ox_opt")
+REQUIRED_SPECIES_COLUMNS = ("name", "habitat", "temp_opt", "ox_opt")
+BIOME_COLUMNS = ("presion_init", "temp_init", "ox_init", "altitud_init")
+
+# accepted spellings of the standard column names in catalog files
+COLUMN_ALIASES = {"species_name": "name", "nombre": "name", "especie": "name", "mass": "masa",
+                  "bioma": "name", "environment": "name", "marino": "marine"}
+
+
+def normalize_text(text):
+    """Lower case without accents (search key): "Águila" → "aguila"."""
+    decomposed = unicodedata.normalize("NFKD", str(text).lower())
+    return "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+
+
+def _as_column(values):
+    """Float64 array when every value parses as a number (blank → NaN), else an object array of str."""
+    values = list(values)
+    try:
+        return np.array([np.nan if v is None or v == "" else float(v) for v in values], dtype=float)
+    except (TypeError, ValueError):
+        return np.array(["" if v is None else str(v) for v in values], dtype=object)
+
+
+def _blank(values):
+    """Bool mask of missing cells: NaN, None or empty text."""
+    if values.dtype.kind == "f":
+        return np.isnan(values)
+    return np.array([v is None or (isinstance(v, float) and v != v) or str(v).strip() == "" for v in values],
+                    dtype=bool)
+
+
+def read_columns(path):
+    """Columns of a .csv / .parquet / .npz file as {name: 1-D array}, standard names applied."""
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".csv":
+        with open(path, newline="", encoding="utf-8-sig") as fh:
+            reader = csv.reader(fh)
+            header = next(reader)
+            rows = list(reader)
+        raw = {name.strip(): [row[i] if i < len(row) else "" for row in rows] for i, name in enumerate(header)}
+        columns = {name: _as_column(values) for name, values in raw.items()}
+    elif ext == ".parquet":
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            try:
+                import pandas as pd
+            except ImportError:
+                raise ImportError("Leer Parquet requiere pyarrow o pandas (pip install pyarrow).") from None
+            frame = pd.read_parquet(path)
+            columns = {name: frame[name].to_numpy() for name in frame.columns}
+        else:
+            table = pq.read_table(path)
+            columns = {name: table.column(name).to_numpy(zero_copy_only=False) for name in table.column_names}
+    elif ext == ".npz":
+        with np.load(path, allow_pickle=True) as data:
+            columns = {name: data[name] for name in data.files}
+    else:
+        raise ValueError(f"Formato de catálogo no soportado: {path!r} (usa .csv, .parquet o .npz)")
+    return {COLUMN_ALIASES.get(name.lower(), name.lower()): np.asarray(values) for name, values in columns.items()}
+
+
+class SpeciesRegistry(Mapping):
+    """Species catalog stored column-wise; a read-only Mapping ``name → row dict``."""
+
+    def __init__(self, columns):
+        self._lock = threading.Lock()
+        self._state = self._build(columns)
+
+    @staticmethod
+    def _build(columns):
+        missing = [c for c in REQUIRED_SPECIES_COLUMNS if c not in columns]
+        if missing:
+            raise ValueError(f"Faltan columnas en el catálogo de especies: {', '.join(missing)}")
+        names = np.array([str(n) for n in columns["name"]], dtype=object)
+        n = len(names)
+        habitat = np.array([str(h).strip().lower() for h in columns["habitat"]], dtype=object)
+        unknown = sorted(set(habitat) - set(HABITATS))
+        if unknown:
+            raise ValueError(f"Hábitat desconocido en el catálogo: {', '.join(unknown)} (válidos: {', '.join(HABITATS)})")
+        cols = {"name": names, "habitat_code": np.array([HABITATS.index(h) for h in habitat], dtype=np.int8)}
+        for name in SPECIES_FLOAT_COLUMNS:
+            cols[name] = np.asarray(columns[name], dtype=float) if name in columns else np.full(n, np.nan)
+        for name, values in columns.items():
+            if name not in cols and name not in ("name", "habitat"):
+                values = np.asarray(values)
+                cols[name] = values.astype(float) if values.dtype.kind in "iubf" else values.astype(object)
+        for name, values in cols.items():
+            if len(values) != n:
+                raise ValueError(f"La columna {name!r} tiene {len(values)} filas; se esperaban {n}")
+        index = {}
+        for row, name in enumerate(names):
+            index[name] = row    # duplicated names: the last row wins
+        if len(index) != n:
+            keep = np.array(sorted(index.values()), dtype=np.intp)
+            cols = {name: values[keep] for name, values in cols.items()}
+            index = {name: row for row, name in enumerate(cols["name"])}
+        by_habitat = {h: np.flatnonzero(cols["habitat_code"] == k) for k, h in enumerate(HABITATS)}
+        search_keys = np.array([normalize_text(name) for name in cols["name"]], dtype=str)
+        return cols, index, by_habitat, search_keys
+
+    # ---- constructors ----
+    @classmethod
+    def from_records(cls, records):
+        """From a ``{name: {"habitat": …, "temp_opt": …, …}}`` dict (the old SPECIES layout)."""
+        fields = []
+        for row in records.values():
+            fields += [k for k in row if k not in fields]
+        columns = {"name": list(records)}
+        for field in fields:
+            values = [row.get(field) for row in records.values()]
+            columns[field] = values if field == "habitat" else _as_column(values)
+        return cls(columns)
+
+    @classmethod
+    def load(cls, path):
+        return cls(read_columns(path))
+
+    def save(self, path):
+        """Write the catalog as .npz (fast reload) or .csv."""
+        cols = self._state[0]
+        out = {"name": cols["name"].astype(str), "habitat": np.array(HABITATS, dtype=str)[cols["habitat_code"]]}
+        out.update((k, v) for k, v in cols.items() if k not in ("name", "habitat_code"))
+        if path.lower().endswith(".npz"):
+            np.savez(path, **{k: (v.astype(str) if v.dtype == object else v) for k, v in out.items()})
+            return
+        with open(path, "w", encoding="utf-8", newline="") as fh:
+            writer = csv.writer(fh, lineterminator="\n")
+            writer.writerow(list(out))
+            writer.writerows(zip(*(v.tolist() for v in out.values())))
+
+    def extend(self, other):
+        """Merge another registry (or columns dict) in place: new names are appended;
+        a known name keeps its row and only takes the columns ``other`` has, where
+        its value is not blank (NaN, None or empty text)."""
+        other = other if isinstance(other, SpeciesRegistry) else SpeciesRegistry(other)
+        with self._lock:
+            mine, index = self._state[0], self._state[1]
+            theirs = other._state[0]
+            target = np.array([index.get(name, -1) for name in theirs["name"]], dtype=np.intp)
+            known = target >= 0
+            merged = {}
+            for key in list(mine) + [k for k in theirs if k not in mine]:
+                a = mine.get(key)
+                b = theirs.get(key)
+                if a is None:
+                    a = np.full(len(mine["name"]), np.nan if b.dtype.kind == "f" else "", dtype=b.dtype)
+                if b is None:
+                    b = np.full(len(theirs["name"]), np.nan if a.dtype.kind == "f" else "", dtype=a.dtype)
+                if a.dtype.kind != b.dtype.kind:
+                    a, b = a.astype(object), b.astype(object)
+                a = a.copy()
+                if key in theirs:
+                    incoming = b[known]
+                    given = ~_blank(incoming)
+                    a[target[known][given]] = incoming[given]
+                merged[key] = np.concatenate([a, b[~known]])
+            merged["habitat"] = np.array(HABITATS, dtype=object)[merged.pop("habitat_code")]
+            self._state = self._build(merged)   # one reference swap: readers never see half an update
+        return self
+
+    # ---- Mapping interface ----
+    def __getitem__(self, name):
+        cols, index = self._state[0], self._state[1]
+        row = index[name]
+        out = {"habitat": HABITATS[cols["habitat_code"][row]]}
+        for key, values in cols.items():
+            if key not in ("name", "habitat_code"):
+                value = values[row]
+                out[key] = value.item() if hasattr(value, "item") else value
+        return out
+
+    def __contains__(self, name):
+        return name in self._state[1]
+
+    def __iter__(self):
+        return iter(self._state[0]["name"].tolist())
+
+    def __len__(self):
+        return len(self._state[0]["name"])
+
+    # ---- columnar access ----
+    @property
+    def names(self):
+        return self._state[0]["name"]
+
+    def column(self, name):
+        """The full column ``name`` (``"habitat"`` gives the habitat codes, see HABITATS)."""
+        return self._state[0]["habitat_code" if name == "habitat" else name]
+
+    @property
+    def columns(self):
+        return list(self._state[0])
+
+    def row(self, name):
+        return self._state[1][name]
+
+    def rows(self, names):
+        index = self._state[1]
+        return np.array([index[n] for n in names], dtype=np.intp)
+
+    def rows_by_habitat(self, habitat):
+        return self._state[2][habitat]
+
+    def search(self, query, limit=50, habitat=None):
+        """Names containing every word of ``query`` (accent/case-insensitive); prefix matches first."""
+        cols, _, by_habitat, keys = self._state
+        rows = by_habitat[habitat] if habitat else np.arange(len(keys))
+        words = normalize_text(query).split()
+        if words:
+            subset = keys[rows]
+            hit = np.ones(len(rows), dtype=bool)
+            for word in words:
+                hit &= np.char.find(subset, word) >= 0
+            rows = rows[hit]
+            prefix = np.char.startswith(keys[rows], words[0])
+            rows = np.concatenate([rows[prefix], rows[~prefix]])
+        if limit is not None:
+            rows = rows[:int(limit)]
+        return cols["name"][rows].tolist()
+
+
+class BiomeRegistry:
+    """Biomes with their baseline conditions (scenario fields) and whether they are underwater.
+
+    ``names`` is a plain list kept up to date in place (species.ENVIRONMENTS is this list).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.names = []
+        self._baselines = {}
+        self._marine = set()
+
+    @classmethod
+    def from_records(cls, records):
+        registry = cls()
+        for name, row in records.items():
+            registry.add(name, **row)
+        return registry
+
+    @classmethod
+    def load(cls, path):
+        """Biomes from a .csv / .parquet / .npz with columns name, marine and the BIOME_COLUMNS."""
+        columns = read_columns(path)
+        if "name" not in columns:
+            raise ValueError("Falta la columna 'name' en el catálogo de biomas")
+        registry = cls()
+        for row, name in enumerate(columns["name"]):
+            fields = {k: columns[k][row] for k in BIOME_COLUMNS if k in columns}
+            marine = columns["marine"][row] if "marine" in columns else False
+            registry.add(str(name), marine=str(marine).strip().lower() in ("1", "1.0", "true", "si", "sí", "yes"),
+                         **{k: float(v) for k, v in fields.items() if v == v})
+        return registry
+
+    def add(self, name, marine=False, **baseline):
+        """Register (or replace) a biome; ``baseline`` holds any of BIOME_COLUMNS."""
+        unknown = set(baseline) - set(BIOME_COLUMNS)
+        if unknown:
+            raise ValueError(f"Condiciones base desconocidas: {', '.join(sorted(unknown))}")
+        with self._lock:
+            if name not in self._baselines:
+                self.names.append(name)
+            self._baselines[name] = dict(baseline)
+            if marine:
+                self._marine.add(name)
+            else:
+                self._marine.discard(name)
+        return self
+
+    def extend(self, other):
+        for name in other.names:
+            self.add(name, marine=other.is_marine(name), **other.baseline(name))
+        return self
+
+    def baseline(self, name):
+        """Scenario fields (presion_init, temp_init, …) the biome sets; empty when it has none."""
+        return dict(self._baselines[name])
+
+    def is_marine(self, name):
+        return name in self._marine
+
+    def __contains__(self, name):
+        return name in self._baselines
+
+    def __iter__(self):
+        return iter(list(self.names))
+
+    def __len__(self):
+        return len(self.names)
@@ -0,0 +1,115 @@
+# -------------------------
+# Canvas / requestAnimationFrame renderer for precomputed trajectories
+# -------------------------
+from .payload import DECODE_PAYLOAD_JS
+
+# ctx.filter per motion.FILTER_* level (same look as the old CSS filters)
+CANVAS_FILTERS = ["none", "grayscale(35%) brightness(85%)", "grayscale(80%) brightness(65%)"]
+
+
+def render_animation_html(payload, payload_json, bg_url, sprite_url):
+    """Self-contained HTML: a <canvas> that interpolates every agent between simulation steps at display rate.
+
+    Agent 0 is the focal animal: its timeline drives the HUD and its end (death or
+    time-out) stops the scene and shows ``payload["end"]``.
+    """
+    return f"""
+<div id="sim_container" style="width:{payload['width']}px; height:{payload['height']}px; border-radius:12px; overflow:hidden; position:relative;">
+    <canvas id="sim_canvas" style="position:absolute; left:0; top:0; width:{payload['width']}px; height:{payload['height']}px;"></canvas>
+    <div id="hud" style="position:absolute; left:10px; top:10px; background:rgba(0,0,0,0.45); color:white; padding:8px; border-radius:6px; font-family:Arial, sans-serif;">
+        <div id="timer">Tiempo: 0s</div>
+        <div id="energy">Energía: 100</div>
+        <div id="narr">Estado: -</div>
+    </div>
+    <div id="end_overlay" style="position:absolute; left:0; top:0; width:100%; height:100%; display:none;
+         align-items:center; justify-content:center; background:rgba(0,0,0,0.6); color:white; font-size:22px;">
+        <div id="end_text" style="text-align:center;"></div>
+    </div>
+</div>
+<script>
+{DECODE_PAYLOAD_JS}
+(function(){{
+    const payload = {payload_json};
+    const decoded = decodePayload(payload);
+    const A = decoded.agents;
+    const width = payload.width, height = payload.height;
+    const stepMs = payload.step_interval * 1000;
+    const endStep = payload.end.step;              // last simulated step of the focal animal
+    const endMs = (endStep + 1) * stepMs;
+    const filters = {CANVAS_FILTERS!r};
+
+    const canvas = document.getElementById('sim_canvas');
+    const dpr = window.devicePixelRatio || 1;
+    canvas.width = width * dpr; canvas.height = height * dpr;
+    const ctx = canvas.getContext('2d');
+    ctx.scale(dpr, dpr);
+    const timerEl = document.getElementById('timer');
+    const energyEl = document.getElementById('energy');
+    const narrEl = document.getElementById('narr');
+    const endOverlay = document.getElementById('end_overlay');
+    const endText = document.getElementById('end_text');
+
+    const bg = new Image(); bg.src = '{bg_url}';
+    const sprite = new Image(); sprite.src = '{sprite_url}';
+
+    function drawBackground() {{
+        if (!bg.complete || !bg.naturalWidth) {{ ctx.fillStyle = '#222'; ctx.fillRect(0, 0, width, height); return; }}
+        // background-size: cover; background-position: center
+        const s = Math.max(width / bg.naturalWidth, height / bg.naturalHeight);
+        const w = bg.naturalWidth * s, h = bg.naturalHeight * s;
+        ctx.drawImage(bg, (width - w) / 2, (height - h) / 2, w, h);
+    }}
+
+    function drawAgents(k, frac) {{
+        if (!sprite.complete || !sprite.naturalWidth) return;
+        const sw = A.sprite_width, sh = sw * sprite.naturalHeight / sprite.naturalWidth;
+        const S = A.samples;
+        // back to front so the focal animal (agent 0) is drawn on top
+        for (let a = A.count - 1; a >= 0; a--) {{
+            const i0 = a * S + k, i1 = a * S + Math.min(k + 1, S - 1);
+            const x = A.x[i0] + (A.x[i1] - A.x[i0]) * frac;
+            const y = A.y[i0] + (A.y[i1] - A.y[i0]) * frac;
+            const op = A.opacity[i0] + (A.opacity[i1] - A.opacity[i0]) * frac;
+            const rot = A.rotation[i0] + (A.rotation[i1] - A.rotation[i0]) * frac;
+            ctx.save();
+            ctx.globalAlpha = op;
+            ctx.filter = filters[A.filter[i1]];
+            ctx.translate(x + sw / 2, y + sh / 2);
+            ctx.rotate(rot * Math.PI / 180);
+            ctx.drawImage(sprite, -sw / 2, -sh / 2, sw, sh);
+            ctx.restore();
+        }}
+    }}
+
+    let lastHudStep = -1;
+    function updateHud(step, elapsedMs) {{
+        timerEl.innerText = 'Tiempo: ' + Math.round(elapsedMs / 1000) + ' s';
+        if (step === lastHudStep) return;
+        lastHudStep = step;
+        energyEl.innerText = 'Energía: ' + Math.round(decoded.series.energy[step]);
+        const narrative = decoded.narrativeAt(step);
+        narrEl.innerText = narrative ? ('Estado: ' + narrative) : 'Estado: sin eventos';
+    }}
+
+    let t0 = null;
+    function frame(now) {{
+        if (t0 === null) t0 = now;
+        const elapsed = Math.min(now - t0, endMs);
+        // sample k+1 is reached at the end of step k (same timing as the old 500 ms ticks)
+        const pos = elapsed / stepMs;
+        const k = Math.min(Math.floor(pos), endStep + 1);
+        const frac = k > endStep ? 0 : pos - k;
+        drawBackground();
+        drawAgents(Math.min(k, A.samples - 1), frac);
+        updateHud(Math.min(k, endStep), elapsed);
+        if (elapsed >= endMs) {{
+            endText.innerHTML = '<div style="padding:20px; text-align:center;"><strong>Simulación finalizada</strong><br><br>Veredicto: <em>' + payload.end.verdict + '</em><br><br>Observación final: ' + (payload.end.reason || 'Ninguna') + '</div>';
+            endOverlay.style.display = 'flex';
+            return;
+        }}
+        requestAnimationFrame(frame);
+    }}
+    requestAnimationFrame(frame);
+}})();
+</script>
+"""
@@ -0,0 +1,41 @@
+# -------------------------
+# Reproducible RNG streams (numpy.random.Generator derived from one SeedSequence)
+# -------------------------
+# Every stochastic consumer gets its own stream addressed by a spawn key under the
+# user's seed, so a run's draws never depend on how many other runs were made, in
+# which order, or in which process:
+#   (KIND_RUN, i, STREAM_DRIFT)   environmental drift of run i (run 0 = focal animal)
+#   (KIND_RUN, i, STREAM_MOTION)  animation randomness (marine swim targets, herd layout)
+#   (KIND_ENSEMBLE, j)            Monte Carlo ensemble block j (runs j*block_size…; the
+#                                 block size therefore selects which draws each run gets)
+#   (KIND_POPULATION, k)          population engine (k: 0 individuals, 1 biome, 2 microclimate)
+# SeedSequence(seed, spawn_key=k) is exactly the child SeedSequence.spawn would
+# produce at that position, so workers can build their streams directly.
+import numpy as np
+
+KIND_RUN = 0
+KIND_ENSEMBLE = 1
+KIND_POPULATION = 2
+STREAM_DRIFT = 0
+STREAM_MOTION = 1
+
+
+def stream_seed(seed, *spawn_key):
+    return np.random.SeedSequence(int(seed), spawn_key=tuple(int(k) for k in spawn_key))
+
+
+def drift_rng(seed, run=0):
+    return np.random.default_rng(stream_seed(seed, KIND_RUN, run, STREAM_DRIFT))
+
+
+def motion_rng(seed, run=0):
+    return np.random.default_rng(stream_seed(seed, KIND_RUN, run, STREAM_MOTION))
+
+
+def ensemble_block_rng(seed, block):
+    return np.random.default_rng(stream_seed(seed, KIND_ENSEMBLE, block))
+
+
+def population_rngs(seed):
+    """(individuals, biome drift, microclimate) generators for the population engine."""
+    return tuple(np.random.default_rng(stream_seed(seed, KIND_POPULATION, k)) for k in range(3))
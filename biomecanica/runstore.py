@@ -0,0 +1,217 @@
+# -------------------------
+# Persistent run store (SQLite): parameters, summary metrics and packed timelines
+# -------------------------
+# One narrow ``runs`` row per scenario (indexed by scenario key and by
+# species/environment/final energy) and the timeline as a compressed blob in a
+# side table, so summary queries over millions of rows never touch the blobs.
+import json
+import sqlite3
+import threading
+import time
+import zlib
+
+import numpy as np
+
+from .model import compute_drivers, final_verdict, verdict_codes
+from .species import SPECIES
+
+# timeline key -> dtype of its packed column (row order in the blob)
+BLOB_SERIES = (
+    ("pres", "<f8"), ("temp", "<f8"), ("ox", "<f8"), ("alt", "<f8"),
+    ("energy", "<f8"), ("speed_ratio", "<f8"), ("ox_factor", "<f8"), ("conditions", "<u2"),
+)
+BLOB_VERSION = 1
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    key TEXT NOT NULL UNIQUE,
+    species_name TEXT NOT NULL,
+    environment TEXT NOT NULL,
+    presion_init REAL NOT NULL,
+    temp_init REAL NOT NULL,
+    ox_init REAL NOT NULL,
+    altitud_init REAL NOT NULL,
+    dyn_intensity REAL NOT NULL,
+    seed INTEGER NOT NULL,
+    steps INTEGER NOT NULL,
+    step_interval REAL NOT NULL,
+    final_energy REAL NOT NULL,
+    min_energy REAL NOT NULL,
+    verdict_code INTEGER NOT NULL,
+    verdict TEXT NOT NULL,
+    drivers TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS runs_species_env_energy ON runs (species_name, environment, final_energy);
+CREATE INDEX IF NOT EXISTS runs_env_energy ON runs (environment, final_energy);
+CREATE INDEX IF NOT EXISTS runs_verdict ON runs (verdict_code, species_name);
+CREATE TABLE IF NOT EXISTS timelines (
+    run_id INTEGER PRIMARY KEY REFERENCES runs (id) ON DELETE CASCADE,
+    blob BLOB NOT NULL
+);
+"""
+
+_PARAM_COLUMNS = ("species_name", "environment", "presion_init", "temp_init", "ox_init", "altitud_init",
+                  "dyn_intensity", "seed", "steps", "step_interval")
+_SUMMARY_COLUMNS = ("id",) + _PARAM_COLUMNS + ("final_energy", "min_energy", "verdict_code", "verdict", "drivers",
+                                               "created_at")
+_INSERT_COLUMNS = ("key",) + _SUMMARY_COLUMNS[1:]
+
+
+def encode_timeline(timeline):
+    """Timeline dict -> zlib-compressed blob (version byte + step count + column-major packed series)."""
+    steps = len(timeline["energy"])
+    body = b"".join(np.asarray(timeline[name], dtype=dtype).tobytes() for name, dtype in BLOB_SERIES)
+    header = bytes([BLOB_VERSION]) + np.uint32(steps).tobytes()
+    return header + zlib.compress(body, 6)
+
+
+def decode_timeline(blob, temp_opt):
+    """Inverse of encode_timeline; series come back as Python lists like compute_stepwise_evolution's."""
+    if blob[0] != BLOB_VERSION:
+        raise ValueError(f"Versión de timeline no soportada: {blob[0]}")
+    steps = int(np.frombuffer(blob[1:5], dtype="<u4")[0])
+    body = zlib.decompress(blob[5:])
+    timeline = {}
+    offset = 0
+    for name, dtype in BLOB_SERIES:
+        size = np.dtype(dtype).itemsize * steps
+        timeline[name] = np.frombuffer(body, dtype=dtype, count=steps, offset=offset).tolist()
+        offset += size
+    timeline["temp_opt"] = temp_opt
+    return timeline
+
+
+def store_key(key):
+    """Text form of a cache.scenario_key tuple (the UNIQUE lookup column)."""
+    return json.dumps(list(key), ensure_ascii=False, separators=(",", ":"))
+
+
+class RunStore:
+    """Embedded on-disk store of simulated runs, shared by sessions, processes and days.
+
+    ``path`` is a SQLite file (``":memory:"`` for a throwaway store). Writes use WAL
+    mode so readers in other processes are not blocked; one connection is shared by
+    the threads of a process behind a lock.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30.0)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock, self._conn:
+            if path != ":memory:":
+                self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA foreign_keys=ON")
+            self._conn.executescript(_SCHEMA)
+        self.hits = 0
+        self.misses = 0
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    # ---- write ----
+
+    def _row(self, key, params, timeline):
+        spec = SPECIES[params["species_name"]]
+        energy = timeline["energy"]
+        final_energy = float(energy[-1])
+        drivers = compute_drivers(float(np.mean(timeline["temp"])), float(np.mean(timeline["ox"])),
+                                  float(np.mean(timeline["pres"])), spec["temp_opt"], spec["ox_opt"], spec["habitat"],
+                                  params["environment"])
+        return (store_key(key), str(params["species_name"]), str(params["environment"]),
+                float(params["presion_init"]), float(params["temp_init"]), float(params["ox_init"]),
+                float(params["altitud_init"]), float(params["dyn_intensity"]), int(params["seed"]), len(energy),
+                float(params["step_interval"]), final_energy, float(np.min(energy)),
+                int(verdict_codes(np.asarray(final_energy))), final_verdict(final_energy),
+                json.dumps(drivers, ensure_ascii=False), time.time()), encode_timeline(timeline)
+
+    def put(self, key, params, timeline):
+        """Record one run (``params`` holds the scenario fields; an existing ``key`` is replaced)."""
+        self.put_many([(key, params, timeline)])
+
+    def put_many(self, runs):
+        """Record ``(key, params, timeline)`` triples in one transaction."""
+        rows = [self._row(*run) for run in runs]
+        sql = f"INSERT INTO runs ({', '.join(_INSERT_COLUMNS)}) VALUES ({', '.join('?' * len(_INSERT_COLUMNS))})"
+        with self._lock, self._conn:
+            for row, blob in rows:
+                self._conn.execute("DELETE FROM runs WHERE key = ?", (row[0],))
+                cur = self._conn.execute(sql, row)
+                self._conn.execute("INSERT INTO timelines (run_id, blob) VALUES (?, ?)", (cur.lastrowid, blob))
+
+    # ---- read ----
+
+    def get(self, key):
+        """Stored timeline for ``key`` (lists, like compute_stepwise_evolution) or None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT r.species_name, t.blob FROM runs r JOIN timelines t ON t.run_id = r.id WHERE r.key = ?",
+                (store_key(key),)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return decode_timeline(row["blob"], SPECIES[row["species_name"]]["temp_opt"])
+
+    def get_or_compute(self, key, params, compute):
+        """Return the stored timeline for ``key`` or call ``compute()`` and record its result."""
+        timeline = self.get(key)
+        if timeline is None:
+            timeline = compute()
+            self.put(key, params, timeline)
+        return timeline
+
+    def __contains__(self, key):
+        with self._lock:
+            return self._conn.execute("SELECT 1 FROM runs WHERE key = ?", (store_key(key),)).fetchone() is not None
+
+    def _where(self, species_name=None, environment=None, verdict_code=None, min_final_energy=None,
+               max_final_energy=None, seed=None):
+        clauses, args = [], []
+        for column, value in (("species_name", species_name), ("environment", environment),
+                              ("verdict_code", verdict_code), ("seed", seed)):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                args.append(value)
+        if min_final_energy is not None:
+            clauses.append("final_energy >= ?")
+            args.append(float(min_final_energy))
+        if max_final_energy is not None:
+            clauses.append("final_energy < ?")
+            args.append(float(max_final_energy))
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", args
+
+    def query(self, limit=1000, order_by="final_energy", **filters):
+        """Summary rows (no timelines) matching the filters, e.g.
+        ``query(species_name="Tyrannosaurus rex", environment="Desierto", max_final_energy=45)``.
+
+        Filters: species_name, environment, verdict_code, seed, min_final_energy
+        (inclusive) and max_final_energy (exclusive). ``limit=None`` returns every row.
+        """
+        if order_by not in _SUMMARY_COLUMNS:
+            raise ValueError(f"Columna de orden desconocida: {order_by!r}")
+        where, args = self._where(**filters)
+        sql = f"SELECT {', '.join(_SUMMARY_COLUMNS)} FROM runs{where} ORDER BY {order_by}"
+        if limit is not None:
+            sql += " LIMIT ?"
+            args.append(int(limit))
+        with self._lock:
+            rows = self._conn.execute(sql, args).fetchall()
+        out = []
+        for row in rows:
+            item = dict(row)
+            item["drivers"] = json.loads(item["drivers"])
+            out.append(item)
+        return out
+
+    def count(self, **filters):
+        where, args = self._where(**filters)
+        with self._lock:
+            return self._conn.execute(f"SELECT COUNT(*) FROM runs{where}", args).fetchone()[0]
+
+    def stats(self):
+        return {"runs": self.count(), "hits": self.hits, "misses": self.misses, "path": self.path}
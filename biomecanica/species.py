@@ -0,0 +1,55 @@
+# -------------------------
+# Especies, biomas y valores base
+# -------------------------
+import os
+
+from .registry import BiomeRegistry, SpeciesRegistry
+
+SPECIES = SpeciesRegistry.from_records({
+    "Tyrannosaurus rex": {"masa": 7000, "femur": 1.2, "habitat": "terrestre", "temp_opt": 30.0, "ox_opt": 21.0},
+    "Velociraptor mongoliensis": {"masa": 15, "femur": 0.8, "habitat": "terrestre", "temp_opt": 32.0, "ox_opt": 21.0},
+    "Brachiosaurus altithorax": {"masa": 35000, "femur": 2.5, "habitat": "terrestre", "temp_opt": 28.0, "ox_opt": 21.0},
+    "Spinosaurus aegyptiacus": {"masa": 6000, "femur": 1.5, "habitat": "marino", "temp_opt": 28.0, "ox_opt": 20.0},
+    "Crocodylus (Cocodrilo)": {"masa": 1000, "femur": 0.9, "habitat": "marino", "temp_opt": 29.0, "ox_opt": 20.0},
+    "Aquila chrysaetos (Águila)": {"masa": 6, "femur": 0.25, "habitat": "volador", "temp_opt": 40.0, "ox_opt": 21.0},
+})
+
+# Biomes: baseline conditions (used by the ranking and as presets) and whether they are underwater
+BIOMES = BiomeRegistry.from_records({
+    "Llanura": {"presion_init": 101.3, "temp_init": 25, "ox_init": 21, "altitud_init": 0},
+    "Selva": {"presion_init": 100.8, "temp_init": 28, "ox_init": 21, "altitud_init": 50},
+    "Desierto": {"presion_init": 100.5, "temp_init": 40, "ox_init": 21, "altitud_init": 300},
+    "Montaña": {"presion_init": 70.1, "temp_init": 5, "ox_init": 21, "altitud_init": 3000},
+    "Fondo marino": {"presion_init": 200.0, "temp_init": 8, "ox_init": 21, "altitud_init": -1000, "marine": True},
+})
+ENVIRONMENTS = BIOMES.names   # same list object: biomes added later show up here
+
+# Extra catalogs, one or more paths separated by os.pathsep (.csv, .parquet or .npz):
+# BIOMECANICA_CATALOG for species, BIOMECANICA_BIOMES for biomes
+for _path in filter(None, os.environ.get("BIOMECANICA_CATALOG", "").split(os.pathsep)):
+    SPECIES.extend(SpeciesRegistry.load(_path))
+for _path in filter(None, os.environ.get("BIOMECANICA_BIOMES", "").split(os.pathsep)):
+    BIOMES.extend(BiomeRegistry.load(_path))
+
+# Movement region fractions depending on habitat (fractions of container height)
+REGION = {
+    "terrestre": {"y_min_frac": 0.65, "y_max_frac": 0.85},
+    "marino": {"y_min_frac": 0.10, "y_max_frac": 0.85},
+    "volador": {"y_min_frac": 0.05, "y_max_frac": 0.5},
+}
+
+# Simulation parameters
+SIM_DURATION = 20.0  # seconds total
+STEP_INTERVAL = 0.5  # seconds per simulation step
+
+# Base scenario (same values the app uses as widget defaults)
+SCENARIO_DEFAULTS = {
+    "species_name": list(SPECIES.keys())[0],
+    "environment": "Llanura",
+    "presion_init": 101.3,
+    "temp_init": 25,
+    "ox_init": 21,
+    "altitud_init": 0,
+    "dyn_intensity": 0.45,
+    "seed": 12345,
+}
@@ -0,0 +1,300 @@
+# -------------------------
+# Long-horizon streaming simulation (bounded memory)
+# -------------------------
+import argparse
+import csv
+import math
+import sys
+
+import numpy as np
+
+from .export import TIMELINE_COLUMNS, timeline_columns
+from .model import VERDICT_WEAK, compute_drivers, final_verdict, normalize_scenario
+from .rng import drift_rng
+from .narrative import condition_masks, habitat_mask
+from .species import SPECIES
+
+COLLAPSE_ENERGY = 2.0   # same "energía crítica" cut the animation uses to kill the animal
+DEFAULT_CHUNK_STEPS = 8192
+
+# Drift bounds per variable (pres, temp, ox, alt) and per-step noise scale, as in compute_stepwise_evolution
+_LOWER = np.array([20.0, -50.0, 1.0, -10000.0])
+_UPPER = np.array([200.0, 60.0, 40.0, 8000.0])
+_SCALE = np.array([0.7, 0.6, 0.4, 5.0])
+
+
+def _clamped_walk(start, increments, lower, upper):
+    """Sequential ``x = clip(x + d, lower, upper)`` over ``increments`` with the same rounding as the scalar loop.
+
+    The unclamped path is accumulated in one pass; only when it leaves the bounds is
+    the walk clamped at that step and restarted from there.
+    """
+    out = np.empty(len(increments))
+    x = start
+    i = 0
+    n = len(increments)
+    while i < n:
+        path = np.add.accumulate(np.concatenate(([x], increments[i:])))[1:]
+        bad = np.flatnonzero((path < lower) | (path > upper))
+        if bad.size == 0:
+            out[i:] = path
+            break
+        j = bad[0]
+        out[i:i + j] = path[:j]
+        x = min(upper, max(lower, path[j]))
+        out[i + j] = x
+        i += j + 1
+    return out
+
+
+def seasonal_offsets(t, seasonal):
+    """Temperature / O₂ offsets of a sinusoidal seasonal cycle at times ``t`` (seconds).
+
+    ``seasonal``: {"period": seconds, "temp_amp": °C, "ox_amp": %, "phase": radians}.
+    """
+    if not seasonal:
+        return 0.0, 0.0
+    w = 2.0 * math.pi * np.asarray(t) / float(seasonal["period"]) + float(seasonal.get("phase", 0.0))
+    s = np.sin(w)
+    return float(seasonal.get("temp_amp", 0.0)) * s, float(seasonal.get("ox_amp", 0.0)) * s
+
+
+def stream_evolution(presion0, temp0, ox0, alt0, dyn_intensity, steps, step_interval, temp_opt, habitat, environment,
+                     seed, chunk_steps=DEFAULT_CHUNK_STEPS, seasonal=None):
+    """Yield the timeline in chunks of at most ``chunk_steps`` steps (dicts of NumPy arrays).
+
+    Draws come from ``rng.drift_rng(seed)`` in the same order as the single-run
+    model, so without ``seasonal`` the chunks reproduce compute_stepwise_evolution. The
+    seasonal cycle shifts the temperature and O₂ the animal experiences on top of the
+    random walk (clamped to the same ranges).
+    """
+    rng = drift_rng(seed)
+    state = np.array([presion0, temp0, ox0, alt0], dtype=float)
+    energy = 100.0
+    base_mask = habitat_mask(habitat, environment)
+
+    for start in range(0, steps, chunk_steps):
+        n = min(chunk_steps, steps - start)
+        increments = (rng.standard_normal((n, 4)) * _SCALE) * dyn_intensity
+        walks = [_clamped_walk(state[k], increments[:, k], _LOWER[k], _UPPER[k]) for k in range(4)]
+        state = np.array([w[-1] for w in walks])
+        pres, temp, ox, alt = walks
+
+        t = (start + np.arange(n)) * step_interval
+        if seasonal:
+            temp_off, ox_off = seasonal_offsets(t, seasonal)
+            temp = np.clip(temp + temp_off, _LOWER[1], _UPPER[1])
+            ox = np.clip(ox + ox_off, _LOWER[2], _UPPER[2])
+
+        # math.exp per element: np.exp may differ in the last ulp from the scalar model
+        altitude_term = np.fromiter((math.exp(-a / 7000.0) for a in alt.tolist()), float, n)
+        ox_partial = (pres / 101.3) * (ox / 21.0) * altitude_term
+        temp_diff = temp - temp_opt
+        temp_penalty = np.abs(temp_diff) * 0.02
+        pres_penalty = np.where(pres > 140, 0.25, 0.0) + np.where(pres < 60, 0.18, 0.0)
+        ox_factor = np.clip(ox_partial, 0.01, 2.0)
+
+        delta_energy = - (temp_penalty * 6 + pres_penalty * 5 + (1 - np.minimum(1.0, ox_factor)) * 12) * (step_interval / 2.0)
+        # delta_energy <= 0, so max(0, e + d) step by step equals max(0, e0 + running sum)
+        energies = np.maximum(0.0, np.add.accumulate(np.concatenate(([energy], delta_energy)))[1:])
+        energy = float(energies[-1])
+        speed_ratio = np.maximum(0.02, np.sqrt(energies / 100.0))
+
+        conditions = condition_masks(temp_diff, ox_factor, pres, alt, base_mask)
+
+        yield {
+            "start": start, "t": t,
+            "pres": pres, "temp": temp, "ox": ox, "alt": alt,
+            "energy": energies, "speed_ratio": speed_ratio, "ox_factor": ox_factor, "conditions": conditions,
+            "temp_opt": temp_opt,
+        }
+
+
+class RunningSummary:
+    """Aggregates over streamed chunks: means for ``drivers``, min energy and time-to-collapse."""
+
+    def __init__(self, step_interval):
+        self.step_interval = step_interval
+        self.n = 0
+        self.sum_temp = 0.0
+        self.sum_ox = 0.0
+        self.sum_pres = 0.0
+        self.min_energy = math.inf
+        self.final_energy = None
+        self.time_to_weak = None       # first t with energy <= VERDICT_WEAK cut (45)
+        self.time_to_collapse = None   # first t with energy <= COLLAPSE_ENERGY
+
+    def update(self, chunk):
+        energy = chunk["energy"]
+        self.n += len(energy)
+        self.sum_temp += float(np.sum(chunk["temp"]))
+        self.sum_ox += float(np.sum(chunk["ox"]))
+        self.sum_pres += float(np.sum(chunk["pres"]))
+        self.min_energy = min(self.min_energy, float(energy.min()))
+        self.final_energy = float(energy[-1])
+        if self.time_to_weak is None:
+            hit = np.flatnonzero(energy <= VERDICT_WEAK)
+            if hit.size:
+                self.time_to_weak = float(chunk["t"][hit[0]])
+        if self.time_to_collapse is None:
+            hit = np.flatnonzero(energy <= COLLAPSE_ENERGY)
+            if hit.size:
+                self.time_to_collapse = float(chunk["t"][hit[0]])
+
+    def summary(self, spec, environment):
+        avg_temp = self.sum_temp / self.n
+        avg_ox = self.sum_ox / self.n
+        avg_pres = self.sum_pres / self.n
+        return {
+            "steps": self.n,
+            "duration": self.n * self.step_interval,
+            "final_energy": self.final_energy,
+            "min_energy": self.min_energy,
+            "verdict": final_verdict(self.final_energy),
+            "time_to_weak": self.time_to_weak,
+            "time_to_collapse": self.time_to_collapse,
+            "avg_temp": avg_temp,
+            "avg_ox": avg_ox,
+            "avg_pres": avg_pres,
+            "drivers": compute_drivers(avg_temp, avg_ox, avg_pres, spec["temp_opt"], spec["ox_opt"],
+                                       spec["habitat"], environment),
+        }
+
+
+class Downsampler:
+    """Keeps every ``stride``-th step so at most ``max_points`` samples reach the chart."""
+
+    def __init__(self, total_steps, max_points=2000, keys=("energy", "speed_ratio", "temp", "ox")):
+        self.stride = max(1, math.ceil(total_steps / max_points))
+        self.keys = keys
+        self._parts = {k: [] for k in ("t",) + tuple(keys)}
+
+    def update(self, chunk):
+        first = (-chunk["start"]) % self.stride
+        for k in self._parts:
+            self._parts[k].append(np.asarray(chunk[k])[first::self.stride])
+
+    def result(self):
+        return {k: np.concatenate(v) if v else np.empty(0) for k, v in self._parts.items()}
+
+
+class CsvChunkWriter:
+    """Appends chunks with the app's CSV columns (narrative decoded per chunk)."""
+
+    def __init__(self, fh):
+        self._writer = csv.writer(fh, lineterminator="\n")
+        self._writer.writerow(TIMELINE_COLUMNS)
+        self._step_interval = None
+
+    def write(self, chunk, step_interval):
+        lists = {k: (v.tolist() if isinstance(v, np.ndarray) else v) for k, v in chunk.items()}
+        cols = timeline_columns(lists, step_interval)
+        t = [round((chunk["start"] + i) * step_interval, 2) for i in range(len(chunk["energy"]))]
+        cols["t (s)"] = t
+        self._writer.writerows(zip(*(cols[c] for c in TIMELINE_COLUMNS)))
+
+    def close(self):
+        pass
+
+
+class ParquetChunkWriter:
+    """Appends chunks as Parquet row groups (needs pyarrow); stores the condition bitmask instead of text."""
+
+    def __init__(self, path):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as exc:
+            raise ImportError("La salida Parquet requiere pyarrow (pip install pyarrow).") from exc
+        self._pa = pa
+        self._schema = pa.schema([(name, pa.float64()) for name in ("t", "pres", "temp", "ox", "alt", "energy",
+                                                                   "speed_ratio", "ox_factor")]
+                                 + [("conditions", pa.uint16())])
+        self._writer = pq.ParquetWriter(path, self._schema)
+
+    def write(self, chunk, step_interval):
+        table = self._pa.table({name: chunk[name] for name in self._schema.names}, schema=self._schema)
+        self._writer.write_table(table)
+
+    def close(self):
+        self._writer.close()
+
+
+def run_streaming(scenario, duration, out=None, fmt="csv", seasonal=None, chunk_steps=DEFAULT_CHUNK_STEPS,
+                  max_points=2000, progress=None):
+    """Run a long scenario, writing chunks to ``out`` (path or text file for CSV) as they are produced.
+
+    Returns ``(summary, downsampled)``; memory use is bounded by ``chunk_steps`` and ``max_points``.
+    """
+    sc = normalize_scenario(scenario)
+    spec = SPECIES[sc["species_name"]]
+    step_interval = sc["step_interval"]
+    steps = int(duration / step_interval)
+
+    writer = None
+    owned_fh = None
+    if out is not None:
+        if fmt == "parquet":
+            writer = ParquetChunkWriter(out)
+        else:
+            if isinstance(out, str):
+                out = owned_fh = open(out, "w", encoding="utf-8", newline="")
+            writer = CsvChunkWriter(out)
+
+    aggregates = RunningSummary(step_interval)
+    sampler = Downsampler(steps, max_points)
+    try:
+        for chunk in stream_evolution(sc["presion_init"], sc["temp_init"], sc["ox_init"], sc["altitud_init"],
+                                      sc["dyn_intensity"], steps, step_interval, spec["temp_opt"], spec["habitat"],
+                                      sc["environment"], sc["seed"], chunk_steps=chunk_steps, seasonal=seasonal):
+            aggregates.update(chunk)
+            sampler.update(chunk)
+            if writer is not None:
+                writer.write(chunk, step_interval)
+            if progress is not None:
+                progress(chunk["start"] + len(chunk["energy"]), steps)
+    finally:
+        if writer is not None:
+            writer.close()
+        if owned_fh is not None:
+            owned_fh.close()
+    return aggregates.summary(spec, sc["environment"]), sampler.result()
+
+
+def main(argv=None):
+    import json
+
+    parser = argparse.ArgumentParser(prog="python -m biomecanica.stream",
+                                     description="Simulación de largo plazo en flujo (memoria acotada).")
+    parser.add_argument("scenario", help="JSON con un escenario (mismas claves que la app)")
+    parser.add_argument("--duration", type=float, required=True, help="Duración total en segundos")
+    parser.add_argument("-o", "--out", required=True, help="Archivo de salida (.csv o .parquet)")
+    parser.add_argument("--season-period", type=float, default=None, help="Periodo estacional en segundos")
+    parser.add_argument("--season-temp-amp", type=float, default=0.0, help="Amplitud estacional de temperatura (°C)")
+    parser.add_argument("--season-ox-amp", type=float, default=0.0, help="Amplitud estacional de O₂ (%%)")
+    parser.add_argument("--chunk-steps", type=int, default=DEFAULT_CHUNK_STEPS)
+    parser.add_argument("--adaptive", action="store_true",
+                        help="Integrador adaptativo por eventos (sin ciclo estacional)")
+    args = parser.parse_args(argv)
+
+    with open(args.scenario, encoding="utf-8") as fh:
+        scenario = json.load(fh)
+    seasonal = None
+    if args.season_period:
+        seasonal = {"period": args.season_period, "temp_amp": args.season_temp_amp, "ox_amp": args.season_ox_amp}
+    fmt = "parquet" if args.out.endswith(".parquet") else "csv"
+    if args.adaptive:
+        if seasonal:
+            parser.error("--adaptive no admite ciclo estacional")
+        from .adaptive import run_adaptive
+        summary, _ = run_adaptive(scenario, args.duration, out=args.out, fmt=fmt, chunk_steps=args.chunk_steps)
+        print(json.dumps(summary, ensure_ascii=False, indent=2))
+        return 0
+    summary, _ = run_streaming(scenario, args.duration, out=args.out, fmt=fmt, seasonal=seasonal,
+                               chunk_steps=args.chunk_steps)
+    print(json.dumps(summary, ensure_ascii=False, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,273 @@
+# -------------------------
+# Surrogate lookup table: expected final energy / survival probability on a dense grid
+# -------------------------
+# Offline, every species is evaluated over pressure × temperature × O₂ × altitude ×
+# dyn_intensity with ``n_samples`` drift realizations per grid point (the final
+# energy does not depend on the biome). The table is a float32 .npy opened with
+# mmap_mode="r" plus a JSON sidecar; at runtime ``predict`` interpolates the 32
+# surrounding grid corners multilinearly.
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from .model import (SURVIVAL_THRESHOLD, compute_ensemble_evolution, compute_final_energy_grid, drift_noise,
+                    final_verdict, verdict_codes)
+from .species import SIM_DURATION, SPECIES, STEP_INTERVAL
+
+SURROGATE_PARAMS = ("presion_init", "temp_init", "ox_init", "altitud_init", "dyn_intensity")
+SURROGATE_FIELDS = ("expected_energy", "survival_probability")
+SURROGATE_VERSION = 1
+
+# Slider ranges of the app, (min, max, default number of grid points)
+DEFAULT_AXES = {
+    "presion_init": (20.0, 200.0, 19),
+    "temp_init": (-30.0, 60.0, 31),
+    "ox_init": (1.0, 40.0, 14),
+    "altitud_init": (-10000.0, 8000.0, 19),
+    "dyn_intensity": (0.0, 1.0, 6),
+}
+DEFAULT_SAMPLES = 32
+BUILD_SEED = 20240601   # drift realizations of the table (independent of the app's seed widget)
+
+_TABLE_FILE = "table.npy"
+_META_FILE = "meta.json"
+
+
+def surrogate_axes(resolution=None):
+    """Grid axes; ``resolution`` overrides the number of points per parameter."""
+    resolution = resolution or {}
+    return {name: np.linspace(lo, hi, int(resolution.get(name, n))) for name, (lo, hi, n) in DEFAULT_AXES.items()}
+
+
+def _evaluate_points(points, temp_opt, noises, step_interval):
+    """(expected_energy, survival_probability) at ``points`` (n, 5) averaged over ``noises``."""
+    total = np.zeros(len(points))
+    alive = np.zeros(len(points))
+    for noise in noises:
+        energy = compute_final_energy_grid(*points.T, temp_opt, noise, step_interval)
+        total += energy
+        alive += energy > SURVIVAL_THRESHOLD
+    return total / len(noises), alive / len(noises)
+
+
+def _build_chunk(species_idx, flat_idx, axes_values, temp_opt, noises, step_interval):
+    shape = tuple(len(v) for v in axes_values)
+    coords = np.unravel_index(flat_idx, shape)
+    points = np.stack([values[c] for values, c in zip(axes_values, coords)], axis=1)
+    return species_idx, flat_idx, _evaluate_points(points, temp_opt, noises, step_interval)
+
+
+def build_surrogate(out_dir, species_names=None, resolution=None, n_samples=DEFAULT_SAMPLES, seed=BUILD_SEED,
+                    sim_duration=SIM_DURATION, step_interval=STEP_INTERVAL, workers=None, chunk_size=8192,
+                    progress=None):
+    """Evaluate the grid and write ``out_dir/table.npy`` (species, *grid, field) + ``out_dir/meta.json``.
+
+    ``workers=0`` evaluates in-process; otherwise chunks run on a process pool.
+    """
+    species_names = list(species_names or SPECIES)
+    axes = surrogate_axes(resolution)
+    axes_values = [axes[name] for name in SURROGATE_PARAMS]
+    shape = tuple(len(v) for v in axes_values)
+    n_points = int(np.prod(shape))
+    steps = int(sim_duration / step_interval)
+    noises = [drift_noise(seed, steps, run=r) for r in range(int(n_samples))]
+
+    os.makedirs(out_dir, exist_ok=True)
+    table = np.lib.format.open_memmap(os.path.join(out_dir, _TABLE_FILE), mode="w+", dtype="<f4",
+                                      shape=(len(species_names),) + shape + (len(SURROGATE_FIELDS),))
+    flat = table.reshape(len(species_names), n_points, len(SURROGATE_FIELDS))
+    tasks = [(s_idx, np.arange(start, min(start + chunk_size, n_points)), axes_values, SPECIES[name]["temp_opt"],
+              noises, step_interval)
+             for s_idx, name in enumerate(species_names) for start in range(0, n_points, chunk_size)]
+
+    def store(result, done):
+        s_idx, flat_idx, (energy, survival) = result
+        flat[s_idx, flat_idx, 0] = energy
+        flat[s_idx, flat_idx, 1] = survival
+        if progress is not None:
+            progress(done, len(tasks))
+
+    started = time.perf_counter()
+    if workers == 0:
+        for done, task in enumerate(tasks, 1):
+            store(_build_chunk(*task), done)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for done, result in enumerate(pool.map(_build_chunk, *zip(*tasks)), 1):
+                store(result, done)
+    table.flush()
+    del table, flat
+
+    meta = {
+        "version": SURROGATE_VERSION,
+        "species": species_names,
+        "params": list(SURROGATE_PARAMS),
+        "fields": list(SURROGATE_FIELDS),
+        "axes": {name: axes[name].tolist() for name in SURROGATE_PARAMS},
+        "n_samples": int(n_samples),
+        "seed": int(seed),
+        "sim_duration": float(sim_duration),
+        "step_interval": float(step_interval),
+        "build_seconds": time.perf_counter() - started,
+    }
+    _write_meta(out_dir, meta)
+    return Surrogate(out_dir)
+
+
+def _write_meta(out_dir, meta):
+    tmp = os.path.join(out_dir, _META_FILE + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as fh:
+        json.dump(meta, fh, ensure_ascii=False, indent=2)
+    os.replace(tmp, os.path.join(out_dir, _META_FILE))
+
+
+class Surrogate:
+    """Memory-mapped lookup table written by build_surrogate.
+
+    ``predict(species_name, presion_init, temp_init, ox_init, altitud_init, dyn_intensity)``
+    returns expected final energy and survival probability (inputs outside the grid
+    are clamped to its edges). ``error`` holds the last validation report, if any.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, _META_FILE), encoding="utf-8") as fh:
+            self.meta = json.load(fh)
+        if self.meta.get("version") != SURROGATE_VERSION:
+            raise ValueError(f"Versión de tabla sustituta no soportada: {self.meta.get('version')!r}")
+        self.table = np.load(os.path.join(path, _TABLE_FILE), mmap_mode="r")
+        self.species = {name: i for i, name in enumerate(self.meta["species"])}
+        self.axes = [np.asarray(self.meta["axes"][name]) for name in self.meta["params"]]
+        self.error = self.meta.get("validation")
+
+    def _corners(self, values):
+        """Per-axis (lower index, upper weight)."""
+        out = []
+        for axis, v in zip(self.axes, values):
+            if len(axis) == 1:
+                out.append((0, 0.0))
+                continue
+            v = min(max(float(v), axis[0]), axis[-1])
+            i = min(int(np.searchsorted(axis, v, side="right")) - 1, len(axis) - 2)
+            out.append((i, (v - axis[i]) / (axis[i + 1] - axis[i])))
+        return out
+
+    def lookup(self, species_name, values):
+        """Interpolated field vector (expected_energy, survival_probability) at ``values`` (grid-axis order)."""
+        corners = self._corners(values)
+        block = self.table[(self.species[species_name],)
+                           + tuple(slice(i, i + 2) for i, _ in corners)].astype(float)
+        for (_, w), axis in zip(corners, self.axes):
+            # contract the leading grid axis: (1 - w) * lower + w * upper
+            block = block[0] if len(axis) == 1 else block[0] * (1.0 - w) + block[1] * w
+        return block
+
+    def predict(self, species_name, presion_init, temp_init, ox_init, altitud_init, dyn_intensity):
+        energy, survival = self.lookup(species_name, (presion_init, temp_init, ox_init, altitud_init, dyn_intensity))
+        return {
+            "expected_energy": float(energy),
+            "survival_probability": float(min(1.0, max(0.0, survival))),
+            "verdict": final_verdict(float(energy)),
+        }
+
+    def validate(self, n_points=200, seed=0, n_runs=1000, species_names=None):
+        """Error of the table against the exact engine at random off-grid points.
+
+        ``interpolation``: vs the model evaluated at the point with the table's own
+        drift realizations (grid error only). ``ensemble``: vs compute_ensemble_evolution
+        with ``n_runs`` fresh trajectories (grid + sampling error). Each reports
+        mean / p95 / max absolute error of energy and survival probability, plus the
+        fraction of points where the verdict category of the expected energy agrees.
+        """
+        rng = np.random.default_rng(seed)
+        steps = int(self.meta["sim_duration"] / self.meta["step_interval"])
+        step_interval = self.meta["step_interval"]
+        noises = [drift_noise(self.meta["seed"], steps, run=r) for r in range(self.meta["n_samples"])]
+        lows = np.array([a[0] for a in self.axes])
+        highs = np.array([a[-1] for a in self.axes])
+        report = {}
+        for name in species_names or self.meta["species"]:
+            temp_opt = SPECIES[name]["temp_opt"]
+            points = lows + (highs - lows) * rng.random((int(n_points), len(self.axes)))
+            predicted = np.array([self.lookup(name, p) for p in points])
+            exact_energy, exact_survival = _evaluate_points(points, temp_opt, noises, step_interval)
+            ens_energy = np.empty(len(points))
+            ens_survival = np.empty(len(points))
+            for k, p in enumerate(points):
+                ens = compute_ensemble_evolution(*p, steps, step_interval, n_runs, seed + k, temp_opt)
+                ens_energy[k] = ens["final_energy"].mean()
+                ens_survival[k] = ens["survival_fraction"]
+            report[name] = {
+                "interpolation": _errors(predicted, exact_energy, exact_survival),
+                "ensemble": _errors(predicted, ens_energy, ens_survival),
+            }
+        return {"n_points": int(n_points), "n_runs": int(n_runs), "species": report,
+                "energy_p95": max(r["ensemble"]["energy_p95"] for r in report.values()),
+                "survival_p95": max(r["ensemble"]["survival_p95"] for r in report.values())}
+
+    def save_validation(self, report):
+        self.meta["validation"] = report
+        self.error = report
+        _write_meta(self.path, self.meta)
+
+
+def _errors(predicted, energy, survival):
+    e_err = np.abs(predicted[:, 0] - energy)
+    s_err = np.abs(np.clip(predicted[:, 1], 0.0, 1.0) - survival)
+    return {
+        "energy_mean": float(e_err.mean()), "energy_p95": float(np.percentile(e_err, 95)),
+        "energy_max": float(e_err.max()),
+        "survival_mean": float(s_err.mean()), "survival_p95": float(np.percentile(s_err, 95)),
+        "survival_max": float(s_err.max()),
+        "verdict_agreement": float(np.mean(verdict_codes(predicted[:, 0]) == verdict_codes(energy))),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m biomecanica.surrogate",
+                                     description="Tabla sustituta (energía esperada / probabilidad de supervivencia).")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build = sub.add_parser("build", help="Evalúa la rejilla y escribe la tabla")
+    build.add_argument("-o", "--out", default="surrogate", help="Directorio de salida (por defecto: surrogate)")
+    build.add_argument("--species", nargs="*", default=None, help="Especies (por defecto: todas)")
+    build.add_argument("--samples", type=int, default=DEFAULT_SAMPLES, help="Realizaciones de deriva por punto")
+    build.add_argument("--points", type=int, nargs=5, metavar=("PRES", "TEMP", "OX", "ALT", "DYN"), default=None,
+                       help="Puntos de rejilla por parámetro")
+    build.add_argument("--workers", type=int, default=None, help="Procesos (0 = en el proceso actual)")
+    build.add_argument("--validate", type=int, default=0, metavar="N",
+                       help="Valida con N puntos aleatorios por especie y guarda las cotas de error")
+    check = sub.add_parser("validate", help="Mide el error de una tabla frente al motor exacto")
+    check.add_argument("path", help="Directorio de la tabla")
+    check.add_argument("-n", "--points", type=int, default=200, help="Puntos aleatorios por especie")
+    check.add_argument("--runs", type=int, default=1000, help="Trayectorias del ensamble de referencia")
+    check.add_argument("--save", action="store_true", help="Guarda el informe en meta.json")
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        resolution = dict(zip(SURROGATE_PARAMS, args.points)) if args.points else None
+
+        def report(done, total):
+            print(f"\r{done}/{total} bloques", end="", file=sys.stderr)
+
+        surrogate = build_surrogate(args.out, args.species, resolution, n_samples=args.samples,
+                                    workers=args.workers, progress=report)
+        print(file=sys.stderr)
+        if args.validate:
+            surrogate.save_validation(surrogate.validate(n_points=args.validate))
+        print(json.dumps({k: v for k, v in surrogate.meta.items() if k != "axes"}, ensure_ascii=False, indent=2))
+    else:
+        surrogate = Surrogate(args.path)
+        result = surrogate.validate(n_points=args.points, n_runs=args.runs)
+        if args.save:
+            surrogate.save_validation(result)
+        print(json.dumps(result, ensure_ascii=False, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
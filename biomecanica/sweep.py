@@ -0,0 +1,187 @@
+# -------------------------
+# Parallel parameter sweep: species × pressure × temperature × O₂ × altitude × dyn_intensity
+# -------------------------
+import argparse
+import csv
+import itertools
+import json
+import os
+import sys
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy as np
+
+from .model import VERDICT_LABELS, compute_final_energy_grid, drift_noise, verdict_codes
+from .species import SCENARIO_DEFAULTS, SIM_DURATION, SPECIES, STEP_INTERVAL
+
+# Sweepable sidebar parameters, in grid-axis order
+SWEEP_PARAMS = ("presion_init", "temp_init", "ox_init", "altitud_init", "dyn_intensity")
+
+
+class SweepCancelled(Exception):
+    pass
+
+
+def sweep_axes(ranges):
+    """``ranges``: param -> scalar, list of values, or {"min", "max", "n"}. Missing params use SCENARIO_DEFAULTS."""
+    axes = {}
+    for name in SWEEP_PARAMS:
+        spec = ranges.get(name, SCENARIO_DEFAULTS[name])
+        if isinstance(spec, dict):
+            values = np.linspace(float(spec["min"]), float(spec["max"]), int(spec.get("n", 10)))
+        else:
+            values = np.atleast_1d(np.asarray(spec, dtype=float))
+        axes[name] = values
+    return axes
+
+
+def _evaluate_chunk(species_idx, flat_idx, axes_values, temp_opt, noise, step_interval):
+    """Worker: final energy for a chunk of flat grid indices of one species."""
+    shape = tuple(len(v) for v in axes_values)
+    coords = np.unravel_index(flat_idx, shape)
+    params = [values[c] for values, c in zip(axes_values, coords)]
+    energy = compute_final_energy_grid(*params, temp_opt, noise, step_interval)
+    return species_idx, flat_idx, energy
+
+
+def run_sweep(species_names, ranges, seed=SCENARIO_DEFAULTS["seed"], sim_duration=SIM_DURATION,
+              step_interval=STEP_INTERVAL, workers=None, chunk_size=4096, progress=None, cancel_event=None):
+    """Evaluate the full grid for each species across a process pool.
+
+    Work is split into chunks of ``chunk_size`` grid points; ``progress(done, total)``
+    is called as chunks finish, and setting ``cancel_event`` (a threading/multiprocessing
+    Event) stops scheduling and raises SweepCancelled. ``workers=0`` runs in-process.
+    Every grid point uses the app's drift sequence for ``seed``, so a cell equals the
+    slider result for the same values.
+    """
+    species_names = list(species_names)
+    axes = sweep_axes(ranges)
+    axes_values = [axes[name] for name in SWEEP_PARAMS]
+    shape = tuple(len(v) for v in axes_values)
+    n_points = int(np.prod(shape))
+    steps = int(sim_duration / step_interval)
+    noise = drift_noise(seed, steps)
+
+    final_energy = np.empty((len(species_names),) + shape)
+    flat_energy = final_energy.reshape(len(species_names), -1)
+    tasks = [(s_idx, np.arange(start, min(start + chunk_size, n_points)), axes_values,
+              SPECIES[name]["temp_opt"], noise, step_interval)
+             for s_idx, name in enumerate(species_names)
+             for start in range(0, n_points, chunk_size)]
+    total = len(tasks)
+
+    def cancelled():
+        return cancel_event is not None and cancel_event.is_set()
+
+    def store(result, done):
+        s_idx, flat_idx, energy = result
+        flat_energy[s_idx, flat_idx] = energy
+        if progress is not None:
+            progress(done, total)
+
+    if workers == 0:
+        for done, task in enumerate(tasks, 1):
+            if cancelled():
+                raise SweepCancelled()
+            store(_evaluate_chunk(*task), done)
+    else:
+        pool = ProcessPoolExecutor(max_workers=workers)
+        try:
+            pending = set()
+            task_iter = iter(tasks)
+            max_in_flight = 2 * (workers or os.cpu_count() or 1)
+            done = 0
+            while True:
+                while len(pending) < max_in_flight and not cancelled():
+                    task = next(task_iter, None)
+                    if task is None:
+                        break
+                    pending.add(pool.submit(_evaluate_chunk, *task))
+                if not pending:
+                    break
+                finished, pending = wait(pending, timeout=0.25, return_when=FIRST_COMPLETED)
+                for fut in finished:
+                    done += 1
+                    store(fut.result(), done)
+                if cancelled():
+                    raise SweepCancelled()
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    return {
+        "species": species_names,
+        "params": list(SWEEP_PARAMS),
+        "axes": axes,
+        "seed": int(seed),
+        "final_energy": final_energy,
+        "verdict": verdict_codes(final_energy),
+    }
+
+
+def iter_sweep_rows(result):
+    """Flat records (one per species × grid point) for CSV/JSON export."""
+    axes_values = [result["axes"][name] for name in result["params"]]
+    for s_idx, species_name in enumerate(result["species"]):
+        energy = result["final_energy"][s_idx]
+        verdict = result["verdict"][s_idx]
+        for idx in itertools.product(*(range(len(v)) for v in axes_values)):
+            row = {"species_name": species_name}
+            row.update({name: float(values[i]) for name, values, i in zip(result["params"], axes_values, idx)})
+            row["final_energy"] = float(energy[idx])
+            row["verdict"] = VERDICT_LABELS[int(verdict[idx])]
+            yield row
+
+
+def write_sweep_csv(fh, result):
+    fields = ["species_name"] + list(result["params"]) + ["final_energy", "verdict"]
+    writer = csv.DictWriter(fh, fieldnames=fields, lineterminator="\n")
+    writer.writeheader()
+    writer.writerows(iter_sweep_rows(result))
+
+
+def heatmap_slice(result, species_idx, x_param, y_param, reduce="survival"):
+    """2D (y, x) view of one species' grid; other axes are collapsed.
+
+    ``reduce="survival"`` gives the fraction of collapsed cells that are not MUERTO,
+    ``"alive"`` the fraction that are VIVO and ``"mean"`` the mean final energy.
+    """
+    params = result["params"]
+    xi, yi = params.index(x_param), params.index(y_param)
+    if reduce == "survival":
+        data = (result["verdict"][species_idx] > 0).astype(float)
+    elif reduce == "alive":
+        data = (result["verdict"][species_idx] > 1).astype(float)
+    else:
+        data = result["final_energy"][species_idx]
+    other = tuple(i for i in range(len(params)) if i not in (xi, yi))
+    data = data.mean(axis=other) if other else data
+    # remaining axes are in original order; put y first
+    return data if yi < xi else data.T
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m biomecanica.sweep",
+                                     description="Barrido de parámetros en paralelo (energía final y veredicto por celda).")
+    parser.add_argument("config", help='JSON con {"species": [...], "ranges": {param: {"min","max","n"} | valores}, "seed": ...}')
+    parser.add_argument("-o", "--out", default="sweep.csv", help="CSV de salida (por defecto: sweep.csv)")
+    parser.add_argument("--workers", type=int, default=None, help="Procesos (0 = en el proceso actual)")
+    parser.add_argument("--chunk-size", type=int, default=4096)
+    args = parser.parse_args(argv)
+
+    with open(args.config, encoding="utf-8") as fh:
+        config = json.load(fh)
+
+    def report(done, total):
+        print(f"\r{done}/{total} bloques", end="", file=sys.stderr)
+
+    result = run_sweep(config.get("species", [SCENARIO_DEFAULTS["species_name"]]), config.get("ranges", {}),
+                       seed=config.get("seed", SCENARIO_DEFAULTS["seed"]), workers=args.workers,
+                       chunk_size=args.chunk_size, progress=report)
+    print(file=sys.stderr)
+    with open(args.out, "w", encoding="utf-8", newline="") as fh:
+        write_sweep_csv(fh, result)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
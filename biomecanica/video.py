@@ -0,0 +1,398 @@
+# -------------------------
+# Offline rendering of the animation to GIF / APNG / MP4
+# -------------------------
+# Frame-by-frame port of render.render_animation_html: same timing, interpolation,
+# back-to-front agent order, per-energy filters, HUD and end overlay. The background
+# and sprite are scaled once to NumPy arrays (plus one tinted copy per filter level
+# and a small cache of rotated variants); each frame is the background with the
+# sprites alpha-blended into their bounding boxes. Batches run on a process pool with
+# the assets decoded once per worker.
+import argparse
+import io
+import os
+import shutil
+import subprocess
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from .model import normalize_scenario, run_scenario
+from .motion import FILTER_CRITICAL, FILTER_NONE, FILTER_TIRED, js_round
+from .narrative import decode_narrative
+from .payload import CONTAINER_HEIGHT, CONTAINER_WIDTH, SPRITE_WIDTH
+from .pipeline import HERD_SPRITE_WIDTH, herd_scene
+
+try:  # Pillow ships with matplotlib
+    from PIL import Image, ImageDraw, ImageFont
+except ImportError:  # pragma: no cover
+    Image = None
+
+VIDEO_FORMATS = ("gif", "apng", "mp4")
+DEFAULT_FPS = 10
+END_HOLD_SECONDS = 2.0
+
+# (grayscale fraction, brightness) per motion.FILTER_* level, as render.CANVAS_FILTERS
+FILTER_PARAMS = {FILTER_NONE: (0.0, 1.0), FILTER_TIRED: (0.35, 0.85), FILTER_CRITICAL: (0.8, 0.65)}
+_LUMA = np.array([0.2126, 0.7152, 0.0722], dtype=np.float32)   # CSS grayscale() weights
+
+_EXT = {"gif": "gif", "apng": "png", "mp4": "mp4"}
+
+
+def _require_pillow():
+    if Image is None:
+        raise ImportError("La exportación de video requiere Pillow (pip install pillow).")
+
+
+def _font(size, bold=False):
+    try:
+        import matplotlib
+        name = "DejaVuSans-Bold.ttf" if bold else "DejaVuSans.ttf"
+        return ImageFont.truetype(os.path.join(matplotlib.get_data_path(), "fonts", "ttf", name), size)
+    except (ImportError, OSError):
+        return ImageFont.load_default()
+
+
+def _wrap(text, font, max_width):
+    lines, line = [], ""
+    for word in text.split():
+        candidate = f"{line} {word}" if line else word
+        if line and font.getlength(candidate) > max_width:
+            lines.append(line)
+            line = word
+        else:
+            line = candidate
+    return lines + ([line] if line else [])
+
+
+class SceneAssets:
+    """Background and sprite pre-scaled to the output size, as arrays ready for blending."""
+
+    def __init__(self, background, sprite, sprite_width=SPRITE_WIDTH, scale=1.0,
+                 width=CONTAINER_WIDTH, height=CONTAINER_HEIGHT):
+        _require_pillow()
+        self.scale = float(scale)
+        self.width = max(2, round(width * self.scale))
+        self.height = max(2, round(height * self.scale))
+
+        bg = Image.open(io.BytesIO(background)).convert("RGB")
+        # background-size: cover; background-position: center
+        s = max(self.width / bg.width, self.height / bg.height)
+        bw, bh = max(self.width, round(bg.width * s)), max(self.height, round(bg.height * s))
+        bg = bg.resize((bw, bh), Image.LANCZOS)
+        left, top = (bw - self.width) // 2, (bh - self.height) // 2
+        self.background = np.asarray(bg.crop((left, top, left + self.width, top + self.height)), dtype=np.uint8)
+
+        img = Image.open(io.BytesIO(sprite)).convert("RGBA")
+        sw = max(1, round(sprite_width * self.scale))
+        sh = max(1, round(sprite_width * img.height / img.width * self.scale))
+        self.sprite_size = (sw, sh)
+        base = np.asarray(img.resize((sw, sh), Image.LANCZOS), dtype=np.float32) / 255.0
+        self._variants = {}
+        for level, (gray, bright) in FILTER_PARAMS.items():
+            rgb = base[..., :3]
+            luma = (rgb @ _LUMA)[..., None]
+            tinted = np.clip((rgb * (1.0 - gray) + luma * gray) * bright, 0.0, 1.0)
+            self._variants[level] = np.concatenate([tinted, base[..., 3:]], axis=-1)
+        self._rotated = {}
+        self._font = _font(max(8, round(16 * self.scale)))
+        self._end_fonts = (_font(max(8, round(22 * self.scale)), bold=True), _font(max(8, round(22 * self.scale))))
+
+    def sprite(self, level, angle):
+        """(rgb, alpha, dx, dy): sprite for a filter level rotated by ``angle`` degrees (clockwise, like
+        canvas rotate), with the offset of its box relative to the unrotated top-left corner."""
+        angle_q = round(float(angle) * 4) / 4   # quarter-degree cache buckets
+        key = (int(level), angle_q)
+        item = self._rotated.get(key)
+        if item is None:
+            rgba = self._variants[int(level)]
+            if angle_q:
+                img = Image.fromarray((rgba * 255 + 0.5).astype(np.uint8), "RGBA")
+                img = img.rotate(-angle_q, resample=Image.BICUBIC, expand=True)
+                rgba = np.asarray(img, dtype=np.float32) / 255.0
+            sw, sh = self.sprite_size
+            dx = (sw - rgba.shape[1]) / 2.0
+            dy = (sh - rgba.shape[0]) / 2.0
+            item = (rgba[..., :3], rgba[..., 3], dx, dy)
+            self._rotated[key] = item
+        return item
+
+    def hud(self, seconds, energy, narrative):
+        """RGBA patch of the HUD box (top-left at 10, 10 in container pixels)."""
+        font = self._font
+        pad = round(8 * self.scale)
+        max_width = self.width - round(36 * self.scale)
+        lines = [f"Tiempo: {seconds} s", f"Energía: {energy}"]
+        lines += _wrap(f"Estado: {narrative}" if narrative else "Estado: sin eventos", font, max_width)
+        line_h = round(font.size * 1.25) if hasattr(font, "size") else 14
+        w = int(max(font.getlength(line) for line in lines)) + 2 * pad
+        h = line_h * len(lines) + 2 * pad
+        img = Image.new("RGBA", (w, h), (0, 0, 0, round(0.45 * 255)))
+        draw = ImageDraw.Draw(img)
+        for i, line in enumerate(lines):
+            draw.text((pad, pad + i * line_h), line, font=font, fill=(255, 255, 255, 255))
+        rgba = np.asarray(img, dtype=np.float32) / 255.0
+        return rgba[..., :3], rgba[..., 3]
+
+    def end_overlay(self, frame, verdict, reason):
+        """Final frame: 60 % black overlay with the end-of-simulation text centred."""
+        out = (frame.astype(np.float32) * 0.4).astype(np.uint8)
+        img = Image.fromarray(out)
+        draw = ImageDraw.Draw(img)
+        bold, regular = self._end_fonts
+        max_width = self.width - round(80 * self.scale)
+        blocks = [(["Simulación finalizada"], bold), ([""], regular),
+                  (_wrap(f"Veredicto: {verdict}", regular, max_width), regular), ([""], regular),
+                  (_wrap(f"Observación final: {reason or 'Ninguna'}", regular, max_width), regular)]
+        line_h = round(regular.size * 1.3) if hasattr(regular, "size") else 16
+        total = sum(len(lines) for lines, _ in blocks) * line_h
+        y = (self.height - total) / 2
+        for lines, font in blocks:
+            for line in lines:
+                draw.text(((self.width - font.getlength(line)) / 2, y), line, font=font, fill=(255, 255, 255))
+                y += line_h
+        return np.asarray(img)
+
+
+def _blit(frame, rgb, alpha, x, y, opacity=1.0):
+    """Alpha-blend ``rgb``/``alpha`` (floats in 0..1) into the uint8 ``frame`` with top-left at (x, y)."""
+    h, w = alpha.shape
+    x0, y0 = int(round(x)), int(round(y))
+    fx0, fy0 = max(0, x0), max(0, y0)
+    fx1, fy1 = min(frame.shape[1], x0 + w), min(frame.shape[0], y0 + h)
+    if fx0 >= fx1 or fy0 >= fy1:
+        return
+    a = alpha[fy0 - y0:fy1 - y0, fx0 - x0:fx1 - x0, None] * opacity
+    region = frame[fy0:fy1, fx0:fx1].astype(np.float32)
+    src = rgb[fy0 - y0:fy1 - y0, fx0 - x0:fx1 - x0] * 255.0
+    frame[fy0:fy1, fx0:fx1] = (region + (src - region) * a + 0.5).astype(np.uint8)
+
+
+def iter_frames(timeline, trajectories, end, step_interval, assets, fps=DEFAULT_FPS):
+    """Yield uint8 (H, W, 3) frames at ``fps``; the last one carries the end overlay."""
+    s = assets.scale
+    x, y = trajectories["x"], trajectories["y"]
+    opacity, rotation, filt = trajectories["opacity"], trajectories["rotation"], trajectories["filter"]
+    n_agents, samples = x.shape
+    end_step = int(end["step"])
+    end_time = (end_step + 1) * step_interval
+    energy32 = np.asarray(timeline["energy"], dtype=np.float32)
+    temp32 = np.asarray(timeline["temp"], dtype=np.float32)
+    oxf32 = np.asarray(timeline["ox_factor"], dtype=np.float32)
+    hud_cache = {}
+    hud_x = hud_y = 10 * s
+
+    n_frames = int(np.floor(end_time * fps + 1e-9)) + 1
+    frame = assets.background
+    for i in range(n_frames):
+        t = min(i / fps, end_time)
+        pos = t / step_interval
+        k = min(int(np.floor(pos + 1e-9)), end_step + 1)
+        frac = 0.0 if k > end_step else pos - k
+        k = min(k, samples - 1)
+        k1 = min(k + 1, samples - 1)
+        frame = assets.background.copy()
+        for a in range(n_agents - 1, -1, -1):   # back to front: focal animal on top
+            ax = x[a, k] + (x[a, k1] - x[a, k]) * frac
+            ay = y[a, k] + (y[a, k1] - y[a, k]) * frac
+            op = opacity[a, k] + (opacity[a, k1] - opacity[a, k]) * frac
+            rot = rotation[a, k] + (rotation[a, k1] - rotation[a, k]) * frac
+            rgb, alpha, dx, dy = assets.sprite(filt[a, k1], rot)
+            _blit(frame, rgb, alpha, ax * s + dx, ay * s + dy, op)
+        step = min(k, end_step)
+        seconds = int(js_round(t))
+        hud = hud_cache.get((step, seconds))
+        if hud is None:
+            mask = int(timeline["conditions"][step])
+            narrative = decode_narrative(mask, float(temp32[step]) - timeline["temp_opt"], float(oxf32[step]))
+            hud = hud_cache[(step, seconds)] = assets.hud(seconds, int(js_round(energy32[step])), narrative)
+        _blit(frame, hud[0], hud[1], hud_x, hud_y)
+        yield frame
+    yield assets.end_overlay(frame, end["verdict"], end["reason"])
+
+
+def _ffmpeg():
+    path = shutil.which("ffmpeg")
+    if path is None:
+        try:
+            import imageio_ffmpeg
+            path = imageio_ffmpeg.get_ffmpeg_exe()
+        except ImportError:
+            path = None
+    if path is None:
+        raise RuntimeError("La salida MP4 requiere ffmpeg en el PATH (o imageio-ffmpeg).")
+    return path
+
+
+def write_frames(frames, out, fmt, fps, width, height, n_frames, hold=END_HOLD_SECONDS):
+    """Encode ``frames`` (iterable of uint8 arrays, last = end overlay) to ``out`` (path or binary file)."""
+    if fmt in ("gif", "apng"):
+        frame_ms = 1000.0 / fps
+        durations = [frame_ms] * (n_frames - 1) + [hold * 1000.0]
+        images = (Image.fromarray(f) for f in frames)
+        first = next(images)
+        if fmt == "gif":
+            # one palette for the whole clip (from the first frame: background + sprite + HUD);
+            # per-frame median-cut quantization is ~15x slower and makes the palette flicker
+            palette = first.quantize(256, method=Image.Quantize.FASTOCTREE)
+            first = first.quantize(palette=palette, dither=Image.Dither.NONE)
+            images = (im.quantize(palette=palette, dither=Image.Dither.NONE) for im in images)
+        # Pillow keeps every frame to diff them anyway; the PNG writer needs a sequence
+        kwargs = {"save_all": True, "append_images": list(images), "duration": durations, "loop": 0}
+        if fmt == "gif":
+            first.save(out, format="GIF", optimize=False, disposal=1, **kwargs)
+        else:
+            first.save(out, format="PNG", **kwargs)
+        return
+    if fmt != "mp4":
+        raise ValueError(f"Formato desconocido: {fmt!r} (usa {', '.join(VIDEO_FORMATS)})")
+    if not isinstance(out, str):
+        raise ValueError("La salida MP4 debe ser una ruta de archivo.")
+    cmd = [_ffmpeg(), "-y", "-loglevel", "error", "-f", "rawvideo", "-pix_fmt", "rgb24", "-s", f"{width}x{height}",
+           "-r", str(fps), "-i", "-", "-vf", "pad=ceil(iw/2)*2:ceil(ih/2)*2", "-pix_fmt", "yuv420p",
+           "-vcodec", "libx264", out]
+    proc = subprocess.Popen(cmd, stdin=subprocess.PIPE)
+    try:
+        last = None
+        for last in frames:
+            proc.stdin.write(np.ascontiguousarray(last).tobytes())
+        for _ in range(max(0, int(round(hold * fps)) - 1)):
+            proc.stdin.write(last.tobytes())
+    finally:
+        proc.stdin.close()
+        if proc.wait() != 0:
+            raise RuntimeError(f"ffmpeg terminó con código {proc.returncode}")
+
+
+def render_clip(timeline, trajectories, end, step_interval, assets, out, fmt="gif", fps=DEFAULT_FPS,
+                hold=END_HOLD_SECONDS):
+    """Render one scene (timeline + motion.build_scene output) to ``out``."""
+    end_time = (int(end["step"]) + 1) * step_interval
+    n_frames = int(np.floor(end_time * fps + 1e-9)) + 2   # + end overlay
+    write_frames(iter_frames(timeline, trajectories, end, step_interval, assets, fps), out, fmt, fps,
+                 assets.width, assets.height, n_frames, hold)
+
+
+def scenario_clip(scenario, assets, out, fmt="gif", fps=DEFAULT_FPS, n_agents=1):
+    """Simulate ``scenario`` like the app (same seeds, herd and motion) and render it."""
+    sc = normalize_scenario(scenario)
+    steps = int(sc["sim_duration"] / sc["step_interval"])
+    timeline = run_scenario(sc)
+    scene = herd_scene(timeline, sc["presion_init"], sc["temp_init"], sc["ox_init"], sc["altitud_init"],
+                       sc["dyn_intensity"], sc["seed"], steps, sc["step_interval"], sc["species_name"],
+                       sc["environment"], n_agents)
+    render_clip(timeline, scene["trajectories"], scene["end"], sc["step_interval"], assets, out, fmt, fps)
+    return {"final_energy": timeline["energy"][-1], "verdict": scene["end"]["verdict"]}
+
+
+# ---- batch rendering on a process pool ----
+
+_WORKER_ASSETS = {}
+
+
+def _init_worker(background, sprite, scale):
+    _WORKER_ASSETS.clear()
+    _WORKER_ASSETS["args"] = (background, sprite, scale)
+
+
+def _worker_assets(n_agents):
+    sprite_width = SPRITE_WIDTH if int(n_agents) == 1 else HERD_SPRITE_WIDTH
+    assets = _WORKER_ASSETS.get(sprite_width)
+    if assets is None:
+        background, sprite, scale = _WORKER_ASSETS["args"]
+        assets = _WORKER_ASSETS[sprite_width] = SceneAssets(background, sprite, sprite_width, scale)
+    return assets
+
+
+def _render_job(idx, scenario, out, fmt, fps, n_agents):
+    info = scenario_clip(scenario, _worker_assets(n_agents), out, fmt, fps, n_agents)
+    return {"index": idx, "path": out, **info}
+
+
+def clip_name(idx, scenario, fmt):
+    return f"{idx:06d}_{str(scenario.get('species_name', 'sim')).replace(' ', '_')}.{_EXT[fmt]}"
+
+
+def render_batch(scenarios, background, sprite, out_dir, fmt="gif", fps=DEFAULT_FPS, scale=1.0, n_agents=1,
+                 workers=None, progress=None):
+    """Render one clip per scenario into ``out_dir``; returns per-clip dicts in input order.
+
+    ``background`` / ``sprite`` are image bytes, decoded and scaled once per worker.
+    ``workers=0`` renders in-process.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    jobs = []
+    for idx, raw in enumerate(scenarios):
+        sc = normalize_scenario(raw)
+        jobs.append((idx, sc, os.path.join(out_dir, clip_name(idx, sc, fmt)), fmt, fps,
+                     int(raw.get("n_agents") or n_agents)))
+    results = []
+    if workers == 0:
+        _init_worker(background, sprite, scale)
+        for done, job in enumerate(jobs, 1):
+            results.append(_render_job(*job))
+            if progress is not None:
+                progress(done, len(jobs))
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(background, sprite, scale)) as pool:
+            for done, result in enumerate(pool.map(_render_job, *zip(*jobs)) if jobs else (), 1):
+                results.append(result)
+                if progress is not None:
+                    progress(done, len(jobs))
+    return results
+
+
+def render_clip_bytes(scenario, background, sprite, fmt="gif", fps=DEFAULT_FPS, scale=1.0, n_agents=1):
+    """Render one scenario in a worker process and return the encoded clip.
+
+    GIF/APNG encoding holds every frame (full-size RGB for APNG), so long clips are
+    rendered into a temporary file by a separate process, which exits afterwards.
+    Only the file bytes come back to the caller (e.g. the Streamlit server).
+    """
+    import tempfile
+
+    with tempfile.TemporaryDirectory() as tmp:
+        (result,) = render_batch([scenario], background, sprite, tmp, fmt=fmt, fps=fps, scale=scale,
+                                 n_agents=n_agents, workers=1)
+        with open(result["path"], "rb") as fh:
+            return fh.read()
+
+
+def main(argv=None):
+    import json
+
+    from .cli import iter_scenarios
+
+    parser = argparse.ArgumentParser(prog="python -m biomecanica.video",
+                                     description="Renderiza la animación de cada escenario a GIF/APNG/MP4.")
+    parser.add_argument("scenarios", help="Archivo de escenarios (.json, .jsonl o .csv)")
+    parser.add_argument("--background", required=True, help="Imagen de fondo (PNG/JPG)")
+    parser.add_argument("--sprite", required=True, help="Sprite (PNG)")
+    parser.add_argument("-o", "--out", default="clips", help="Directorio de salida (por defecto: clips)")
+    parser.add_argument("--format", choices=VIDEO_FORMATS, default="gif")
+    parser.add_argument("--fps", type=int, default=DEFAULT_FPS)
+    parser.add_argument("--scale", type=float, default=1.0, help="Escala del video respecto a 940x520")
+    parser.add_argument("--agents", type=int, default=1, help="Animales por escena (si el escenario no lo indica)")
+    parser.add_argument("--workers", type=int, default=None, help="Procesos (0 = en el proceso actual)")
+    args = parser.parse_args(argv)
+
+    with open(args.background, "rb") as fh:
+        background = fh.read()
+    with open(args.sprite, "rb") as fh:
+        sprite = fh.read()
+
+    def report(done, total):
+        print(f"\r{done}/{total} clips", end="", file=sys.stderr)
+
+    results = render_batch(list(iter_scenarios(args.scenarios)), background, sprite, args.out, fmt=args.format,
+                           fps=args.fps, scale=args.scale, n_agents=args.agents, workers=args.workers, progress=report)
+    print(file=sys.stderr)
+    with open(os.path.join(args.out, "clips.jsonl"), "w", encoding="utf-8") as fh:
+        for row in results:
+            fh.write(json.dumps(row, ensure_ascii=False) + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
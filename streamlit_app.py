@@ -1,506 +1,745 @@
-# main.py
-import streamlit as st
-import base64, json, math, time
-import pandas as pd
-import numpy as np
-from io import BytesIO
-
-st.set_page_config(page_title="Simulador Biomecánico — Visual (20 s)", layout="wide")
-st.title("🦖 Simulador Biomecánico Visual — Movimiento por hábitat")
-
-# -------------------------
-# Especies y valores base
-# -------------------------
-SPECIES = {
-    "Tyrannosaurus rex": {"masa": 7000, "femur": 1.2, "habitat": "terrestre", "temp_opt": 30.0, "ox_opt": 21.0},
-    "Velociraptor mongoliensis": {"masa": 15, "femur": 0.8, "habitat": "terrestre", "temp_opt": 32.0, "ox_opt": 21.0},
-    "Brachiosaurus altithorax": {"masa": 35000, "femur": 2.5, "habitat": "terrestre", "temp_opt": 28.0, "ox_opt": 21.0},
-    "Spinosaurus aegyptiacus": {"masa": 6000, "femur": 1.5, "habitat": "marino", "temp_opt": 28.0, "ox_opt": 20.0},
-    "Crocodylus (Cocodrilo)": {"masa": 1000, "femur": 0.9, "habitat": "marino", "temp_opt": 29.0, "ox_opt": 20.0},
-    "Aquila chrysaetos (Águila)": {"masa": 6, "femur": 0.25, "habitat": "volador", "temp_opt": 40.0, "ox_opt": 21.0},
-}
-
-# Default UI values (used to reset)
-DEFAULTS = {
-    "species_name": list(SPECIES.keys())[0],
-    "environment": "Llanura",
-    "presion_init": 101.3,
-    "temp_init": 25,
-    "ox_init": 21,
-    "altitud_init": 0,
-    "dyn_intensity": 0.45,
-    "seed": 12345,
-}
-
-# -------------------------
-# Helper: set session defaults for widget keys
-# -------------------------
-def ensure_session_defaults():
-    for k, v in DEFAULTS.items():
-        if k not in st.session_state:
-            st.session_state[k] = v
-
-ensure_session_defaults()
-
-# -------------------------
-# Sidebar (widgets have explicit keys so we can reset them)
-# -------------------------
-st.sidebar.header("Configuración de la simulación (20 s)")
-
-species_name = st.sidebar.selectbox("Selecciona especie", list(SPECIES.keys()),
-                                    index=list(SPECIES.keys()).index(st.session_state.get("species_name", DEFAULTS["species_name"])),
-                                    key="species_name")
-
-environment = st.sidebar.selectbox("Selecciona bioma/ambiente (donde se coloca el animal)",
-                                   ["Llanura", "Selva", "Desierto", "Montaña", "Fondo marino"],
-                                   index=["Llanura", "Selva", "Desierto", "Montaña", "Fondo marino"].index(st.session_state.get("environment", DEFAULTS["environment"])),
-
-                                   key="environment")
-
-bg_file = st.sidebar.file_uploader("Sube fondo (PNG/JPG)", type=["png","jpg","jpeg"], key="bg_file")
-sprite_file = st.sidebar.file_uploader("Sube sprite (PNG con transparencia preferible)", type=["png"], key="sprite_file")
-st.sidebar.markdown("---")
-st.sidebar.subheader("Condiciones físicas iniciales (valores base)")
-
-presion_init = st.sidebar.slider("Presión (kPa)", 20.0, 200.0, float(st.session_state.get("presion_init", DEFAULTS["presion_init"])), step=0.1, key="presion_init")
-temp_init = st.sidebar.slider("Temperatura (°C)", -30, 60, int(st.session_state.get("temp_init", DEFAULTS["temp_init"])), key="temp_init")
-ox_init = st.sidebar.slider("Oxígeno (%)", 1, 40, int(st.session_state.get("ox_init", DEFAULTS["ox_init"])), key="ox_init")
-altitud_init = st.sidebar.slider("Altitud (m)", -10000, 8000, int(st.session_state.get("altitud_init", DEFAULTS["altitud_init"])), key="altitud_init")
-st.sidebar.markdown("---")
-st.sidebar.subheader("Dinámica")
-
-dyn_intensity = st.sidebar.slider("Intensidad de variación dinámica (0=estable → 1=muy dinámica)", 0.0, 1.0, float(st.session_state.get("dyn_intensity", DEFAULTS["dyn_intensity"])), step=0.05, key="dyn_intensity")
-seed = st.sidebar.number_input("Semilla aleatoria (opcional)", value=int(st.session_state.get("seed", DEFAULTS["seed"])), step=1, key="seed")
-st.sidebar.markdown("---")
-
-start_btn = st.sidebar.button("▶️ Iniciar simulación (20 s)", key="start_btn")
-reset_btn = st.sidebar.button("🔄 Reiniciar todo y valores base", key="reset_btn")
-
-# Reset handler: restore session_state defaults and clear caches
-if reset_btn:
-    # restore widget keys to defaults
-    for k, v in DEFAULTS.items():
-        st.session_state[k] = v
-    # clear uploaded files (can't programmatically clear file_uploader UI, but we remove their session_state entries)
-    for key in ("bg_file", "sprite_file"):
-        if key in st.session_state:
-            try:
-                del st.session_state[key]
-            except Exception:
-                pass
-    # clear other derived keys
-    for key in list(st.session_state.keys()):
-        if key not in DEFAULTS and key not in ("species_name","environment","presion_init","temp_init","ox_init","altitud_init","dyn_intensity","seed","bg_file","sprite_file","start_btn","reset_btn"):
-            try:
-                del st.session_state[key]
-            except Exception:
-                pass
-    # rerun to update widgets
-    st.experimental_rerun()
-
-# Validate images
-if (not bg_file) or (not sprite_file):
-    st.info("Sube fondo y sprite en la barra lateral para activar la simulación. (Puedes volver a Reiniciar para restaurar valores base.)")
-    st.stop()
-
-# Utility: convert uploaded file to base64 string for embedding
-def file_to_base64_u(file):
-    file_bytes = file.read()
-    return base64.b64encode(file_bytes).decode("utf-8"), file_bytes
-
-bg_b64, bg_bytes = file_to_base64_u(bg_file)
-sprite_b64, sprite_bytes = file_to_base64_u(sprite_file)
-
-# Simulation parameters
-SIM_DURATION = 20.0  # seconds total
-STEP_INTERVAL = 0.5  # seconds per simulation step
-STEPS = int(SIM_DURATION / STEP_INTERVAL)
-np.random.seed(int(seed))
-
-# Species base
-spec = SPECIES[species_name]
-habitat = spec["habitat"]
-temp_opt = spec["temp_opt"]
-ox_opt = spec["ox_opt"]
-mass = spec["masa"]
-
-# Movement region fractions depending on habitat (fractions of container height)
-REGION = {
-    "terrestre": {"y_min_frac": 0.65, "y_max_frac": 0.85},
-    "marino": {"y_min_frac": 0.10, "y_max_frac": 0.85},
-    "volador": {"y_min_frac": 0.05, "y_max_frac": 0.5},
-}
-
-# -------------------------
-# Physics/biomech model (precompute arrays)
-# -------------------------
-def compute_stepwise_evolution(presion0, temp0, ox0, alt0, dyn_intensity, steps, step_interval):
-    pres = presion0
-    temp = temp0
-    ox = ox0
-    alt = alt0
-
-    pres_arr = []; temp_arr = []; ox_arr = []; alt_arr = []
-    energy_arr = []; speed_ratio_arr = []; ox_factor_arr = []; narrative_arr = []
-
-    energy = 100.0
-
-    for i in range(steps):
-        # small deterministic time increment
-        t = i * step_interval
-
-        # dynamic drift: random walk scaled by intensity
-        pres += (np.random.randn() * 0.7) * dyn_intensity
-        temp += (np.random.randn() * 0.6) * dyn_intensity
-        ox += (np.random.randn() * 0.4) * dyn_intensity
-        alt += (np.random.randn() * 5.0) * dyn_intensity
-
-        # clamp realistic ranges
-        pres = float(max(20.0, min(200.0, pres)))
-        temp = float(max(-50.0, min(60.0, temp)))
-        ox = float(max(1.0, min(40.0, ox)))
-        alt = float(max(-10000.0, min(8000.0, alt)))
-
-        # oxygen partial approx: pressure * O2 fraction adjusted by altitude
-        ox_partial = (pres / 101.3) * (ox / 21.0) * math.exp(-alt / 7000.0)
-
-        temp_diff = temp - temp_opt
-        temp_penalty = max(0.0, abs(temp_diff) * 0.02)  # linear penalty
-        pres_penalty = 0.0
-        if pres > 140: pres_penalty += 0.25
-        if pres < 60: pres_penalty += 0.18
-
-        ox_factor = max(0.01, min(2.0, ox_partial))
-
-        # energy decrement: combine penalties
-        delta_energy = - (temp_penalty * 6 + pres_penalty * 5 + (1 - min(1.0, ox_factor)) * 12) * (step_interval / 2.0)
-        energy = max(0.0, energy + delta_energy)
-
-        speed_ratio = max(0.02, math.sqrt(energy / 100.0))
-
-        # narrative
-        msg_parts = []
-        if abs(temp_diff) > 6:
-            if temp_diff < 0:
-                msg_parts.append(f"Frío pronunciado (Δ {temp_diff:.1f} °C): contracción muscular y reducción en velocidad.")
-            else:
-                msg_parts.append(f"Calor pronunciado (Δ +{temp_diff:.1f} °C): riesgo de hipertermia y deshidratación.")
-        if ox_factor < 0.85:
-            msg_parts.append(f"Hipoxia funcional (factor O₂ {ox_factor:.2f}): fatiga y pérdida de coordinación.")
-        if pres > 140:
-            msg_parts.append("Presión elevada: compresión de estructuras y menor capacidad de ventilación.")
-        if pres < 60:
-            msg_parts.append("Presión baja: expansión de gases internos y mareo.")
-        if alt > 3000:
-            msg_parts.append("Altitud alta: disminución de presión parcial de O₂.")
-        if alt < -200:
-            msg_parts.append("Presión hidrostática alta (subacuática): riesgo de daño por compresión.")
-
-        # habitat mismatch messages
-        if environment == "Fondo marino" and habitat != "marino":
-            msg_parts.append("Ambiente marino detectado: organismo no adaptado muestra signos de inmersión y estrés respiratorio.")
-        if environment != "Fondo marino" and habitat == "marino":
-            msg_parts.append("Organismo marino fuera del agua: desecación y fallo respiratorio progresivo.")
-
-        narrative = " ".join(msg_parts) if msg_parts else "Condiciones dentro de parámetros operativos."
-
-        pres_arr.append(pres); temp_arr.append(temp); ox_arr.append(ox); alt_arr.append(alt)
-        energy_arr.append(energy); speed_ratio_arr.append(speed_ratio); ox_factor_arr.append(ox_factor); narrative_arr.append(narrative)
-
-    return {
-        "pres": pres_arr, "temp": temp_arr, "ox": ox_arr, "alt": alt_arr,
-        "energy": energy_arr, "speed_ratio": speed_ratio_arr, "ox_factor": ox_factor_arr, "narrative": narrative_arr
-    }
-
-# Precompute timeline
-timeline = compute_stepwise_evolution(presion_init, temp_init, ox_init, altitud_init, dyn_intensity, STEPS, STEP_INTERVAL)
-
-# Build payload for JS
-payload = {
-    "bg_b64": bg_b64,
-    "sprite_b64": sprite_b64,
-    "steps": STEPS,
-    "step_interval": STEP_INTERVAL,
-    "sim_duration": SIM_DURATION,
-    "width": 940,
-    "height": 520,
-    "region": REGION[habitat],
-    "habitat": habitat,
-    "environment": environment,
-    "speed_array": [float(x) for x in timeline["speed_ratio"]],
-    "energy_array": [float(x) for x in timeline["energy"]],
-    "narrative_array": timeline["narrative"],
-}
-
-# -------------------------
-# Render: ANIMACIÓN arriba, métricas debajo
-# -------------------------
-st.subheader("Visualización (animación en tiempo real)")
-payload_json = json.dumps(payload)
-html = f"""
-<div id="sim_container" style="width:{payload['width']}px; height:{payload['height']}px; border-radius:12px; overflow:hidden; position:relative;
-    background-image:url('data:image/png;base64,{payload['bg_b64']}'); background-size:cover; background-position:center;">
-    <img id="animal_sprite" src="data:image/png;base64,{payload['sprite_b64']}" style="position:absolute; left:0px; top:0px; width:120px; transition: left 0.35s linear, top 0.35s linear, opacity 0.35s linear, transform 0.35s linear;"/>
-    <div id="hud" style="position:absolute; left:10px; top:10px; background:rgba(0,0,0,0.45); color:white; padding:8px; border-radius:6px; font-family:Arial, sans-serif;">
-        <div id="timer">Tiempo: 0s</div>
-        <div id="energy">Energía: 100</div>
-        <div id="narr">Estado: -</div>
-    </div>
-    <div id="end_overlay" style="position:absolute; left:0; top:0; width:100%; height:100%; display:none;
-         align-items:center; justify-content:center; background:rgba(0,0,0,0.6); color:white; font-size:22px;">
-        <div id="end_text" style="text-align:center;"></div>
-    </div>
-</div>
-<script>
-(function(){{
-    const payload = {payload_json};
-    const steps = payload.steps;
-    const stepInterval = payload.step_interval * 1000;
-    const totalMs = payload.sim_duration * 1000;
-    const sprite = document.getElementById('animal_sprite');
-    const container = document.getElementById('sim_container');
-    const timerEl = document.getElementById('timer');
-    const energyEl = document.getElementById('energy');
-    const narrEl = document.getElementById('narr');
-    const endOverlay = document.getElementById('end_overlay');
-    const endText = document.getElementById('end_text');
-
-    let width = payload.width;
-    let height = payload.height;
-    let region = payload.region;
-    let habitat = payload.habitat;
-    let environment = payload.environment;
-
-    const speedArr = payload.speed_array;
-    const energyArr = payload.energy_array;
-    const narrativeArr = payload.narrative_array;
-
-    // region fractions to px
-    const yMin = Math.floor(region.y_min_frac * height);
-    const yMax = Math.floor(region.y_max_frac * height);
-    const xMin = Math.floor(0.05 * width);
-    const xMax = Math.floor(0.92 * width);
-
-    // initial position depends on habitat & environment
-    let x = Math.floor((xMin + xMax) / 8); // start left-ish
-    let y;
-    if (habitat === 'volador') {{
-        y = Math.floor(height * 0.08); // start near top
-    }} else if (habitat === 'marino') {{
-        y = Math.floor(height * 0.12); // start near surface/top
-    }} else {{
-        // terrestrial start lower within band
-        y = Math.floor(yMin + (yMax - yMin) * 0.05);
-    }}
-    sprite.style.left = x + 'px';
-    sprite.style.top = y + 'px';
-
-    // For terrestrial: move horizontally, bounce at edges; minimal vertical bob
-    // For volador: maintain altitude unless energy low -> descend
-    // For marino: if environment is marine and species marine => swim 2D; else sink
-
-    let step = 0;
-    let elapsedMs = 0;
-    let died = false;
-    let deathReason = "";
-    let dir = 1; // horizontal direction for terrestrial/volador
-
-    let intervalId = setInterval(() => {{
-        const idx = Math.min(step, steps-1);
-        const speedRatio = speedArr[idx]; // 0..1 roughly
-        const energy = Math.round(energyArr[idx]);
-        const narrative = narrativeArr[idx];
-
-        timerEl.innerText = 'Tiempo: ' + Math.round(elapsedMs/1000) + ' s';
-        energyEl.innerText = 'Energía: ' + energy;
-        narrEl.innerText = narrative ? ('Estado: ' + narrative) : 'Estado: sin eventos';
-
-        // Movement logic by habitat
-        if (habitat === 'terrestre') {{
-            // move horizontally in straight line within bottom band
-            const step_px = Math.round((4 + 18 * speedRatio) * dir); // speed depends on energy
-            x = x + step_px;
-            // small bob
-            const bob = Math.round(Math.sin(step * 0.6) * 4);
-            y = Math.floor(yMin + (yMax - yMin) * 0.06) + bob;
-
-            // bounce on edges
-            if (x >= xMax) {{ x = xMax; dir = -1; }}
-            if (x <= xMin) {{ x = xMin; dir = 1; }}
-
-            // If placed in marine environment and not marine species -> sink
-            if (environment === 'Fondo marino' && habitat !== 'marino') {{
-                y += Math.round((1.0 - speedRatio) * 8);
-                sprite.style.opacity = Math.max(0.12, energy/100);
-                if (y > height - 80) {{ died = true; deathReason = 'Hundimiento/Asfixia en ambiente marino.'; }}
-            }}
-        }} else if (habitat === 'volador') {{
-            // horizontal motion with altitude maintenance; descent if low energy
-            const step_px = Math.round((6 + 24 * speedRatio) * dir);
-            x = x + step_px;
-            if (x >= xMax) {{ x = xMax; dir = -1; }}
-            if (x <= xMin) {{ x = xMin; dir = 1; }}
-
-            if (energy < 60) {{
-                // descend proportionally to energy deficit
-                y += Math.round((60 - energy) / 10.0);
-            }} else {{
-                // small variations
-                y = Math.max(5, Math.min(Math.floor(yMax*0.6), y + Math.round(Math.sin(step*0.7)*3)));
-            }}
-
-            if (environment === 'Fondo marino' && energy < 30) {{
-                y += 6 + Math.round((30 - energy)/6.0);
-            }}
-            sprite.style.opacity = Math.max(0.2, energy / 100);
-            if (y > height - 80) {{ died = true; deathReason = 'Caída/impacto fatal o inmersión (volador).'; }}
-        }} else if (habitat === 'marino') {{
-            // if environment is marine and species marine => swim 2D random walk biased by speed
-            if (environment === 'Fondo marino') {{
-                // target towards random points; movement scaled by speedRatio
-                let tx = Math.floor(Math.random() * (xMax - xMin) + xMin);
-                let ty = Math.floor(Math.random() * (yMax - yMin) + yMin);
-                x = Math.round(x + (tx - x) * (0.18 + 0.7 * speedRatio));
-                y = Math.round(y + (ty - y) * (0.18 + 0.7 * speedRatio));
-                sprite.style.opacity = Math.max(0.25, energy / 100);
-            }} else {{
-                // marine species out of water -> slide/fall and fade
-                y += Math.round((1.0 - speedRatio) * 8);
-                sprite.style.opacity = Math.max(0.05, energy / 100);
-                if (y > height - 80) {{ died = true; deathReason = 'Exposición fuera del agua: fallo respiratorio.'; }}
-            }}
-        }}
-
-        // Visual filters by energy
-        if (energy < 30) {{
-            sprite.style.filter = 'grayscale(80%) brightness(65%)';
-            sprite.style.transform = 'rotate(' + (Math.sin(step*0.3)*6) + 'deg)';
-        }} else if (energy < 60) {{
-            sprite.style.filter = 'grayscale(35%) brightness(85%)';
-            sprite.style.transform = 'rotate(' + (Math.sin(step*0.2)*3) + 'deg)';
-        }} else {{
-            sprite.style.filter = 'none';
-            sprite.style.transform = 'rotate(0deg)';
-        }}
-
-        // clamp positions so sprite never leaves container
-        x = Math.max(0, Math.min(width - 60, x));
-        y = Math.max(0, Math.min(height - 60, y));
-        sprite.style.left = x + 'px';
-        sprite.style.top = y + 'px';
-
-        // kill by extreme low energy
-        if (energy <= 2 && !died) {{
-            died = true;
-            deathReason = 'Fallo sistémico por energía crítica baja.';
-        }}
-
-        step += 1;
-        elapsedMs += stepInterval;
-        if (elapsedMs >= totalMs || step >= steps || died) {{
-            clearInterval(intervalId);
-            const finalEnergy = energyArr[Math.min(steps-1, step-1)];
-            let verdict = 'VIVO / ADAPTADO';
-            if (died) verdict = 'MUERTO: ' + deathReason;
-            else if (finalEnergy < 40) verdict = 'DEBIL / Sobrevive con dificultades';
-            else if (finalEnergy < 65) verdict = 'PARCIALMENTE adaptado (fatigado)';
-            endText.innerHTML = '<div style="padding:20px; text-align:center;"><strong>Simulación finalizada</strong><br><br>Veredicto: <em>'+verdict+'</em><br><br>Observación final: '+(deathReason || 'Ninguna')+'</div>';
-            endOverlay.style.display = 'flex';
-        }}
-    }}, stepInterval);
-
-}})();
-</script>
-"""
-st.components.v1.html(html, height=payload["height"]+20, scrolling=False)
-
-# -------------------------
-# Estado y métricas (ahora VA DEBAJO de la animación)
-# -------------------------
-st.subheader("Estado y métricas (precalculos)")
-st.markdown(f"- **Especie:** {species_name}  \n- **Hábitat base especie:** {habitat}  \n- **Bioma seleccionado (ambiente):** {environment}")
-st.markdown(f"- **Condiciones iniciales:** Presión {presion_init:.1f} kPa · Temp {temp_init:.1f} °C · O₂ {ox_init:.1f}% · Altitud {altitud_init:.0f} m")
-st.markdown("---")
-preview_df = pd.DataFrame({
-    "t (s)": [round(i*STEP_INTERVAL,1) for i in range(min(6, STEPS))],
-    "Energía (preview)": [round(x,2) for x in timeline["energy"][:min(6,STEPS)]],
-    "Vel ratio (preview)": [round(x,2) for x in timeline["speed_ratio"][:min(6,STEPS)]],
-})
-st.dataframe(preview_df, use_container_width=True)
-
-# -------------------------
-# Results and detailed explanation (available immediately below)
-# -------------------------
-st.markdown("---")
-st.subheader("Resultados completos y explicación científica")
-
-results_df = pd.DataFrame({
-    "t (s)": [round(i*STEP_INTERVAL,2) for i in range(STEPS)],
-    "Presión (kPa)": timeline["pres"],
-    "Temp (°C)": timeline["temp"],
-    "Ox (%)": timeline["ox"],
-    "Altitud (m)": timeline["alt"],
-    "Energía": timeline["energy"],
-    "Vel_ratio": timeline["speed_ratio"],
-    "Narrativa (breve)": timeline["narrative"],
-})
-st.line_chart(results_df.set_index("t (s)")[["Energía", "Vel_ratio"]])
-
-final_energy = timeline["energy"][-1]
-if final_energy > 70:
-    final_state = "VIVO — funcionamiento relativamente normal"
-elif final_energy > 45:
-    final_state = "DEBIL — sobrevive con signos claros de fatiga y estrés"
-else:
-    final_state = "MUERTO / COLAPSADO — fallo por condiciones hostiles"
-
-st.markdown(f"**Veredicto (modelo simplificado):** **{final_state}**  \n**Energía final:** {final_energy:.2f}/100")
-
-# Long explanation tailored
-explanacion = []
-explanacion.append(f"### Resumen científico extendido para {species_name}")
-explanacion.append(f"Hábitat base especie: **{habitat}**. Bioma seleccionado: **{environment}**.")
-explanacion.append(f"Condiciones iniciales: presión {presion_init:.1f} kPa, temperatura {temp_init:.1f} °C, O₂ {ox_init:.1f}%, altitud {altitud_init:.0f} m.")
-explanacion.append("")
-explanacion.append("Durante los 20 segundos la simulación varió condiciones (drift aleatorio calibrado por intensidad). Se calculó una métrica energética (0–100) que resume la capacidad del organismo para sostener metabolismo y locomoción. El comportamiento observacional en la animación depende de tres procesos biomecánicos principales:")
-explanacion.append("1. **Intercambio gaseoso:** la eficiencia ventilatoria depende de la presión parcial de O₂ y la estructura pulmonar. En baja presión o baja fracción de O₂ la entrega de oxígeno a músculo disminuye (hipoxia) y la potencia muscular cae.")
-explanacion.append("2. **Cinemática muscular y térmica:** la temperatura altera la cinética enzimática y la velocidad de contracción. Temperaturas muy bajas ralentizan, y temperaturas altas pueden causar fallo térmico.")
-explanacion.append("3. **Carga mecánica por presión/densidad del medio:** en medios densos (agua) o con presiones altas, la ventilación y la perfusión se ven afectadas; la flotabilidad y resistencia cambian la potencia locomotora requerida.")
-explanacion.append("")
-# drivers identification
-drivers = []
-avg_temp_dev = abs(np.mean(timeline["temp"]) - temp_opt)
-avg_ox_dev = abs(np.mean(timeline["ox"]) - ox_opt)
-avg_pres = np.mean(timeline["pres"])
-if avg_temp_dev > 5:
-    drivers.append(f"La temperatura media se desvió ~{avg_temp_dev:.1f}°C respecto al óptimo ({temp_opt}°C), afectando rendimiento enzimático y fuerza.")
-if avg_ox_dev > 3:
-    drivers.append(f"El oxígeno funcional se desvió ~{avg_ox_dev:.1f}% respecto al óptimo ({ox_opt}%), exponiendo al animal a hipoxia parcial.")
-if avg_pres > 140:
-    drivers.append("La presión media fue elevada, con riesgo de compresión y problemas ventilatorios.")
-if environment == "Fondo marino" and habitat != "marino":
-    drivers.append("El bioma marino impone flotabilidad y asfixia a organismos terrestres/voladores: hundimiento y falla respiratoria rápida.")
-if drivers:
-    for d in drivers:
-        explanacion.append("- " + d)
-else:
-    explanacion.append("- Las condiciones permanecieron cercanas a los óptimos durante la simulación.")
-
-explanacion.append("")
-explanacion.append("**Recomendaciones adaptativas hipotéticas (educativas):**")
-if final_energy < 50:
-    explanacion.append("- Aumentar capacidad pulmonar (sacos aéreos, mayor superficie de intercambio) y mejorar transporte sanguíneo.")
-    explanacion.append("- Comportamientos: buscar microhábitats con mayor O₂ o sombra, reducir actividad motora hasta recuperar energía.")
-    explanacion.append("- Morfológicas: reducir masa efectiva; patas/alas adaptadas para la nueva densidad o presión.")
-else:
-    explanacion.append("- El organismo no requiere cambios inmediatos. Mantener acceso a recursos y refugios es suficiente.")
-explanacion.append("")
-explanacion.append("**Limitaciones:** Este es un modelo didáctico y simplificado. Para uso científico requiere calibración con datos empíricos y modelos fisiológicos más profundos.")
-
-st.markdown("\n".join(explanacion))
-
-st.markdown("### Tabla de evolución (muestras)")
-st.dataframe(pd.concat([results_df.head(4), results_df.tail(4)]).reset_index(drop=True))
-
-csv = results_df.to_csv(index=False).encode('utf-8')
-st.download_button("⬇️ Descargar datos de la simulación (CSV)", csv, file_name=f"sim_{species_name.replace(' ','_')}.csv", mime="text/csv")
+# main.py
+import streamlit as st
+import io, os, time, warnings
+import pandas as pd
+import numpy as np
+
+from biomecanica import (
+    SPECIES, ENVIRONMENTS, SCENARIO_DEFAULTS, SIM_DURATION, STEP_INTERVAL, SURVIVAL_THRESHOLD,
+    final_verdict, timeline_columns, render_animation_html, build_simulation_graph,
+    run_sweep, heatmap_slice, write_sweep_csv, run_streaming, run_adaptive,
+    simulate_population, population_breakdown, StageProfiler, STAGE_METRICS, start_metrics_server, shared_cache, RunStore, AssetStore,
+    Surrogate, solve_envelope, write_envelope_csv, NEVER_PASSES, VERDICT_ALIVE, VERDICT_WEAK,
+    render_clip_bytes, VIDEO_FORMATS, HABITATS, biome_scenario, rank_species, write_ranking_csv,
+)
+
+# Partial reruns: st.fragment (older releases: st.experimental_fragment); full reruns if neither exists
+fragment = getattr(st, "fragment", None) or getattr(st, "experimental_fragment", None) or (lambda fn: fn)
+
+st.set_page_config(page_title="Simulador Biomecánico — Visual (20 s)", layout="wide")
+st.title("🦖 Simulador Biomecánico Visual — Movimiento por hábitat")
+
+# Default UI values (used to reset)
+DEFAULTS = {
+    **SCENARIO_DEFAULTS,
+    "n_runs": 2000,
+    "n_agents": 1,
+}
+
+# -------------------------
+# Helper: set session defaults for widget keys
+# -------------------------
+def ensure_session_defaults():
+    for k, v in DEFAULTS.items():
+        if k not in st.session_state:
+            st.session_state[k] = v
+
+ensure_session_defaults()
+
+# -------------------------
+# Sidebar (widgets have explicit keys so we can reset them)
+# -------------------------
+st.sidebar.header("Configuración de la simulación (20 s)")
+
+# Searchable species selector: the registry may hold thousands of taxa (BIOMECANICA_CATALOG)
+SPECIES_SELECT_LIMIT = 200  # options offered at once
+species_query = st.sidebar.text_input(f"Buscar especie ({len(SPECIES)} en el registro)", key="species_query",
+                                      help="Filtra por nombre, sin distinguir mayúsculas ni tildes.")
+current_species = st.session_state.get("species_name", DEFAULTS["species_name"])
+species_options = SPECIES.search(species_query, limit=SPECIES_SELECT_LIMIT)
+if current_species not in species_options:
+    species_options.insert(0, current_species)
+species_name = st.sidebar.selectbox("Selecciona especie", species_options,
+                                    index=species_options.index(current_species),
+                                    key="species_name")
+
+environment = st.sidebar.selectbox("Selecciona bioma/ambiente (donde se coloca el animal)",
+                                   ENVIRONMENTS,
+                                   index=ENVIRONMENTS.index(st.session_state.get("environment", DEFAULTS["environment"])),
+
+                                   key="environment")
+
+bg_file = st.sidebar.file_uploader("Sube fondo (PNG/JPG)", type=["png","jpg","jpeg"], key="bg_file")
+sprite_file = st.sidebar.file_uploader("Sube sprite (PNG con transparencia preferible)", type=["png"], key="sprite_file")
+st.sidebar.markdown("---")
+st.sidebar.subheader("Condiciones físicas iniciales (valores base)")
+
+presion_init = st.sidebar.slider("Presión (kPa)", 20.0, 200.0, float(st.session_state.get("presion_init", DEFAULTS["presion_init"])), step=0.1, key="presion_init")
+temp_init = st.sidebar.slider("Temperatura (°C)", -30, 60, int(st.session_state.get("temp_init", DEFAULTS["temp_init"])), key="temp_init")
+ox_init = st.sidebar.slider("Oxígeno (%)", 1, 40, int(st.session_state.get("ox_init", DEFAULTS["ox_init"])), key="ox_init")
+altitud_init = st.sidebar.slider("Altitud (m)", -10000, 8000, int(st.session_state.get("altitud_init", DEFAULTS["altitud_init"])), key="altitud_init")
+st.sidebar.markdown("---")
+st.sidebar.subheader("Dinámica")
+
+dyn_intensity = st.sidebar.slider("Intensidad de variación dinámica (0=estable → 1=muy dinámica)", 0.0, 1.0, float(st.session_state.get("dyn_intensity", DEFAULTS["dyn_intensity"])), step=0.05, key="dyn_intensity")
+seed = st.sidebar.number_input("Semilla aleatoria (opcional)", min_value=0, value=int(st.session_state.get("seed", DEFAULTS["seed"])), step=1, key="seed")
+n_agents = st.sidebar.slider("Animales en la animación", 1, 500, int(st.session_state.get("n_agents", DEFAULTS["n_agents"])), key="n_agents")
+n_runs = st.sidebar.number_input("Trayectorias Monte Carlo (0 = desactivado)", min_value=0, max_value=500000,
+                                 value=int(st.session_state.get("n_runs", DEFAULTS["n_runs"])), step=1000, key="n_runs")
+st.sidebar.markdown("---")
+
+# Instant prediction from the precomputed surrogate table (python -m biomecanica.surrogate build)
+SURROGATE_PATH = os.environ.get("BIOMECANICA_SURROGATE",
+                                os.path.join(os.path.dirname(os.path.abspath(__file__)), "surrogate"))
+
+@st.cache_resource
+def get_surrogate():
+    try:
+        return Surrogate(SURROGATE_PATH)
+    except (OSError, ValueError, KeyError):
+        # missing, unreadable or from another SURROGATE_VERSION: fall back to the caption below
+        return None
+
+surrogate = get_surrogate()
+if surrogate is not None and species_name in surrogate.species:
+    guess = surrogate.predict(species_name, presion_init, temp_init, ox_init, altitud_init, dyn_intensity)
+    bound = f" ± {surrogate.error['energy_p95']:.1f} (p95)" if surrogate.error else ""
+    st.sidebar.metric("Predicción instantánea: energía final esperada", f"{guess['expected_energy']:.1f}{bound}")
+    st.sidebar.caption(f"Supervivencia estimada: {guess['survival_probability']*100:.0f} % · {guess['verdict']}")
+else:
+    st.sidebar.caption("Predicción instantánea no disponible: genera la tabla con `python -m biomecanica.surrogate build`.")
+st.sidebar.markdown("---")
+
+start_btn = st.sidebar.button("▶️ Iniciar simulación (20 s)", key="start_btn")
+reset_btn = st.sidebar.button("🔄 Reiniciar todo y valores base", key="reset_btn")
+
+# Reset handler: restore session_state defaults and clear caches
+if reset_btn:
+    # restore widget keys to defaults
+    for k, v in DEFAULTS.items():
+        st.session_state[k] = v
+    # clear uploaded files (can't programmatically clear file_uploader UI, but we remove their session_state entries)
+    for key in ("bg_file", "sprite_file"):
+        if key in st.session_state:
+            try:
+                del st.session_state[key]
+            except Exception:
+                pass
+    # clear other derived keys
+    for key in list(st.session_state.keys()):
+        if key not in DEFAULTS and key not in ("species_name","environment","presion_init","temp_init","ox_init","altitud_init","dyn_intensity","seed","bg_file","sprite_file","start_btn","reset_btn"):
+            try:
+                del st.session_state[key]
+            except Exception:
+                pass
+    # rerun to update widgets
+    st.experimental_rerun()
+
+# -------------------------
+# Sweep mode: survival heatmaps over parameter ranges (no images needed)
+# -------------------------
+SWEEP_UI_RANGES = {
+    # param: (label, slider min, slider max, default number of points)
+    "presion_init": ("Presión (kPa)", 20.0, 200.0, 1),
+    "temp_init": ("Temperatura (°C)", -30.0, 60.0, 19),
+    "ox_init": ("Oxígeno (%)", 1.0, 40.0, 14),
+    "altitud_init": ("Altitud (m)", -10000.0, 8000.0, 1),
+    "dyn_intensity": ("Intensidad dinámica", 0.0, 1.0, 1),
+}
+SWEEP_REDUCE = {
+    "survival": "Fracción que sobrevive (no MUERTO)",
+    "alive": "Fracción VIVO (energía > 70)",
+    "mean": "Energía final media",
+}
+
+def render_sweep_page():
+    import matplotlib.pyplot as plt
+
+    current = {"presion_init": presion_init, "temp_init": temp_init, "ox_init": ox_init,
+               "altitud_init": altitud_init, "dyn_intensity": dyn_intensity}
+    st.subheader("Barrido de parámetros (mapas de supervivencia)")
+    st.caption("Con 1 punto se usa el valor actual de la barra lateral. Cada celda usa la misma semilla que la simulación individual.")
+    with st.form("sweep_form"):
+        sweep_species = st.multiselect("Especies", species_options, default=[species_name])
+        ranges = {}
+        for name, (label, lo, hi, n_default) in SWEEP_UI_RANGES.items():
+            c1, c2, c3 = st.columns(3)
+            vmin = c1.number_input(f"{label} — mín", value=lo, key=f"sweep_{name}_min")
+            vmax = c2.number_input(f"{label} — máx", value=hi, key=f"sweep_{name}_max")
+            n = c3.number_input(f"{label} — puntos", min_value=1, max_value=500, value=n_default, key=f"sweep_{name}_n")
+            ranges[name] = {"min": vmin, "max": vmax, "n": n} if n > 1 else [current[name]]
+        submitted = st.form_submit_button("▶️ Ejecutar barrido")
+    # Any widget interaction reruns the script, which interrupts a running sweep (the pool is shut down)
+    st.button("⏹ Cancelar barrido", key="sweep_cancel")
+
+    if submitted and sweep_species:
+        bar = st.progress(0.0, text="Barrido en curso…")
+        result = run_sweep(sweep_species, ranges, seed=seed,
+                           progress=lambda done, total: bar.progress(done / total, text=f"Barrido: {done}/{total} bloques"))
+        bar.empty()
+        st.session_state["sweep_result"] = result
+
+    result = st.session_state.get("sweep_result")
+    if result is None:
+        return
+    swept = [p for p in result["params"] if len(result["axes"][p]) > 1] or list(result["params"][:2])
+    c1, c2, c3 = st.columns(3)
+    x_param = c1.selectbox("Eje X", result["params"], index=result["params"].index(swept[0]), key="sweep_x")
+    y_default = swept[1] if len(swept) > 1 else next(p for p in result["params"] if p != x_param)
+    y_param = c2.selectbox("Eje Y", [p for p in result["params"] if p != x_param],
+                           index=[p for p in result["params"] if p != x_param].index(y_default) if y_default != x_param else 0,
+                           key="sweep_y")
+    reduce = c3.selectbox("Métrica", list(SWEEP_REDUCE), format_func=SWEEP_REDUCE.get, key="sweep_reduce")
+
+    xs, ys = result["axes"][x_param], result["axes"][y_param]
+    for s_idx, name in enumerate(result["species"]):
+        data = heatmap_slice(result, s_idx, x_param, y_param, reduce=reduce)
+        fig, ax = plt.subplots(figsize=(7, 4))
+        im = ax.imshow(data, origin="lower", aspect="auto", cmap="RdYlGn",
+                       vmin=0.0, vmax=100.0 if reduce == "mean" else 1.0,
+                       extent=[xs[0], xs[-1], ys[0], ys[-1]])
+        ax.set_xlabel(SWEEP_UI_RANGES[x_param][0])
+        ax.set_ylabel(SWEEP_UI_RANGES[y_param][0])
+        ax.set_title(name)
+        fig.colorbar(im, ax=ax, label=SWEEP_REDUCE[reduce])
+        st.pyplot(fig)
+        plt.close(fig)
+
+    buf = io.StringIO()
+    write_sweep_csv(buf, result)
+    st.download_button("⬇️ Descargar barrido (CSV)", buf.getvalue().encode("utf-8"), file_name="barrido.csv", mime="text/csv")
+
+# -------------------------
+# Long-horizon mode: streamed to disk, downsampled chart
+# -------------------------
+LONG_RUN_MAX_DOWNLOAD = 200 * 1024 * 1024  # bytes offered through download_button
+
+def render_long_run_page():
+    import tempfile
+
+    st.subheader("Simulación de largo plazo (en flujo, memoria acotada)")
+    st.caption("Usa la especie, bioma, condiciones iniciales, intensidad y semilla de la barra lateral.")
+    with st.form("long_run_form"):
+        c1, c2, c3, c4 = st.columns(4)
+        hours = c1.number_input("Duración (horas)", min_value=0.01, max_value=24.0 * 365, value=24.0, key="long_hours")
+        period_days = c2.number_input("Periodo estacional (días, 0 = sin estación)", min_value=0.0, value=1.0, key="long_period")
+        temp_amp = c3.number_input("Amplitud temperatura (°C)", min_value=0.0, value=6.0, key="long_temp_amp")
+        ox_amp = c4.number_input("Amplitud O₂ (%)", min_value=0.0, value=1.0, key="long_ox_amp")
+        fmt = st.radio("Formato de salida", ["csv", "parquet"], horizontal=True, key="long_fmt")
+        adaptive = st.checkbox("Integrador adaptativo por eventos (sin ciclo estacional; estadísticamente equivalente)",
+                               key="long_adaptive")
+        submitted = st.form_submit_button("▶️ Ejecutar largo plazo")
+    if not submitted:
+        return
+
+    seasonal = None
+    if period_days > 0:
+        seasonal = {"period": period_days * 86400.0, "temp_amp": temp_amp, "ox_amp": ox_amp}
+    scenario = {"species_name": species_name, "environment": environment, "presion_init": presion_init,
+                "temp_init": temp_init, "ox_init": ox_init, "altitud_init": altitud_init,
+                "dyn_intensity": dyn_intensity, "seed": seed}
+    out_path = os.path.join(tempfile.gettempdir(), f"largo_{species_name.replace(' ','_')}_{int(seed)}.{fmt}")
+    if adaptive:
+        with st.spinner("Integrando por eventos…"):
+            summary, view = run_adaptive(scenario, hours * 3600.0, out=out_path, fmt=fmt)
+    else:
+        bar = st.progress(0.0, text="Simulando…")
+        summary, view = run_streaming(scenario, hours * 3600.0, out=out_path, fmt=fmt, seasonal=seasonal,
+                                      progress=lambda done, total: bar.progress(done / total, text=f"Pasos: {done}/{total}"))
+        bar.empty()
+
+    c1, c2, c3, c4 = st.columns(4)
+    c1.metric("Energía final", f"{summary['final_energy']:.2f}")
+    c2.metric("Energía mínima", f"{summary['min_energy']:.2f}")
+    c3.metric("Tiempo hasta debilidad (≤45)", "—" if summary["time_to_weak"] is None else f"{summary['time_to_weak']/3600:.2f} h")
+    c4.metric("Tiempo hasta colapso (≤2)", "—" if summary["time_to_collapse"] is None else f"{summary['time_to_collapse']/3600:.2f} h")
+    st.markdown(f"**Veredicto (modelo simplificado):** **{summary['verdict']}**")
+    for d in summary["drivers"]:
+        st.markdown("- " + d)
+
+    view_df = pd.DataFrame({"t (h)": view["t"] / 3600.0, "Energía": view["energy"], "Temp (°C)": view["temp"], "Ox (%)": view["ox"]})
+    if adaptive:
+        st.caption(f"Vista remuestreada: {len(view_df)} puntos de {summary['nodes']} nodos adaptativos "
+                   f"({summary['events']} eventos)")
+    else:
+        st.caption(f"Vista submuestreada: {len(view_df)} de {summary['steps']} pasos")
+    st.line_chart(view_df.set_index("t (h)"))
+
+    size = os.path.getsize(out_path)
+    if size <= LONG_RUN_MAX_DOWNLOAD:
+        with open(out_path, "rb") as fh:
+            st.download_button(f"⬇️ Descargar serie completa ({size/1e6:.1f} MB)", fh,
+                               file_name=os.path.basename(out_path),
+                               mime="text/csv" if fmt == "csv" else "application/octet-stream")
+    else:
+        st.info(f"Serie completa escrita en {out_path} ({size/1e6:.0f} MB).")
+
+# -------------------------
+# Population mode: herds / mixed assemblages in one biome
+# -------------------------
+def render_population_page():
+    st.subheader("Población multiespecie (mismo bioma, microclima individual)")
+    st.caption("Usa las condiciones iniciales, intensidad y semilla de la barra lateral; duración 20 s.")
+    # one counter per species when the registry is small; with a large catalog, pick the species first
+    if len(SPECIES) <= 12:
+        pop_species = list(SPECIES)
+    else:
+        pop_species = st.multiselect("Especies de la población", species_options, default=[species_name],
+                                     key="pop_species")
+    with st.form("population_form"):
+        counts = {}
+        cols = st.columns(3)
+        for i, name in enumerate(pop_species):
+            default = 5000 if name == species_name else 0
+            counts[name] = cols[i % 3].number_input(name, min_value=0, max_value=1_000_000, value=default, step=100,
+                                                    key=f"pop_{name}")
+        c1, c2 = st.columns(2)
+        mass_cv = c1.slider("Variación de masa individual (CV)", 0.0, 0.5, 0.15, step=0.01, key="pop_mass_cv")
+        micro = c2.slider("Intensidad del microclima local", 0.0, 2.0, 0.3, step=0.05, key="pop_micro")
+        submitted = st.form_submit_button("▶️ Simular población")
+    if not submitted or sum(counts.values()) == 0:
+        return
+
+    result = simulate_population(counts, presion_init, temp_init, ox_init, altitud_init, dyn_intensity,
+                                 steps=int(SIM_DURATION / STEP_INTERVAL), step_interval=STEP_INTERVAL, seed=seed,
+                                 mass_cv=mass_cv, micro_intensity=micro)
+    curves = pd.DataFrame({"t (s)": result["t"], "Población total": result["population_survival"]})
+    for s_idx, name in enumerate(result["species"]):
+        curves[name] = result["survival"][s_idx]
+    st.markdown(f"**Curvas de supervivencia** (fracción con energía > {SURVIVAL_THRESHOLD:.0f})")
+    st.line_chart(curves.set_index("t (s)"))
+
+    energy_df = pd.DataFrame({"t (s)": result["t"]})
+    for s_idx, name in enumerate(result["species"]):
+        energy_df[name] = result["mean_energy"][s_idx]
+    st.markdown("**Energía media por especie**")
+    st.line_chart(energy_df.set_index("t (s)"))
+
+    st.markdown("**Desglose por especie (final)**")
+    st.dataframe(pd.DataFrame(population_breakdown(result)).rename(columns={
+        "species_name": "Especie", "n": "Individuos", "survival": "Sobreviven (>45)", "alive": "Vivos (>2)",
+        "energy_p5": "Energía p5", "energy_p50": "Energía p50", "energy_p95": "Energía p95",
+    }), use_container_width=True)
+
+# -------------------------
+# Envelope mode: boundary of one parameter where the verdict / survival flips
+# -------------------------
+ENVELOPE_CRITERIA = {
+    "alive": f"Energía final > {VERDICT_ALIVE:.0f} (VIVO)",
+    "weak": f"Energía final > {VERDICT_WEAK:.0f} (no MUERTO)",
+    "survival": "Probabilidad de supervivencia ≥ objetivo",
+}
+
+def render_envelope_page():
+    import matplotlib.pyplot as plt
+
+    current = {"presion_init": presion_init, "temp_init": temp_init, "ox_init": ox_init,
+               "altitud_init": altitud_init, "dyn_intensity": dyn_intensity}
+    labels = {name: label for name, (label, *_rest) in SWEEP_UI_RANGES.items()}
+    st.subheader("Envolvente de supervivencia (consulta inversa)")
+    st.caption("Especie, semilla y parámetros fijos de la barra lateral. El bioma no altera la energía del modelo.")
+    with st.form("envelope_form"):
+        c1, c2, c3, c4 = st.columns(4)
+        solve = c1.selectbox("Resolver", list(SWEEP_UI_RANGES), index=2, format_func=labels.get, key="env_solve")
+        solve_lo = c2.number_input("Rango — mín", value=SWEEP_UI_RANGES["ox_init"][1], key="env_solve_lo")
+        solve_hi = c3.number_input("Rango — máx", value=SWEEP_UI_RANGES["ox_init"][2], key="env_solve_hi")
+        find = c4.radio("Buscar", ["min", "max"], format_func={"min": "valor mínimo que pasa", "max": "valor máximo que pasa"}.get,
+                        key="env_find")
+        c1, c2, c3 = st.columns(3)
+        criterion = c1.selectbox("Criterio", list(ENVELOPE_CRITERIA), index=1, format_func=ENVELOPE_CRITERIA.get, key="env_criterion")
+        target = c2.slider("Objetivo de supervivencia", 0.05, 1.0, 0.9, step=0.05, key="env_target")
+        samples = c3.number_input("Realizaciones (criterio probabilístico)", min_value=8, max_value=1024, value=64, key="env_samples")
+        axes = []   # (param, values) pairs; a dict would let the Y axis silently replace an equal X axis
+        for k, (default_param, default_n) in enumerate((("altitud_init", 25), ("temp_init", 1))):
+            c1, c2, c3, c4 = st.columns(4)
+            param = c1.selectbox(f"Eje {'XY'[k]}", list(SWEEP_UI_RANGES), index=list(SWEEP_UI_RANGES).index(default_param),
+                                 format_func=labels.get, key=f"env_axis{k}")
+            _, lo, hi, _ = SWEEP_UI_RANGES[param]
+            vmin = c2.number_input("mín", value=lo if param != "altitud_init" else 0.0, key=f"env_axis{k}_min")
+            vmax = c3.number_input("máx", value=hi, key=f"env_axis{k}_max")
+            n = c4.number_input("puntos (1 = sin eje)", min_value=1, max_value=200, value=default_n, key=f"env_axis{k}_n")
+            if n > 1:
+                axes.append((param, np.linspace(vmin, vmax, int(n))))
+        submitted = st.form_submit_button("▶️ Calcular envolvente")
+
+    if submitted:
+        axis_params = [param for param, _ in axes]
+        if not axes or solve in axis_params:
+            st.error("Elige al menos un eje distinto del parámetro a resolver.")
+            return
+        if len(axis_params) != len(set(axis_params)):
+            st.error(f"Los ejes X e Y no pueden usar el mismo parámetro ({labels[axis_params[0]]}).")
+            return
+        with st.spinner("Bisección por lotes…"):
+            st.session_state["envelope_result"] = solve_envelope(
+                species_name, solve, (solve_lo, solve_hi), dict(axes),
+                threshold=VERDICT_ALIVE if criterion == "alive" else VERDICT_WEAK,
+                survival_target=target if criterion == "survival" else None, n_samples=int(samples), find=find,
+                base=current, seed=int(seed))
+
+    result = st.session_state.get("envelope_result")
+    if result is None:
+        return
+    solve, grid_params = result["solve"], result["grid_params"]
+    st.caption(f"{result['evaluations']} evaluaciones · tolerancia {result['tol']:.3g}")
+    fig, ax = plt.subplots(figsize=(7, 4))
+    if len(grid_params) == 1:
+        xs = result["axes"][grid_params[0]]
+        ax.plot(xs, result["boundary"], marker="o")
+        ax.set_xlabel(labels[grid_params[0]])
+        ax.set_ylabel(labels[solve])
+    else:
+        xs, ys = result["axes"][grid_params[0]], result["axes"][grid_params[1]]
+        im = ax.pcolormesh(xs, ys, result["boundary"].T, shading="auto", cmap="viridis")
+        ax.set_xlabel(labels[grid_params[0]])
+        ax.set_ylabel(labels[grid_params[1]])
+        fig.colorbar(im, ax=ax, label=labels[solve])
+    ax.set_title(f"{result['species_name']}: {labels[solve]} {'mínimo' if result['find'] == 'min' else 'máximo'}")
+    st.pyplot(fig)
+    plt.close(fig)
+    never = int((result["status"] == NEVER_PASSES).sum())
+    if never:
+        st.caption(f"{never} puntos sin solución en el rango (se muestran vacíos).")
+
+    buf = io.StringIO()
+    write_envelope_csv(buf, result)
+    st.download_button("⬇️ Descargar envolvente (CSV)", buf.getvalue().encode("utf-8"), file_name="envolvente.csv", mime="text/csv")
+
+# -------------------------
+# Ranking mode: every species of the registry evaluated in one biome
+# -------------------------
+def render_ranking_page():
+    st.subheader("Ranking de especies por bioma")
+    st.caption(f"Evalúa las {len(SPECIES)} especies del registro en una sola pasada vectorizada. "
+               "Las especies fuera de su medio (p. ej. marinas fuera del agua) se listan al final.")
+    with st.form("ranking_form"):
+        c1, c2, c3 = st.columns(3)
+        rank_env = c1.selectbox("Bioma", ENVIRONMENTS, index=ENVIRONMENTS.index(environment), key="rank_env")
+        rank_habitat = c2.selectbox("Hábitat", ["(todos)"] + list(HABITATS), key="rank_habitat")
+        rank_samples = c3.number_input("Realizaciones de la deriva (0 = la de la app)", min_value=0, max_value=1000,
+                                       value=0, step=16, key="rank_samples")
+        use_baseline = st.checkbox("Usar las condiciones base del bioma (si no, las de la barra lateral)", value=True,
+                                   key="rank_baseline")
+        rank_top = st.slider("Especies a mostrar", 10, 1000, 100, step=10, key="rank_top")
+        submitted = st.form_submit_button("🏆 Clasificar")
+    if not submitted:
+        return
+
+    overrides = {"dyn_intensity": dyn_intensity, "seed": int(seed)}
+    if not use_baseline:
+        overrides.update(presion_init=presion_init, temp_init=temp_init, ox_init=ox_init, altitud_init=altitud_init)
+    sc = biome_scenario(rank_env, overrides)
+    st.markdown(f"Condiciones iniciales: Presión {float(sc['presion_init']):.1f} kPa · Temp {float(sc['temp_init']):.1f} °C · "
+                f"O₂ {float(sc['ox_init']):.1f}% · Altitud {float(sc['altitud_init']):.0f} m")
+    t0 = time.perf_counter()
+    ranking = rank_species(sc, habitat=None if rank_habitat == "(todos)" else rank_habitat, n_samples=int(rank_samples))
+    elapsed = time.perf_counter() - t0
+    survivors = sum(1 for r in ranking if not r["habitat_mismatch"] and r["final_energy"] > SURVIVAL_THRESHOLD)
+    c1, c2 = st.columns(2)
+    c1.metric("Especies evaluadas", f"{len(ranking)}")
+    c2.metric(f"Sobreviven (energía > {SURVIVAL_THRESHOLD:.0f}, en su medio)", f"{survivors}")
+    st.caption(f"Calculado en {elapsed*1000:.0f} ms.")
+    st.dataframe(pd.DataFrame(ranking[:rank_top]).rename(columns={
+        "rank": "Puesto", "species_name": "Especie", "habitat": "Hábitat", "final_energy": "Energía final",
+        "verdict": "Veredicto", "habitat_mismatch": "Fuera de su medio", "survival_probability": "Prob. supervivencia",
+    }), use_container_width=True, hide_index=True)
+
+    buf = io.StringIO()
+    write_ranking_csv(buf, ranking)
+    st.download_button("⬇️ Descargar ranking completo (CSV)", buf.getvalue().encode("utf-8"),
+                       file_name=f"ranking_{rank_env.replace(' ', '_')}.csv", mime="text/csv")
+
+APP_MODES = {
+    "visual": "🎬 Simulación visual",
+    "sweep": "🗺️ Barrido de parámetros",
+    "long": "⏳ Largo plazo",
+    "population": "🦕 Población",
+    "envelope": "🧭 Envolvente",
+    "ranking": "🏆 Ranking",
+}
+app_mode = st.sidebar.radio("Modo", list(APP_MODES), format_func=APP_MODES.get, key="app_mode")
+if app_mode == "sweep":
+    render_sweep_page()
+    st.stop()
+if app_mode == "long":
+    render_long_run_page()
+    st.stop()
+if app_mode == "population":
+    render_population_page()
+    st.stop()
+if app_mode == "envelope":
+    render_envelope_page()
+    st.stop()
+if app_mode == "ranking":
+    render_ranking_page()
+    st.stop()
+
+# -------------------------
+# Diagnostics: per-stage timing (panel at the end of the sidebar, JSON logs, /metrics)
+# -------------------------
+@st.cache_resource
+def get_metrics_server():
+    port = os.environ.get("BIOMECANICA_METRICS_PORT")
+    if not port:
+        return None
+    try:
+        return start_metrics_server(int(port))
+    except OSError as exc:
+        # cached as None: warned once per process, not on every rerun
+        warnings.warn(f"No se pudo abrir /metrics en el puerto {port}: {exc}", RuntimeWarning)
+        return None
+
+get_metrics_server()
+show_diagnostics = st.sidebar.checkbox("🩺 Diagnóstico de rendimiento", key="diagnostics")
+trace_memory = show_diagnostics and st.sidebar.checkbox("Medir memoria por etapa (tracemalloc)", key="diagnostics_memory")
+prof = StageProfiler(enabled=show_diagnostics or os.environ.get("BIOMECANICA_PROFILE") == "1", trace_memory=trace_memory)
+prof.start()
+
+# Validate images
+if (not bg_file) or (not sprite_file):
+    st.info("Sube fondo y sprite en la barra lateral para activar la simulación. (Puedes volver a Reiniciar para restaurar valores base.)")
+    st.stop()
+
+# -------------------------
+# Uploaded images: hashed, downscaled and recompressed once, shared across sessions
+# -------------------------
+# BIOMECANICA_STATIC_DIR redirects published assets (tools such as the load test; Streamlit itself
+# serves only the static/ folder next to this script)
+STATIC_DIR = os.environ.get("BIOMECANICA_STATIC_DIR",
+                            os.path.join(os.path.dirname(os.path.abspath(__file__)), "static"))
+
+@st.cache_resource
+def get_asset_store():
+    # With static serving enabled each asset is written once as static/<kind>_<hash>.<ext> and
+    # referenced by URL (browser-cached); otherwise it is inlined once as a data URI.
+    static_dir = STATIC_DIR if st.get_option("server.enableStaticServing") else None
+    base = st.get_option("server.baseUrlPath").strip("/")
+    return AssetStore(cache=shared_cache(), static_dir=static_dir,
+                      static_url=f"{base}/app/static" if base else "app/static")
+
+asset_store = get_asset_store()
+bg_asset = asset_store.get(bg_file.getvalue(), "background")
+sprite_asset = asset_store.get(sprite_file.getvalue(), "sprite")
+bg_url = asset_store.url(bg_asset)
+sprite_url = asset_store.url(sprite_asset)
+prof.lap("assets")
+
+# Simulation parameters (SIM_DURATION / STEP_INTERVAL come from the core package)
+STEPS = int(SIM_DURATION / STEP_INTERVAL)
+
+# Species base
+spec = SPECIES[species_name]
+habitat = spec["habitat"]
+temp_opt = spec["temp_opt"]
+ox_opt = spec["ox_opt"]
+mass = spec["masa"]
+
+# -------------------------
+# Shared (cross-session) graph of derived artifacts: each node is cached by its own
+# inputs, so a widget change only recomputes what depends on it. Nodes, assets and
+# rendered pages share one process-wide cache with a memory budget (BIOMECANICA_CACHE_MB)
+# -------------------------
+# Persistent (cross-restart) store of single-run timelines; BIOMECANICA_RUN_STORE overrides the path
+RUN_STORE_PATH = os.environ.get("BIOMECANICA_RUN_STORE",
+                                os.path.join(os.path.dirname(os.path.abspath(__file__)), "runs.sqlite"))
+
+@st.cache_resource
+def get_run_store():
+    return RunStore(RUN_STORE_PATH)
+
+@st.cache_resource
+def get_sim_graph():
+    graph = build_simulation_graph(shared_cache(), timeline_store=get_run_store())
+    graph.add("results_df", lambda timeline, step_interval: pd.DataFrame(timeline_columns(timeline, step_interval)),
+              params=("step_interval",), deps=("timeline",))
+    graph.add("csv", lambda results_df: results_df.to_csv(index=False).encode('utf-8'), deps=("results_df",))
+    return graph
+
+sim_graph = get_sim_graph()
+run_store = get_run_store()
+sim = sim_graph.evaluate({
+    "species_name": species_name, "environment": environment, "presion_init": presion_init, "temp_init": temp_init,
+    "ox_init": ox_init, "altitud_init": altitud_init, "dyn_intensity": dyn_intensity, "seed": int(seed),
+    "steps": STEPS, "step_interval": STEP_INTERVAL, "sim_duration": SIM_DURATION,
+    "n_agents": int(n_agents), "n_runs": int(n_runs),
+})
+timeline = sim["timeline"]
+prof.lap("timeline")
+ensemble = sim["ensemble"]
+prof.lap("ensemble")
+scene = sim["scene"]
+prof.lap("scene")
+payload = sim["payload"]["payload"]
+payload_json = sim["payload"]["json"]
+prof.lap("payload")
+results_df = sim["results_df"]
+prof.lap("dataframe")
+cache_hit = not sim.computed
+
+with st.sidebar.expander("Caché de simulaciones"):
+    cache_stats = sim_graph.cache.stats()
+    st.markdown("Recalculado en esta ejecución: " + (", ".join(f"`{n}`" for n in sim.computed) or "nada")
+                + ("  \nDel historial: " + ", ".join(f"`{n}`" for n in sim.loaded) if sim.loaded else ""))
+    st.markdown(f"Aciertos: **{cache_stats['hits']}** · Fallos: **{cache_stats['misses']}** · "
+                f"Tasa de acierto: **{cache_stats['hit_rate']*100:.0f} %**  \n"
+                f"Entradas: {cache_stats['size']}/{cache_stats['maxsize']} · Expulsadas: {cache_stats['evictions']} · Expiradas: {cache_stats['expirations']}  \n"
+                f"Memoria: {cache_stats['nbytes']/1e6:.1f} / {cache_stats['max_bytes']/1e6:.0f} MB (compartida por todas las sesiones)")
+
+with st.sidebar.expander("Historial de ejecuciones"):
+    store_stats = run_store.stats()
+    st.markdown(f"Ejecuciones guardadas: **{store_stats['runs']}** · Cargadas del historial: **{store_stats['hits']}**")
+    with st.form("history_form"):
+        hist_species = st.selectbox("Especie", ["(todas)"] + species_options, key="hist_species")
+        hist_env = st.selectbox("Bioma", ["(todos)"] + list(ENVIRONMENTS), key="hist_env")
+        hist_max_energy = st.number_input("Energía final menor que", min_value=0.0, max_value=100.01, value=100.01,
+                                          key="hist_max_energy")
+        hist_submitted = st.form_submit_button("Consultar")
+    if hist_submitted:
+        filters = {"max_final_energy": hist_max_energy}
+        if hist_species != "(todas)":
+            filters["species_name"] = hist_species
+        if hist_env != "(todos)":
+            filters["environment"] = hist_env
+        st.caption(f"{run_store.count(**filters)} ejecuciones (se muestran hasta 200)")
+        rows = run_store.query(limit=200, **filters)
+        if rows:
+            st.dataframe(pd.DataFrame(rows).drop(columns=["id", "drivers", "verdict_code"]), use_container_width=True)
+
+# -------------------------
+# Render: ANIMACIÓN arriba, métricas debajo
+# -------------------------
+st.subheader("Visualización (animación en tiempo real)")
+# the page embeds the payload JSON (and inline images): built once per scene/asset pair for all sessions
+html = sim_graph.cache.get_or_compute(
+    ("html", sim.key("payload"), asset_store.static_dir is not None, bg_asset["hash"], sprite_asset["hash"]),
+    lambda: render_animation_html(payload, payload_json, bg_url, sprite_url))
+st.components.v1.html(html, height=payload["height"]+20, scrolling=False)
+prof.lap("html_render")
+
+# in-app clips render in a worker process (GIF/APNG keep every frame until encoded); APNG frames
+# are full-size RGB, so its frame rate is capped lower than GIF/MP4
+APP_CLIP_MAX_FPS = {"gif": 30, "apng": 15, "mp4": 30}
+
+with st.expander("🎞️ Exportar clip (GIF / APNG / MP4)"):
+    clip_cols = st.columns(3)
+    clip_fmt = clip_cols[0].selectbox("Formato", VIDEO_FORMATS, key="clip_fmt")
+    clip_fps = clip_cols[1].slider("Fotogramas por segundo", 5, APP_CLIP_MAX_FPS[clip_fmt], 10, key="clip_fps")
+    clip_scale = clip_cols[2].select_slider("Escala", [0.5, 0.75, 1.0], value=1.0, key="clip_scale")
+    if st.button("Renderizar clip", key="clip_render"):
+        ext = {"gif": "gif", "apng": "png", "mp4": "mp4"}[clip_fmt]
+        clip_scenario = {"species_name": species_name, "environment": environment, "presion_init": presion_init,
+                         "temp_init": temp_init, "ox_init": ox_init, "altitud_init": altitud_init,
+                         "dyn_intensity": dyn_intensity, "seed": int(seed)}
+        try:
+            with st.spinner("Renderizando…"):
+                clip_bytes = render_clip_bytes(clip_scenario, bg_asset["bytes"], sprite_asset["bytes"], clip_fmt,
+                                               min(int(clip_fps), APP_CLIP_MAX_FPS[clip_fmt]), clip_scale,
+                                               int(n_agents))
+        except RuntimeError as exc:
+            st.error(str(exc))
+        else:
+            st.download_button(f"⬇️ Descargar clip ({len(clip_bytes)/1e6:.1f} MB)", clip_bytes,
+                               file_name=f"sim_{species_name.replace(' ','_')}.{ext}",
+                               mime={"gif": "image/gif", "png": "image/png", "mp4": "video/mp4"}[ext])
+prof.lap("clip_export")
+
+# -------------------------
+# Estado y métricas (ahora VA DEBAJO de la animación)
+# -------------------------
+st.subheader("Estado y métricas (precalculos)")
+st.markdown(f"- **Especie:** {species_name}  \n- **Hábitat base especie:** {habitat}  \n- **Bioma seleccionado (ambiente):** {environment}")
+st.markdown(f"- **Condiciones iniciales:** Presión {presion_init:.1f} kPa · Temp {temp_init:.1f} °C · O₂ {ox_init:.1f}% · Altitud {altitud_init:.0f} m")
+st.markdown("---")
+preview_df = pd.DataFrame({
+    "t (s)": [round(i*STEP_INTERVAL,1) for i in range(min(6, STEPS))],
+    "Energía (preview)": [round(x,2) for x in timeline["energy"][:min(6,STEPS)]],
+    "Vel ratio (preview)": [round(x,2) for x in timeline["speed_ratio"][:min(6,STEPS)]],
+})
+st.dataframe(preview_df, use_container_width=True)
+prof.lap("metrics_tables")
+
+# -------------------------
+# Results and detailed explanation (available immediately below)
+# -------------------------
+st.markdown("---")
+st.subheader("Resultados completos y explicación científica")
+
+col_single, col_ensemble = st.columns(2)
+with col_single:
+    st.caption("Trayectoria individual (semilla seleccionada)")
+    st.line_chart(results_df.set_index("t (s)")[["Energía", "Vel_ratio"]])
+with col_ensemble:
+    if ensemble is not None:
+        st.caption(f"Ensamble Monte Carlo ({int(n_runs)} trayectorias): bandas de percentiles de energía")
+        bands_df = pd.DataFrame({"t (s)": results_df["t (s)"]})
+        for p, row in zip(ensemble["percentiles"], ensemble["energy_bands"]):
+            bands_df[f"Energía p{p}"] = row
+        st.line_chart(bands_df.set_index("t (s)"))
+        speed_df = pd.DataFrame({"t (s)": results_df["t (s)"]})
+        for p, row in zip(ensemble["percentiles"], ensemble["speed_bands"]):
+            speed_df[f"Vel_ratio p{p}"] = row
+        st.line_chart(speed_df.set_index("t (s)"))
+        st.metric(f"Fracción de supervivencia (energía final > {SURVIVAL_THRESHOLD:.0f})", f"{ensemble['survival_fraction']*100:.1f} %")
+    else:
+        st.caption("Ensamble Monte Carlo desactivado (0 trayectorias).")
+prof.lap("charts")
+
+final_energy = timeline["energy"][-1]
+final_state = final_verdict(final_energy)
+
+st.markdown(f"**Veredicto (modelo simplificado):** **{final_state}**  \n**Energía final:** {final_energy:.2f}/100")
+
+# Long explanation tailored
+explanacion = []
+explanacion.append(f"### Resumen científico extendido para {species_name}")
+explanacion.append(f"Hábitat base especie: **{habitat}**. Bioma seleccionado: **{environment}**.")
+explanacion.append(f"Condiciones iniciales: presión {presion_init:.1f} kPa, temperatura {temp_init:.1f} °C, O₂ {ox_init:.1f}%, altitud {altitud_init:.0f} m.")
+explanacion.append("")
+explanacion.append("Durante los 20 segundos la simulación varió condiciones (drift aleatorio calibrado por intensidad). Se calculó una métrica energética (0–100) que resume la capacidad del organismo para sostener metabolismo y locomoción. El comportamiento observacional en la animación depende de tres procesos biomecánicos principales:")
+explanacion.append("1. **Intercambio gaseoso:** la eficiencia ventilatoria depende de la presión parcial de O₂ y la estructura pulmonar. En baja presión o baja fracción de O₂ la entrega de oxígeno a músculo disminuye (hipoxia) y la potencia muscular cae.")
+explanacion.append("2. **Cinemática muscular y térmica:** la temperatura altera la cinética enzimática y la velocidad de contracción. Temperaturas muy bajas ralentizan, y temperaturas altas pueden causar fallo térmico.")
+explanacion.append("3. **Carga mecánica por presión/densidad del medio:** en medios densos (agua) o con presiones altas, la ventilación y la perfusión se ven afectadas; la flotabilidad y resistencia cambian la potencia locomotora requerida.")
+explanacion.append("")
+# drivers identification
+drivers = sim["drivers"]
+if drivers:
+    for d in drivers:
+        explanacion.append("- " + d)
+else:
+    explanacion.append("- Las condiciones permanecieron cercanas a los óptimos durante la simulación.")
+
+explanacion.append("")
+explanacion.append("**Recomendaciones adaptativas hipotéticas (educativas):**")
+if final_energy < 50:
+    explanacion.append("- Aumentar capacidad pulmonar (sacos aéreos, mayor superficie de intercambio) y mejorar transporte sanguíneo.")
+    explanacion.append("- Comportamientos: buscar microhábitats con mayor O₂ o sombra, reducir actividad motora hasta recuperar energía.")
+    explanacion.append("- Morfológicas: reducir masa efectiva; patas/alas adaptadas para la nueva densidad o presión.")
+else:
+    explanacion.append("- El organismo no requiere cambios inmediatos. Mantener acceso a recursos y refugios es suficiente.")
+explanacion.append("")
+explanacion.append("**Limitaciones:** Este es un modelo didáctico y simplificado. Para uso científico requiere calibración con datos empíricos y modelos fisiológicos más profundos.")
+
+st.markdown("\n".join(explanacion))
+prof.lap("explanation")
+
+csv_bytes = sim["csv"]
+prof.lap("csv")
+
+# Table section as a fragment: its own widgets rerun only this block, not the animation above
+@fragment
+def render_evolution_table():
+    st.markdown("### Tabla de evolución (muestras)")
+    n_rows = st.slider("Filas al inicio y al final", 1, max(1, STEPS // 2), min(4, max(1, STEPS // 2)), key="table_rows")
+    columns = st.multiselect("Columnas", list(results_df.columns), default=list(results_df.columns), key="table_columns")
+    st.dataframe(pd.concat([results_df.head(n_rows), results_df.tail(n_rows)]).reset_index(drop=True)[columns])
+    st.download_button("⬇️ Descargar datos de la simulación (CSV)", csv_bytes, file_name=f"sim_{species_name.replace(' ','_')}.csv", mime="text/csv")
+
+render_evolution_table()
+prof.lap("evolution_table")
+prof.stop()
+
+prof.log_json(species_name=species_name, environment=environment, n_runs=int(n_runs), n_agents=int(n_agents),
+              cache_hit=cache_hit)
+if show_diagnostics:
+    with st.sidebar.expander("🩺 Diagnóstico (esta ejecución)", expanded=True):
+        diag_df = pd.DataFrame(prof.records)
+        diag_df["ms"] = diag_df["seconds"] * 1000.0
+        diag_df["pico (MB)"] = diag_df["peak_bytes"].astype(float) / 1e6
+        st.dataframe(diag_df[["stage", "ms", "pico (MB)"]].rename(columns={"stage": "etapa"}),
+                     use_container_width=True, hide_index=True)
+        st.caption(f"Total: {prof.total()*1000:.1f} ms")
+    with st.sidebar.expander("🩺 Agregado del proceso (todas las sesiones)"):
+        agg = STAGE_METRICS.snapshot()
+        st.dataframe(pd.DataFrame([{"etapa": k, "n": v["count"], "media (ms)": v["sum"] / v["count"] * 1000.0}
+                                   for k, v in sorted(agg.items())]), use_container_width=True, hide_index=True)
+        st.code(STAGE_METRICS.prometheus_text(), language="text")
@@ -0,0 +1,83 @@
+import numpy as np
+
+from biomecanica.cache import LRUCache, estimate_nbytes
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def block(n_floats, fill=0.0):
+    return np.full(n_floats, fill)
+
+
+def test_estimate_nbytes_counts_buffers_once():
+    arr = block(1000)
+    assert estimate_nbytes(arr) == 8000
+    nested = {"a": arr, "b": [arr, arr]}
+    assert 8000 < estimate_nbytes(nested) < 9000
+
+
+def test_lru_order_evicts_least_recently_used():
+    cache = LRUCache(maxsize=2, ttl=None)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1      # "b" is now the least recently used
+    cache.put("c", 3)
+    assert "b" not in cache and "a" in cache and "c" in cache
+    assert cache.stats()["evictions"] == 1
+
+
+def test_max_bytes_evicts_until_under_budget():
+    size = estimate_nbytes(block(1000))
+    cache = LRUCache(maxsize=100, ttl=None, max_bytes=int(size * 2.5))
+    for key in "abc":
+        cache.put(key, block(1000))
+    assert "a" not in cache and "b" in cache and "c" in cache
+    assert cache.nbytes == 2 * size <= cache.max_bytes
+    cache.get("b")
+    cache.put("d", block(1000))
+    assert list(cache._data) == ["b", "d"]
+    assert cache.stats()["evictions"] == 2
+
+
+def test_value_larger_than_budget_is_rejected():
+    cache = LRUCache(ttl=None, max_bytes=estimate_nbytes(block(100)))
+    cache.put("small", block(10))
+    cache.put("huge", block(1000))
+    assert "huge" not in cache and "small" in cache
+    assert cache.stats()["rejected"] == 1
+
+
+def test_replacing_a_key_updates_its_size():
+    cache = LRUCache(ttl=None, max_bytes=10**6)
+    cache.put("a", block(1000))
+    cache.put("a", block(10))
+    assert cache.nbytes == estimate_nbytes(block(10))
+    cache.clear()
+    assert cache.nbytes == 0 and len(cache) == 0
+
+
+def test_ttl_expiry_drops_entries_and_frees_bytes():
+    clock = FakeClock()
+    cache = LRUCache(ttl=10.0, clock=clock, max_bytes=10**6)
+    cache.put("a", block(100))
+    clock.now = 10.0
+    assert cache.get("a") is not None
+    clock.now = 10.5
+    assert cache.get("a") is None
+    stats = cache.stats()
+    assert stats["expirations"] == 1 and stats["hits"] == 1 and stats["misses"] == 1
+    assert cache.nbytes == 0
+
+
+def test_get_or_compute_calls_compute_once():
+    cache = LRUCache(ttl=None)
+    calls = []
+    for _ in range(3):
+        assert cache.get_or_compute("k", lambda: calls.append(1) or "v") == "v"
+    assert len(calls) == 1
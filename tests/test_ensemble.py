@@ -0,0 +1,27 @@
+import numpy as np
+import pytest
+
+from biomecanica import STEP_INTERVAL, compute_ensemble_evolution
+
+ARGS = dict(presion0=101.3, temp0=25, ox0=21, alt0=500, dyn_intensity=0.8, steps=40, step_interval=STEP_INTERVAL,
+            n_runs=3000, seed=42, temp_opt=22.0)
+RESULT_ARRAYS = ("energy_bands", "speed_bands", "energy_mean", "final_energy")
+
+
+def ensemble(**kwargs):
+    return compute_ensemble_evolution(**{**ARGS, **kwargs})
+
+
+@pytest.mark.parametrize("block_size", [1000, 4096])
+def test_process_pool_matches_serial_run(block_size):
+    serial = ensemble(workers=0, block_size=block_size)
+    pooled = ensemble(workers=2, block_size=block_size)
+    for key in RESULT_ARRAYS:
+        np.testing.assert_array_equal(serial[key], pooled[key], err_msg=key)
+    assert serial["survival_fraction"] == pooled["survival_fraction"]
+
+
+def test_block_size_selects_the_random_streams():
+    default = ensemble()
+    assert np.array_equal(default["final_energy"], ensemble(block_size=4096)["final_energy"])
+    assert not np.array_equal(default["final_energy"], ensemble(block_size=1000)["final_energy"])
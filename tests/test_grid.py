@@ -0,0 +1,56 @@
+import numpy as np
+
+from biomecanica import SIM_DURATION, SPECIES, STEP_INTERVAL, compute_final_energy_grid, drift_noise, run_scenario
+
+STEPS = int(SIM_DURATION / STEP_INTERVAL)
+
+
+def random_scenarios(n, seed=0):
+    rng = np.random.default_rng(seed)
+    species = list(SPECIES)
+    return {
+        "species_name": [species[i] for i in rng.integers(len(species), size=n)],
+        "presion_init": rng.uniform(20.0, 200.0, n).round(1),
+        "temp_init": rng.integers(-30, 61, n),
+        "ox_init": rng.integers(1, 41, n),
+        "altitud_init": rng.integers(-2000, 8001, n),
+        "dyn_intensity": rng.uniform(0.0, 1.0, n).round(2),
+    }
+
+
+def test_grid_matches_single_runs():
+    seed = 42
+    sc = random_scenarios(3000)
+    temp_opt = [SPECIES[name]["temp_opt"] for name in sc["species_name"]]
+    grid = compute_final_energy_grid(sc["presion_init"], sc["temp_init"], sc["ox_init"], sc["altitud_init"],
+                                     sc["dyn_intensity"], temp_opt, drift_noise(seed, STEPS), STEP_INTERVAL)
+    single = [run_scenario({"species_name": sc["species_name"][i], "presion_init": sc["presion_init"][i],
+                            "temp_init": sc["temp_init"][i], "ox_init": sc["ox_init"][i],
+                            "altitud_init": sc["altitud_init"][i], "dyn_intensity": sc["dyn_intensity"][i],
+                            "seed": seed})["energy"][-1]
+              for i in range(len(temp_opt))]
+    np.testing.assert_array_equal(grid, single)
+
+
+def test_grid_keeps_broadcast_shape():
+    noise = drift_noise(7, STEPS)
+    ox = np.arange(1, 41, 3)[:, None]
+    alt = np.array([-500, 0, 3000, 6000])[None, :]
+    grid = compute_final_energy_grid(101.3, 25, ox, alt, 0.6, 22.0, noise, STEP_INTERVAL)
+    assert grid.shape == (len(ox), alt.shape[1])
+    point = compute_final_energy_grid(101.3, 25, ox[3, 0], alt[0, 2], 0.6, 22.0, noise, STEP_INTERVAL)
+    assert grid[3, 2] == point
+
+
+def test_envelope_passes_agrees_with_grid():
+    from biomecanica.envelope import passes
+
+    sc = random_scenarios(400, seed=1)
+    values = np.column_stack([sc[k] for k in ("presion_init", "temp_init", "ox_init", "altitud_init",
+                                              "dyn_intensity")]).astype(float)
+    values[::2, 3] = 1500.0    # shared altitudes exercise the per-pair altitude walk
+    noises = np.stack([drift_noise(5, STEPS, run=r) for r in range(8)])
+    threshold = 45.0
+    expected = np.column_stack([compute_final_energy_grid(*values.T, 22.0, noise, STEP_INTERVAL) > threshold
+                                for noise in noises])
+    np.testing.assert_array_equal(passes(values, 22.0, noises, STEP_INTERVAL, threshold), expected)
@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+
+from biomecanica import CONTAINER_HEIGHT, CONTAINER_WIDTH, REGION, normalize_scenario, run_scenario
+from biomecanica.motion import DEATH_FALL, DEATH_OUT_OF_WATER, compute_trajectories
+from biomecanica.pipeline import herd_scene
+
+X_MIN, X_MAX = np.floor(0.05 * CONTAINER_WIDTH), np.floor(0.92 * CONTAINER_WIDTH)
+
+
+def healthy_agents(n=50, steps=40, seed=0):
+    """Speed / energy of agents that never weaken (energy >= 60) and spread start positions."""
+    rng = np.random.default_rng(seed)
+    energy = rng.uniform(60.0, 100.0, (n, steps))
+    return np.sqrt(energy / 100.0), energy, np.floor(rng.uniform(X_MIN, X_MAX, n))
+
+
+@pytest.mark.parametrize("habitat,environment", [
+    ("terrestre", "Llanura"), ("terrestre", "Montaña"), ("terrestre", "Fondo marino"),
+    ("volador", "Selva"), ("volador", "Desierto"),
+    ("marino", "Fondo marino"),
+])
+def test_healthy_agents_stay_inside_their_region(habitat, environment):
+    speed, energy, start_x = healthy_agents()
+    traj = compute_trajectories(speed, energy, habitat, environment, np.random.default_rng(1), start_x=start_x)
+    y_min = np.floor(REGION[habitat]["y_min_frac"] * CONTAINER_HEIGHT)
+    y_max = np.floor(REGION[habitat]["y_max_frac"] * CONTAINER_HEIGHT)
+    assert not traj["died"].any()
+    assert traj["y"].min() >= y_min and traj["y"].max() <= y_max
+    assert traj["x"].min() >= X_MIN and traj["x"].max() <= X_MAX
+
+
+def test_weak_flyer_falls_out_of_its_region():
+    energy = np.full((1, 200), 10.0)
+    traj = compute_trajectories(np.sqrt(energy / 100.0), energy, "volador", "Llanura", np.random.default_rng(1))
+    assert traj["died"][0] and traj["death_reason"][0] == DEATH_FALL
+    step = traj["death_step"][0]
+    assert traj["y"][0, step + 1] > CONTAINER_HEIGHT - 80
+    assert np.all(traj["y"][0, step + 1:] == traj["y"][0, step + 1])   # frozen after death
+
+
+def test_marine_agent_out_of_water_dies():
+    energy = np.full((1, 200), 20.0)
+    traj = compute_trajectories(np.sqrt(energy / 100.0), energy, "marino", "Llanura", np.random.default_rng(1))
+    assert traj["died"][0] and traj["death_reason"][0] == DEATH_OUT_OF_WATER
+
+
+def scene(seed, species_name="Spinosaurus aegyptiacus", environment="Fondo marino", n_agents=4):
+    sc = normalize_scenario({"species_name": species_name, "environment": environment, "seed": seed})
+    steps = int(sc["sim_duration"] / sc["step_interval"])
+    return herd_scene(run_scenario(sc), sc["presion_init"], sc["temp_init"], sc["ox_init"], sc["altitud_init"],
+                      sc["dyn_intensity"], sc["seed"], steps, sc["step_interval"], species_name, environment, n_agents)
+
+
+@pytest.mark.parametrize("species_name,environment", [
+    ("Tyrannosaurus rex", "Llanura"), ("Aquila chrysaetos (Águila)", "Montaña"),
+    ("Spinosaurus aegyptiacus", "Fondo marino"), ("Crocodylus (Cocodrilo)", "Desierto"),
+])
+def test_same_seed_gives_identical_trajectories(species_name, environment):
+    first, second = scene(11, species_name, environment), scene(11, species_name, environment)
+    assert first["end"] == second["end"]
+    for key, values in first["trajectories"].items():
+        np.testing.assert_array_equal(values, second["trajectories"][key], err_msg=key)
+
+
+def test_different_seed_changes_marine_trajectories():
+    assert not np.array_equal(scene(11)["trajectories"]["x"], scene(12)["trajectories"]["x"])
@@ -0,0 +1,102 @@
+import base64
+
+import numpy as np
+import pytest
+
+from biomecanica import SPECIES, normalize_scenario, run_scenario
+from biomecanica.motion import build_scene
+from biomecanica.narrative import MESSAGES, decode_narrative, decode_timeline_narrative
+from biomecanica.payload import PACKED_AGENT_FIELDS, PACKED_SERIES, build_payload
+from biomecanica.rng import motion_rng
+
+# (species, biome, overrides) chosen so that, together, every condition bit fires
+SCENARIOS = [
+    ("Tyrannosaurus rex", "Llanura", {"temp_init": -30, "ox_init": 8, "presion_init": 180.0}),
+    ("Velociraptor mongoliensis", "Desierto", {"temp_init": 60, "presion_init": 30.0, "altitud_init": 5000}),
+    ("Brachiosaurus altithorax", "Fondo marino", {"altitud_init": -1000, "dyn_intensity": 1.0}),
+    ("Spinosaurus aegyptiacus", "Selva", {"temp_init": 25}),
+    ("Aquila chrysaetos (Águila)", "Montaña", {"temp_init": 10, "altitud_init": 3500}),
+    ("Crocodylus (Cocodrilo)", "Fondo marino", {}),
+]
+
+
+def original_sentence(temp_diff, ox_factor, pres, alt, habitat, environment):
+    """The narrative the single-run loop built as text before the bitmask encoding."""
+    parts = []
+    if abs(temp_diff) > 6:
+        if temp_diff < 0:
+            parts.append(f"Frío pronunciado (Δ {temp_diff:.1f} °C): contracción muscular y reducción en velocidad.")
+        else:
+            parts.append(f"Calor pronunciado (Δ +{temp_diff:.1f} °C): riesgo de hipertermia y deshidratación.")
+    if ox_factor < 0.85:
+        parts.append(f"Hipoxia funcional (factor O₂ {ox_factor:.2f}): fatiga y pérdida de coordinación.")
+    if pres > 140:
+        parts.append("Presión elevada: compresión de estructuras y menor capacidad de ventilación.")
+    if pres < 60:
+        parts.append("Presión baja: expansión de gases internos y mareo.")
+    if alt > 3000:
+        parts.append("Altitud alta: disminución de presión parcial de O₂.")
+    if alt < -200:
+        parts.append("Presión hidrostática alta (subacuática): riesgo de daño por compresión.")
+    if environment == "Fondo marino" and habitat != "marino":
+        parts.append("Ambiente marino detectado: organismo no adaptado muestra signos de inmersión y estrés respiratorio.")
+    if environment != "Fondo marino" and habitat == "marino":
+        parts.append("Organismo marino fuera del agua: desecación y fallo respiratorio progresivo.")
+    return " ".join(parts) if parts else "Condiciones dentro de parámetros operativos."
+
+
+def unpack(b64, dtype):
+    return np.frombuffer(base64.b64decode(b64), dtype=dtype)
+
+
+def simulate(species_name, environment, overrides):
+    sc = normalize_scenario({"species_name": species_name, "environment": environment, "seed": 3, **overrides})
+    timeline = run_scenario(sc)
+    steps = int(sc["sim_duration"] / sc["step_interval"])
+    habitat = SPECIES[species_name]["habitat"]
+    trajectories, end = build_scene([timeline], habitat, environment, motion_rng(sc["seed"]))
+    payload = build_payload(timeline, habitat, environment, steps, sc["step_interval"], sc["sim_duration"],
+                            trajectories=trajectories, end=end)
+    return timeline, habitat, trajectories, payload
+
+
+@pytest.mark.parametrize("species_name,environment,overrides", SCENARIOS)
+def test_series_round_trip(species_name, environment, overrides):
+    timeline, _, _, payload = simulate(species_name, environment, overrides)
+    for name, (key, dtype, _) in PACKED_SERIES.items():
+        np.testing.assert_array_equal(unpack(payload["series"][name], dtype),
+                                      np.asarray(timeline[key], dtype=dtype), err_msg=name)
+    assert unpack(payload["series"]["conditions"], "<u2").tolist() == list(timeline["conditions"])
+
+
+@pytest.mark.parametrize("species_name,environment,overrides", SCENARIOS)
+def test_decoded_narrative_equals_original_sentence(species_name, environment, overrides):
+    timeline, habitat, _, payload = simulate(species_name, environment, overrides)
+    masks = unpack(payload["series"]["conditions"], "<u2")
+    temp_opt = payload["temp_opt"]
+    expected = [original_sentence(t - temp_opt, f, p, a, habitat, environment)
+                for t, f, p, a in zip(timeline["temp"], timeline["ox_factor"], timeline["pres"], timeline["alt"])]
+    decoded = [decode_narrative(int(m), t - temp_opt, f) for m, t, f in zip(masks, timeline["temp"], timeline["ox_factor"])]
+    assert decoded == expected
+    assert decode_timeline_narrative(timeline) == expected
+    # the browser decodes from the packed float32 series
+    temps, ox_factors = unpack(payload["series"]["temp"], "<f4"), unpack(payload["series"]["ox_factor"], "<f4")
+    assert [decode_narrative(int(m), float(t) - temp_opt, float(f))
+            for m, t, f in zip(masks, temps, ox_factors)] == expected
+
+
+def test_scenarios_cover_every_condition_bit():
+    seen = 0
+    for scenario in SCENARIOS:
+        seen |= int(np.bitwise_or.reduce(np.asarray(simulate(*scenario)[0]["conditions"], dtype=np.uint16)))
+    assert seen == sum(MESSAGES)
+
+
+def test_agent_trajectories_round_trip():
+    _, _, trajectories, payload = simulate(*SCENARIOS[5])
+    agents = payload["agents"]
+    shape = (agents["count"], agents["samples"])
+    for name, (dtype, _, scale) in PACKED_AGENT_FIELDS.items():
+        decoded = unpack(agents[name], dtype).reshape(shape) / scale
+        np.testing.assert_allclose(decoded, trajectories[name], atol=0.5 / scale, err_msg=name)
+    np.testing.assert_array_equal(unpack(agents["death_step"], "<i2"), trajectories["death_step"])
@@ -0,0 +1,53 @@
+import json
+import logging
+import sys
+import tracemalloc
+
+from biomecanica.profiling import StageProfiler, logger
+
+
+def test_tracing_is_shared_between_profilers():
+    first = StageProfiler(enabled=True, trace_memory=True, metrics=None)
+    second = StageProfiler(enabled=True, trace_memory=True, metrics=None)
+    first.start()
+    second.start()
+    data = [0] * 100_000
+    first.lap("a")
+    second.lap("a")
+    # one owner of the process-wide peak counter; the other reports no peak
+    assert first.records[0]["peak_bytes"] >= 800_000
+    assert second.records[0]["peak_bytes"] is None
+
+    first.stop()
+    assert tracemalloc.is_tracing()   # the second profiler still holds a reference
+    second.lap("b")                   # claims the freed counter
+    data = [1] * 100_000
+    second.lap("c")
+    assert second.records[-1]["peak_bytes"] >= 800_000
+    second.stop()
+    assert not tracemalloc.is_tracing()
+    del data
+
+
+def test_stage_does_not_stop_foreign_tracing():
+    tracemalloc.start()
+    try:
+        prof = StageProfiler(enabled=True, trace_memory=True, metrics=None)
+        with prof.stage("s"):
+            pass
+        assert tracemalloc.is_tracing()
+    finally:
+        tracemalloc.stop()
+
+
+def test_log_json_is_written(capsys):
+    prof = StageProfiler(enabled=True, metrics=None)
+    assert logger.handlers and logger.isEnabledFor(logging.INFO)
+    # the handler was bound to the stderr of its time; point it at the captured one
+    logger.handlers[0].setStream(sys.stderr)
+    prof.start()
+    prof.lap("a")
+    prof.log_json(species_name="x")
+    line = json.loads(capsys.readouterr().err.strip().splitlines()[-1])
+    assert line["event"] == "rerun_profile" and line["species_name"] == "x"
+    assert [s["stage"] for s in line["stages"]] == ["a"]
@@ -0,0 +1,32 @@
+import itertools
+
+import numpy as np
+import pytest
+
+from biomecanica import ENVIRONMENTS, SPECIES, VERDICT_LABELS, run_scenario, verdict_codes
+from biomecanica.ranking import biome_scenario, evaluate_registry, rank_species
+
+
+@pytest.mark.parametrize("environment,seed", list(itertools.product(ENVIRONMENTS, (7, 42, 2024))))
+def test_ranking_matches_single_run_model(environment, seed):
+    sc = biome_scenario(environment, {"seed": seed, "dyn_intensity": 0.9})
+    ranking = rank_species(sc)
+    assert sorted(r["species_name"] for r in ranking) == sorted(SPECIES)
+    for row in ranking:
+        expected = run_scenario({**sc, "species_name": row["species_name"]})["energy"][-1]
+        assert row["final_energy"] == expected, row["species_name"]   # bit-identical, not approx
+        assert row["verdict"] == VERDICT_LABELS[int(verdict_codes(np.asarray(expected)))]
+
+
+def test_ranking_order():
+    ranking = rank_species(biome_scenario("Desierto"))
+    assert [r["rank"] for r in ranking] == list(range(1, len(ranking) + 1))
+    keys = [(r["habitat_mismatch"], -r["final_energy"]) for r in ranking]
+    assert keys == sorted(keys)
+
+
+def test_samples_survival_probability():
+    sc = biome_scenario("Montaña", {"seed": 3})
+    result = evaluate_registry(sc, n_samples=8)
+    assert result["final_energy"].shape == (len(SPECIES), 8)
+    assert ((0.0 <= result["survival_probability"]) & (result["survival_probability"] <= 1.0)).all()
@@ -0,0 +1,67 @@
+import math
+
+import numpy as np
+import pytest
+
+from biomecanica.registry import HABITATS, SpeciesRegistry
+
+N_LARGE = 50_000
+
+
+def _base():
+    return SpeciesRegistry.from_records({
+        "Aquila chrysaetos (Águila)": {"habitat": "volador", "masa": 5.0, "femur": 0.1, "temp_opt": 40.0,
+                                       "ox_opt": 19.0, "region": "Holártico"},
+        "Crocodylus (Cocodrilo)": {"habitat": "terrestre", "masa": 500.0, "femur": 0.3, "temp_opt": 30.0,
+                                   "ox_opt": 18.0, "region": "Trópico"},
+    })
+
+
+def test_extend_updates_only_given_columns():
+    registry = _base()
+    registry.extend({"name": ["Crocodylus (Cocodrilo)", "Nuevo"], "habitat": ["terrestre", "marino"],
+                     "temp_opt": [28.0, 12.0], "ox_opt": [float("nan"), 15.0], "region": ["", "Atlántico"]})
+    croc = registry["Crocodylus (Cocodrilo)"]
+    assert croc["temp_opt"] == 28.0          # given → overwritten
+    assert croc["ox_opt"] == 18.0            # NaN → kept
+    assert croc["masa"] == 500.0 and croc["femur"] == 0.3   # absent column → kept
+    assert croc["region"] == "Trópico"       # blank text → kept
+    assert registry.row("Crocodylus (Cocodrilo)") == 1
+    new = registry["Nuevo"]
+    assert new["habitat"] == "marino" and new["region"] == "Atlántico" and math.isnan(new["masa"])
+    assert registry["Aquila chrysaetos (Águila)"]["masa"] == 5.0
+
+
+def _large_columns(n):
+    rng = np.random.default_rng(0)
+    return {
+        "name": [f"Especie {i:06d}" for i in range(n)],
+        "habitat": [HABITATS[i % 3] for i in range(n)],
+        "masa": rng.uniform(1, 1e4, n),
+        "temp_opt": rng.uniform(0, 40, n),
+        "ox_opt": rng.uniform(10, 21, n),
+    }
+
+
+@pytest.mark.parametrize("ext", [".csv", ".npz"])
+def test_large_catalog_load_search_extend(tmp_path, ext):
+    columns = _large_columns(N_LARGE)
+    path = str(tmp_path / f"catalogo{ext}")
+    SpeciesRegistry(columns).save(path)
+
+    registry = SpeciesRegistry.load(path)
+    assert len(registry) == N_LARGE
+    np.testing.assert_array_equal(registry.column("temp_opt"), columns["temp_opt"])
+    assert len(registry.rows_by_habitat("marino")) == columns["habitat"].count("marino")
+
+    assert registry.search("especie 012345") == ["Especie 012345"]
+    hits = registry.search("0123", limit=None, habitat="volador")
+    assert hits and all("0123" in h and registry[h]["habitat"] == "volador" for h in hits)
+
+    registry.extend({"name": ["Especie 000001", "Especie nueva"], "habitat": ["terrestre", "marino"],
+                     "temp_opt": [99.0, 5.0], "ox_opt": [float("nan"), 12.0]})
+    assert len(registry) == N_LARGE + 1
+    assert registry["Especie 000001"]["temp_opt"] == 99.0
+    assert registry["Especie 000001"]["ox_opt"] == columns["ox_opt"][1]
+    assert registry["Especie 000001"]["masa"] == columns["masa"][1]
+    assert registry.search("nueva") == ["Especie nueva"]
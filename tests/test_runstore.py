@@ -0,0 +1,74 @@
+import itertools
+
+import pytest
+
+from biomecanica import ENVIRONMENTS, SPECIES, normalize_scenario, run_scenario
+from biomecanica.cache import scenario_key
+from biomecanica.runstore import BLOB_SERIES, RunStore
+
+SPECIES_NAMES = list(SPECIES)[:3]
+ENVIRONMENT_NAMES = list(ENVIRONMENTS)[:3]
+
+
+def _key(sc, steps=None):
+    steps = int(sc["sim_duration"] / sc["step_interval"]) if steps is None else steps
+    return scenario_key(sc["species_name"], sc["environment"], sc["presion_init"], sc["temp_init"], sc["ox_init"],
+                        sc["altitud_init"], sc["dyn_intensity"], sc["seed"], steps, sc["step_interval"])
+
+
+def _scenarios():
+    for i, (species_name, environment) in enumerate(itertools.product(SPECIES_NAMES, ENVIRONMENT_NAMES)):
+        yield normalize_scenario({"species_name": species_name, "environment": environment, "seed": 11 + i,
+                                  "temp_init": 5.0 + 4 * i, "dyn_intensity": 0.6})
+
+
+@pytest.fixture
+def store_path(tmp_path):
+    return str(tmp_path / "runs.sqlite")
+
+
+def test_timeline_reloads_identically_after_reopening(store_path):
+    scenarios = list(_scenarios())
+    timelines = [run_scenario(sc) for sc in scenarios]
+    store = RunStore(store_path)
+    store.put_many([(_key(sc), sc, tl) for sc, tl in zip(scenarios, timelines)])
+    store.close()
+
+    store = RunStore(store_path)
+    try:
+        assert store.count() == len(scenarios)
+        for sc, expected in zip(scenarios, timelines):
+            loaded = store.get(_key(sc))
+            assert loaded is not None
+            for name, _ in BLOB_SERIES:
+                assert loaded[name] == list(expected[name]), name
+            assert loaded["temp_opt"] == SPECIES[sc["species_name"]]["temp_opt"]
+        # a stored run is served without recomputing
+        sc = scenarios[0]
+        assert store.get_or_compute(_key(sc), sc, lambda: pytest.fail("recomputed")) is not None
+    finally:
+        store.close()
+
+
+def test_history_filters(store_path):
+    scenarios = list(_scenarios())
+    store = RunStore(store_path)
+    try:
+        store.put_many([(_key(sc), sc, run_scenario(sc)) for sc in scenarios])
+        for species_name, environment in itertools.product(SPECIES_NAMES + [None], ENVIRONMENT_NAMES + [None]):
+            expected = sorted(_key(sc) for sc in scenarios
+                              if species_name in (None, sc["species_name"])
+                              and environment in (None, sc["environment"]))
+            rows = store.query(limit=None, species_name=species_name, environment=environment)
+            got = sorted(_key(row, steps=row["steps"]) for row in rows)
+            assert got == expected
+            assert store.count(species_name=species_name, environment=environment) == len(expected)
+        # energy filter combined with species: bounds are [min, max)
+        rows = store.query(limit=None, species_name=SPECIES_NAMES[0])
+        cut = sorted(r["final_energy"] for r in rows)[1]
+        below = store.query(limit=None, species_name=SPECIES_NAMES[0], max_final_energy=cut)
+        assert all(r["final_energy"] < cut for r in below)
+        assert len(below) == sum(r["final_energy"] < cut for r in rows)
+        assert [r["final_energy"] for r in rows] == sorted(r["final_energy"] for r in rows)
+    finally:
+        store.close()
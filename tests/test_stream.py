@@ -0,0 +1,25 @@
+import itertools
+
+import numpy as np
+import pytest
+
+from biomecanica import ENVIRONMENTS, SPECIES, normalize_scenario, run_scenario
+from biomecanica.stream import stream_evolution
+
+COLUMNS = ("pres", "temp", "ox", "alt", "energy", "speed_ratio", "ox_factor", "conditions")
+
+
+@pytest.mark.parametrize("species_name,environment", list(itertools.product(SPECIES, ENVIRONMENTS)))
+@pytest.mark.parametrize("chunk_steps", [7, 64])
+def test_chunks_reproduce_single_run_model(species_name, environment, chunk_steps):
+    sc = normalize_scenario({"species_name": species_name, "environment": environment, "seed": 7,
+                             "altitud_init": 1500, "dyn_intensity": 0.8})
+    timeline = run_scenario(sc)
+    steps = int(sc["sim_duration"] / sc["step_interval"])
+    spec = SPECIES[species_name]
+    chunks = list(stream_evolution(sc["presion_init"], sc["temp_init"], sc["ox_init"], sc["altitud_init"],
+                                   sc["dyn_intensity"], steps, sc["step_interval"], spec["temp_opt"],
+                                   spec["habitat"], environment, sc["seed"], chunk_steps=chunk_steps))
+    for column in COLUMNS:
+        streamed = np.concatenate([chunk[column] for chunk in chunks])
+        np.testing.assert_array_equal(streamed, np.asarray(timeline[column]), err_msg=column)